@@ -0,0 +1,103 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""Benchmark of the series/movie/channel classification of M3URecordEx
+
+Compares the per-record cost of classify() with the previous RE_SERIE based classification.
+
+    python benchmarks/classify.py --records 100000
+
+"""
+import sys
+import time
+import random
+import argparse
+from m3u_serializer.record import RE_SERIE, M3uItemType, M3URecordEx, classify, media_extensions
+
+
+def classify_re_serie( name: str, group: str, link: str, media_files: tuple ) -> tuple:
+    """The classification with RE_SERIE.search(), as reference
+
+    """
+    result = RE_SERIE.search( name )
+    if result:
+        groups = result.groups()
+        return M3uItemType.SERIE_EPISODE, groups[ 2 ].strip(), groups[ 4 ].strip(), group, groups[ 0 ].strip()
+
+    if link.endswith( media_files ):
+        return M3uItemType.MOVIE, '', '', group, f'Movies: {group}'
+
+    return M3uItemType.IPTV_CHANNEL, '', '', group, group
+
+
+def generate( count: int, seed: int ) -> list:
+    """Generates ( name, group, link ) tuples with channels, movies and series
+
+    """
+    rnd = random.Random( seed )
+    words = [ 'The', 'Night', 'of', 'Long', 'Return', 'Knives', 'Out', 'Dark', 'Secret', 'World', 'Sky', 'Sports' ]
+    items = []
+    for index in range( count ):
+        title = ' '.join( rnd.choice( words ) for _ in range( rnd.randint( 2, 12 ) ) )
+        kind = rnd.random()
+        if kind < 0.4:
+            items.append( ( f'NL | {title} S{rnd.randint( 1, 20 ):02} E{rnd.randint( 1, 30 ):02}', 'Series',
+                            f'http://iptv.example.org/series/{index}.mkv' ) )
+
+        elif kind < 0.7:
+            items.append( ( f'{title} ({rnd.randint( 1950, 2022 )})', 'Movies', f'http://iptv.example.org/movie/{index}.mp4' ) )
+
+        else:
+            items.append( ( f'UK: {title} HD', 'United Kingdom', f'http://iptv.example.org/live/{index}' ) )
+
+    return items
+
+
+def measure( function, items: list, media_files: tuple ) -> float:
+    start = time.perf_counter()
+    for name, group, link in items:
+        function( name, group, link, media_files )
+
+    return time.perf_counter() - start
+
+
+def main( argv = None ) -> int:
+    parser = argparse.ArgumentParser( description = 'Benchmark of the M3URecordEx classification' )
+    parser.add_argument( '--records', type = int, default = 100000 )
+    parser.add_argument( '--seed', type = int, default = 42 )
+    args = parser.parse_args( argv )
+    items = generate( args.records, args.seed )
+    media_files = media_extensions()
+    for name, group, link in items:
+        if classify( name, group, link, media_files ) != classify_re_serie( name, group, link, media_files ):
+            print( f'Different classification for {name!r}' )
+            return 1
+
+    for label, function in ( ( 'RE_SERIE', classify_re_serie ), ( 'classify', classify ) ):
+        elapsed = measure( function, items, media_files )
+        print( f'{label:<16} {elapsed * 1e6 / len( items ):8.2f} us/record' )
+
+    start = time.perf_counter()
+    for name, group, link in items:
+        M3URecordEx().set( '-1', f'group-title="{group}"', name, link )
+
+    elapsed = time.perf_counter() - start
+    print( f'{"M3URecordEx.set":<16} {elapsed * 1e6 / len( items ):8.2f} us/record' )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
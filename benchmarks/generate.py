@@ -0,0 +1,94 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""Seeded generator of large IPTV playlists for the benchmarks
+
+The playlists contain live channels, series episodes and movies, with country prefixes, long attribute
+lists and Unicode names. The same seed and count always give the same playlist.
+
+    python benchmarks/generate.py playlist.m3u --records 1000000 --seed 42
+
+"""
+import sys
+import random
+import argparse
+
+COUNTRIES   = [ 'NL', 'UK', 'DE', 'FR', 'PL', 'EX-YU', 'TR', 'AR', 'SE VIP', 'PT' ]
+WORDS       = [ 'The', 'Night', 'of', 'Long', 'Return', 'Knives', 'Dark', 'Secret', 'World', 'Sky', 'Sports',
+                'Noticias', 'Müller', 'Żółw', 'Ελλάδα', 'Новости', 'الجزيرة',
+                'Çocuk', 'Ørsted', '日本', 'Café' ]
+CHANNELS    = [ 'NPO 1', 'NPO 2', 'RTL 4', 'BBC One', 'ITV', 'ZDF', 'TF1', 'TVP 1', 'TRT 1', 'Eurosport', 'CNN' ]
+QUALITIES   = [ 'SD', 'HD', 'FHD', '4K', 'H265' ]
+
+
+def generate( stream, count: int, seed: int = 42 ) -> int:
+    """Writes a playlist with `count` entries to the text `stream`
+
+    About 40% live channels, 40% series episodes and 20% movies.
+
+    :param stream:      text stream to write to.
+    :param count:       number of entries.
+    :param seed:        the random seed.
+    :return:            the number of characters written
+    """
+    rnd = random.Random( seed )
+    size = stream.write( '#EXTM3U\n' )
+    for index in range( count ):
+        country = rnd.choice( COUNTRIES )
+        title = ' '.join( rnd.choice( WORDS ) for _ in range( rnd.randint( 1, 8 ) ) )
+        kind = rnd.random()
+        if kind < 0.4:
+            name = f'{country} | {rnd.choice( CHANNELS )} {rnd.choice( QUALITIES )}'
+            group = f'{country} | {rnd.choice( [ "General", "News", "Sports", "Kids", "Movies" ] )}'
+            link = f'http://iptv.example.org/live/user/pass/{index}.ts'
+
+        elif kind < 0.8:
+            name = f'{country} | {title} S{rnd.randint( 1, 20 ):02} E{rnd.randint( 1, 30 ):02}'
+            group = f'{country} | Series {title[ :12 ]}'
+            link = f'http://iptv.example.org/series/user/pass/{index}.{rnd.choice( [ "mkv", "mp4", "avi" ] )}'
+
+        else:
+            name = f'{country} | {title} ({rnd.randint( 1950, 2022 )})'
+            group = f'{country} | Movies'
+            link = f'http://iptv.example.org/movie/user/pass/{index}.{rnd.choice( [ "mkv", "mp4" ] )}'
+
+        attributes = [ f'tvg-id="{index}.{country.lower().replace( " ", "" )}"', f'tvg-name="{name}"',
+                       f'tvg-logo="http://logo.example.org/{index % 5000}.png"', f'group-title="{group}"' ]
+        if rnd.random() < 0.5:
+            attributes.append( f'tvg-country="{country}" tvg-language="{country.lower()}" tvg-shift="{rnd.randint( -2, 2 )}"' )
+
+        if rnd.random() < 0.2:
+            attributes.append( f'catchup-type="default" catchup-days="{rnd.randint( 1, 7 )}" timeshift-mode="append"' )
+
+        size += stream.write( f'#EXTINF:-1 {" ".join( attributes )},{name}\n{link}\n' )
+
+    return size
+
+
+def main( argv = None ) -> int:
+    parser = argparse.ArgumentParser( description = 'Generates a large IPTV playlist for the benchmarks' )
+    parser.add_argument( 'filename' )
+    parser.add_argument( '--records', type = int, default = 100000 )
+    parser.add_argument( '--seed', type = int, default = 42 )
+    args = parser.parse_args( argv )
+    with open( args.filename, 'w', encoding = 'utf-8' ) as stream:
+        generate( stream, args.records, args.seed )
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
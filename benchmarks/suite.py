@@ -0,0 +1,208 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""Throughput benchmark suite of the M3U serializer
+
+Generates seeded playlists (see generate.py) and measures the phases parse, classify, filter and write.
+Each phase runs in its own process, so the peak RSS is of that phase only. The results are reported in
+records/sec, MB/sec and peak RSS in MB.
+
+    python benchmarks/suite.py --records 10000 1000000
+    python benchmarks/suite.py --records 100000 --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --records 100000 --baseline benchmarks/baseline.json
+
+With --baseline the results are compared with the stored baseline, a phase that is slower or uses more
+memory than the tolerance allows is reported as a regression and the exit code is 1. The baselines are
+machine dependent, store them on the machine that runs the comparison.
+
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+try:
+    import resource
+
+except ImportError:     # pragma: no cover, Windows
+    resource = None
+
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+from m3u_serializer import M3UDeserializer, M3USerializer, M3URecordEx, M3UPatternFilter
+from generate import generate
+
+PHASES      = ( 'parse', 'classify', 'filter', 'write' )
+FILTER      = [ 'NL', r'UK \| (News|Sports)', 'DE', r'EX-YU \| Series' ]
+
+
+def peak_rss() -> float:
+    """Gets the peak resident set size of this process in MB
+
+    :return:        MB or 0.0 when not available
+    """
+    if resource is None:
+        return 0.0
+
+    peak = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+    # Linux reports kB, macOS bytes
+    return peak / ( 1024 * 1024 ) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_phase( phase: str, filename: str ) -> dict:
+    """Runs one phase on the playlist
+
+    :param phase:       one of PHASES.
+    :param filename:    the playlist.
+    :return:            dict with records, seconds and bytes
+    """
+    size = os.path.getsize( filename )
+    if phase == 'parse':
+        start = time.perf_counter()
+        with M3UDeserializer( filename ) as deserializer:
+            count = sum( 1 for _ in deserializer )
+
+    elif phase == 'classify':
+        start = time.perf_counter()
+        with M3UDeserializer( filename, new_record = M3URecordEx ) as deserializer:
+            count = sum( 1 for _ in deserializer )
+
+    elif phase == 'filter':
+        whitelist = M3UPatternFilter( FILTER )
+        start = time.perf_counter()
+        with M3UDeserializer( filename ) as deserializer:
+            count = 0
+            for record in deserializer:
+                whitelist( record )
+                count += 1
+
+    elif phase == 'write':
+        with M3UDeserializer( filename ) as deserializer:
+            records = list( deserializer )
+
+        output = f'{filename}.out'
+        start = time.perf_counter()
+        with M3USerializer( output ) as serializer:
+            count = serializer.write_many( records )
+
+        size = os.path.getsize( output )
+        os.remove( output )
+
+    else:
+        raise ValueError( f'Unknown phase {phase}' )
+
+    return { 'records': count, 'seconds': time.perf_counter() - start, 'bytes': size }
+
+
+def measure( phase: str, filename: str, repeat: int ) -> dict:
+    """Measures the phase in a separate process, the best of `repeat` runs
+
+    :return:            dict with records_per_sec, mb_per_sec and peak_rss_mb
+    """
+    best = None
+    for _ in range( repeat ):
+        output = subprocess.run( [ sys.executable, os.path.abspath( __file__ ), '--phase', phase, filename ],
+                                 check = True, stdout = subprocess.PIPE, universal_newlines = True ).stdout
+        result = json.loads( output )
+        if best is None or result[ 'seconds' ] < best[ 'seconds' ]:
+            best = result
+
+    return {
+        'records':          best[ 'records' ],
+        'records_per_sec':  round( best[ 'records' ] / best[ 'seconds' ], 1 ),
+        'mb_per_sec':       round( best[ 'bytes' ] / ( 1024 * 1024 ) / best[ 'seconds' ], 2 ),
+        'peak_rss_mb':      round( best[ 'peak_rss_mb' ], 1 )
+    }
+
+
+def compare( results: dict, baseline: dict, tolerance: float ) -> list:
+    """Compares the results with the baseline
+
+    :return:            list of regression messages
+    """
+    regressions = []
+    for records, phases in results.items():
+        for phase, result in phases.items():
+            reference = baseline.get( records, {} ).get( phase )
+            if reference is None:
+                continue
+
+            if result[ 'records_per_sec' ] < reference[ 'records_per_sec' ] * ( 1 - tolerance ):
+                regressions.append( f'{phase} {records}: {result[ "records_per_sec" ]} records/sec, '
+                                    f'baseline {reference[ "records_per_sec" ]}' )
+
+            if reference[ 'peak_rss_mb' ] > 0 and result[ 'peak_rss_mb' ] > reference[ 'peak_rss_mb' ] * ( 1 + tolerance ):
+                regressions.append( f'{phase} {records}: peak RSS {result[ "peak_rss_mb" ]} MB, '
+                                    f'baseline {reference[ "peak_rss_mb" ]} MB' )
+
+    return regressions
+
+
+def main( argv = None ) -> int:
+    parser = argparse.ArgumentParser( description = 'Throughput benchmark suite of the M3U serializer' )
+    parser.add_argument( '--records', type = int, nargs = '+', default = [ 100000 ],
+                         help = 'playlist sizes, for example 10000 1000000 10000000' )
+    parser.add_argument( '--seed', type = int, default = 42 )
+    parser.add_argument( '--phases', nargs = '+', choices = PHASES, default = list( PHASES ) )
+    parser.add_argument( '--repeat', type = int, default = 1, help = 'runs per phase, the best run is reported' )
+    parser.add_argument( '--workdir', default = None, help = 'folder for the generated playlists, reused between runs' )
+    parser.add_argument( '--baseline', default = None, help = 'JSON file with the baseline to compare with' )
+    parser.add_argument( '--save-baseline', default = None, help = 'JSON file to store the results as baseline' )
+    parser.add_argument( '--tolerance', type = float, default = 0.25 )
+    parser.add_argument( '--phase', default = None, help = argparse.SUPPRESS )
+    parser.add_argument( 'filename', nargs = '?', help = argparse.SUPPRESS )
+    args = parser.parse_args( argv )
+    if args.phase is not None:
+        result = run_phase( args.phase, args.filename )
+        result[ 'peak_rss_mb' ] = peak_rss()
+        print( json.dumps( result ) )
+        return 0
+
+    workdir = args.workdir or tempfile.mkdtemp( prefix = 'm3u-benchmark-' )
+    results = {}
+    print( f'{"phase":<10} {"records":>10} {"records/sec":>14} {"MB/sec":>10} {"peak RSS MB":>12}' )
+    for records in args.records:
+        filename = os.path.join( workdir, f'playlist-{records}-{args.seed}.m3u' )
+        if not os.path.isfile( filename ):
+            with open( filename, 'w', encoding = 'utf-8' ) as stream:
+                generate( stream, records, args.seed )
+
+        results[ str( records ) ] = phases = {}
+        for phase in args.phases:
+            phases[ phase ] = result = measure( phase, filename, args.repeat )
+            print( f'{phase:<10} {result[ "records" ]:>10} {result[ "records_per_sec" ]:>14.1f} '
+                   f'{result[ "mb_per_sec" ]:>10.2f} {result[ "peak_rss_mb" ]:>12.1f}' )
+
+    if args.save_baseline is not None:
+        with open( args.save_baseline, 'w' ) as stream:
+            json.dump( results, stream, indent = 4 )
+
+    if args.baseline is not None:
+        with open( args.baseline ) as stream:
+            regressions = compare( results, json.load( stream ), args.tolerance )
+
+        for message in regressions:
+            print( f'REGRESSION {message}' )
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit( main() )
@@ -15,12 +15,27 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 """M3U Serializer is special for reading/writing M#U for IPTV.
-Currently the directives #EXTM3U and #EXTINF are supported.
+Besides #EXTM3U and #EXTINF the directives #PLAYLIST, #EXTGRP, #EXTVLCOPT and #KODIPROP are supported,
+HLS master and media playlists are parsed by M3UHlsPlaylist.
 Regular Expressions are used to deserialize the M3U data stream.
 This is done for speed as IPTV M3U files are quite big.
 
 """
 from m3u_serializer.version import __version__, __author__
 from m3u_serializer.reader import M3UDeserializer
-from m3u_serializer.record import M3URecord, M3URecordEx, M3uItemType
+from m3u_serializer.record import M3URecord, M3URecordEx, M3uItemType, M3UNormalizer, NORMALIZER
+from m3u_serializer.compact import M3UCompactRecord, M3UCompactRecordEx
 from m3u_serializer.writer import M3USerializer
+from m3u_serializer.cache import M3UFetchCache
+from m3u_serializer.session import M3USession, M3UTiming
+from m3u_serializer.columnar import M3UColumnarPlaylist
+from m3u_serializer.aio import M3UAsyncDeserializer, M3UAsyncPool
+from m3u_serializer.diff import M3UPlaylistDiff, M3UPlaylistSnapshot, M3UChangeSet
+from m3u_serializer.store import M3UPlaylistStore
+from m3u_serializer.index import M3UIndexedPlaylist
+from m3u_serializer.util import M3UPatternFilter
+from m3u_serializer.memo import M3ULRUCache
+from m3u_serializer.instrument import M3UInstrumentation, M3ULoggingSink, M3UPrometheusSink
+from m3u_serializer.merge import M3UPlaylistMerge, M3UBloomFilter
+from m3u_serializer.sort import M3UPlaylistSort
+from m3u_serializer.hls import M3UHlsPlaylist, M3UHlsLivePlaylist, M3UHlsSegment, M3UHlsKey, M3UHlsVariant
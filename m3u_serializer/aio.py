@@ -0,0 +1,294 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import asyncio
+import codecs
+import logging
+from typing import Union, Optional, AsyncIterator
+from m3u_serializer.record import M3URecord, media_extensions
+from m3u_serializer.parser import M3UChunkParser, M3UDirectives
+from m3u_serializer.reader import _items
+from m3u_serializer.exceptions import DownloadError, NotOpened, AlreadyOpened
+try:
+    import aiohttp
+
+except ImportError:
+    aiohttp = None
+
+
+log = logging.getLogger( 'M3U-Deserializer' )
+
+
+class M3UAsyncPool( object ):
+    """Shared HTTP session for the asynchronous deserializers
+
+    The session keeps a pool of connections per host, which are reused by all the deserializers
+    opened through the pool. The number of concurrent downloads is limited by 'limit'.
+
+    This requires the optional 'aiohttp' package.
+
+    """
+    def __init__( self, limit: int = 8, limit_per_host: int = 2, timeout: Optional[float] = 300 ):
+        """Constructor
+
+        :param limit:           maximum number of concurrent downloads.
+        :param limit_per_host:  maximum number of connections per host.
+        :param timeout:         total timeout of a download in seconds, None for no timeout.
+        """
+        if aiohttp is None:
+            raise ImportError( 'M3UAsyncPool requires the aiohttp package' )
+
+        self.__limit            = limit
+        self.__limit_per_host   = limit_per_host
+        self.__timeout          = timeout
+        self.__session          = None
+        self.__semaphore        = None
+        return
+
+    @property
+    def Session( self ):
+        """The aiohttp session, created on first use within the running event loop
+
+        :return:        aiohttp.ClientSession
+        """
+        if self.__session is None:
+            connector = aiohttp.TCPConnector( limit = self.__limit, limit_per_host = self.__limit_per_host )
+            self.__session = aiohttp.ClientSession( connector = connector,
+                                                    timeout = aiohttp.ClientTimeout( total = self.__timeout ) )
+
+        return self.__session
+
+    @property
+    def Semaphore( self ) -> asyncio.Semaphore:
+        """The semaphore limiting the number of concurrent downloads
+
+        :return:        asyncio.Semaphore
+        """
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore( self.__limit )
+
+        return self.__semaphore
+
+    def open( self, url: str, **kwargs ) -> 'M3UAsyncDeserializer':
+        """Creates an asynchronous deserializer for the `url` using this pool.
+
+        :param url:         web address of the M3U data stream.
+        :param kwargs:      the other parameters of M3UAsyncDeserializer.
+        :return:            M3UAsyncDeserializer
+        """
+        return M3UAsyncDeserializer( url, pool = self, **kwargs )
+
+    async def close( self ) -> None:
+        """Closes the session and its connections.
+
+        :return:            None
+        """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+        return
+
+    async def __aenter__( self ):
+        return self
+
+    async def __aexit__( self, exc_type, exc_value, exc_traceback ):
+        await self.close()
+        return
+
+
+class M3UAsyncDeserializer( object ):
+    """Asynchronous M3U deserializer for IPTV streams
+
+    The data is downloaded and parsed in chunks under asyncio, the records are the same M3URecord
+    or M3URecordEx objects as yielded by the M3UDeserializer.
+
+        async with M3UAsyncPool( limit = 4 ) as pool:
+            async with pool.open( url, new_record = M3URecordEx ) as deserializer:
+                async for record in deserializer:
+                    ...
+
+    Without a pool the deserializer creates its own pool, which is closed by close().
+
+    """
+    def __init__( self,
+                  url: str,
+                  store_filename: Optional[str] = None,
+                  media_files: Union[list,tuple,None] = None,
+                  new_record = M3URecord,
+                  chunk_size: int = 65536,
+                  encoding: Optional[str] = None,
+                  pool: Optional[M3UAsyncPool] = None,
+                  lazy_attributes: bool = False,
+                  keep_source: bool = False ):
+        """The constructor of the asynchronous deserializer
+
+        :param url:             web address of the M3U data stream.
+        :param store_filename:  optional filename to store the data in a file.
+        :param media_files:     list/tuple with additional extensions for recognizing movies and series.
+        :param new_record:      optional for overriding the default M3URecord class.
+        :param chunk_size:      size of the chunks read from the download.
+        :param encoding:        optional encoding of the data, default from the Content-Type header or utf-8.
+        :param pool:            optional M3UAsyncPool shared by several deserializers.
+        :param lazy_attributes: when True the records parse the attributes on first access, see M3URecord.
+        :param keep_source:     when True the records keep their original text, see M3URecord.Source.
+        """
+        self.__url              = url
+        self.__store_filename   = store_filename
+        self.__new_record       = new_record
+        self.__chunk_size       = chunk_size
+        self.__encoding         = encoding
+        self.__owner            = pool is None
+        self.__pool             = pool if pool is not None else M3UAsyncPool( limit = 1 )
+        self.__keep_source      = keep_source
+        self.__directives       = M3UDirectives()
+        self.__record_kwargs    = { 'media_files': list( media_extensions( media_files ) ) }
+        if lazy_attributes:
+            self.__record_kwargs[ 'lazy_attributes' ] = True
+
+        self.__response         = None
+        self.__acquired         = False
+        return
+
+    @property
+    def Header( self ) -> dict:
+        """The attributes of the #EXTM3U header, available after the iteration has started
+
+        :return:                dict with the attributes
+        """
+        return self.__directives.Header
+
+    @property
+    def Playlist( self ) -> Optional[str]:
+        """The title of the #PLAYLIST directive, available after the iteration has started
+
+        :return:                the title or None
+        """
+        return self.__directives.Playlist
+
+    async def open( self ) -> None:
+        """Waits for a free download slot of the pool and starts the download.
+
+        :return:                None
+        """
+        if self.__response is not None:
+            raise AlreadyOpened()
+
+        log.info( f'Downloading URL {self.__url}' )
+        await self.__pool.Semaphore.acquire()
+        self.__acquired = True
+        try:
+            self.__response = await self.__pool.Session.get( self.__url )
+            if self.__response.status != 200:
+                log.error( f'Download error {self.__response.status}' )
+                raise DownloadError( self.__response.status )
+
+        except BaseException:
+            await self.close()
+            raise
+
+        return
+
+    async def close( self ) -> None:
+        """Releases the download and the slot of the pool, the own pool is closed.
+
+        :return:                None
+        """
+        if self.__response is not None:
+            self.__response.release()
+            self.__response = None
+
+        if self.__acquired:
+            self.__pool.Semaphore.release()
+            self.__acquired = False
+
+        if self.__owner:
+            await self.__pool.close()
+
+        return
+
+    async def __chunks( self ) -> AsyncIterator[str]:
+        """Yields the decoded data in chunks while downloading.
+
+        :return:                asynchronous iterator of str chunks
+        """
+        encoding = self.__encoding or self.__response.charset or 'utf-8'
+        decoder = codecs.getincrementaldecoder( encoding )( errors = 'replace' )
+        store = open( self.__store_filename, 'wb' ) if isinstance( self.__store_filename, str ) else None
+        try:
+            async for data in self.__response.content.iter_chunked( self.__chunk_size ):
+                if store is not None:
+                    store.write( data )
+
+                yield decoder.decode( data )
+
+            yield decoder.decode( b'', final = True )
+
+        finally:
+            if store is not None:
+                store.close()
+
+        return
+
+    async def __aiter__( self ) -> AsyncIterator[M3URecord]:
+        """This iterate through the M3U data while downloading, and yields `M3URecord` class
+
+        :return:                asynchronous iterator of records
+        """
+        if self.__response is None:
+            raise NotOpened()
+
+        parser = M3UChunkParser()
+        self.__directives = M3UDirectives()
+        channelNumber = 1
+        async for chunk in self.__chunks():
+            for record in self.__records( parser.feed( chunk ), channelNumber ):
+                channelNumber += 1
+                yield record
+
+        for record in self.__records( parser.finish(), channelNumber ):
+            yield record
+
+        return
+
+    def __records( self, matches, channelNumber: int ):
+        """Creates the records of the matches
+
+        :param matches:         iterator of match objects.
+        :param channelNumber:   the channel number of the first record.
+        :return:                iterator of records
+        """
+        for item, source, extras in _items( matches, None, self.__keep_source, self.__directives ):
+            record = self.__new_record( **self.__record_kwargs )
+            if extras is not None:
+                record.setDirectives( *extras )
+
+            record.set( *item, channel = channelNumber )
+            if source is not None:
+                record.setSource( source )
+
+            channelNumber += 1
+            yield record
+
+        return
+
+    async def __aenter__( self ):
+        await self.open()
+        return self
+
+    async def __aexit__( self, exc_type, exc_value, exc_traceback ):
+        await self.close()
+        return
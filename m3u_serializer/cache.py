@@ -0,0 +1,197 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Optional
+from contextlib import contextmanager
+
+log = logging.getLogger( 'M3U-Cache' )
+
+
+class M3UFetchCache( object ):
+    """On-disk cache for downloaded M3U data streams
+
+    The body of each URL is stored in the cache directory together with the validators (ETag and
+    Last-Modified) of the response. The next download of the same URL is sent as a conditional request,
+    when the server answers with 304 Not Modified the data is read from the cached copy.
+
+    The hits and misses are counted, see statistics().
+
+    """
+    def __init__( self, directory: str ):
+        """Constructor
+
+        :param directory:   directory where the cached data is stored, created when missing.
+        """
+        self.__directory    = directory
+        self.__lock         = threading.Lock()
+        self.__hits         = 0
+        self.__misses       = 0
+        self.__bytes_saved  = 0
+        self.__bytes_stored = 0
+        os.makedirs( directory, exist_ok = True )
+        return
+
+    def __key( self, url: str ) -> str:
+        return os.path.join( self.__directory, hashlib.sha256( url.encode( 'utf-8' ) ).hexdigest() )
+
+    def __load( self, url: str ) -> Optional[dict]:
+        """Loads the meta data of the cached `url`, None when not in the cache.
+
+        :param url:         URL of the data stream.
+        :return:            dict with 'url', 'etag', 'last_modified', 'encoding' and 'size'
+        """
+        key = self.__key( url )
+        if not os.path.isfile( key + '.m3u' ):
+            return None
+
+        try:
+            with open( key + '.json', 'r' ) as stream:
+                meta = json.load( stream )
+
+        except ( OSError, ValueError ):
+            return None
+
+        if meta.get( 'url' ) != url:
+            return None
+
+        return meta
+
+    def filename( self, url: str ) -> str:
+        """Gets the filename of the cached data of `url`.
+
+        :param url:         URL of the data stream.
+        :return:            filename
+        """
+        return self.__key( url ) + '.m3u'
+
+    def headers( self, url: str ) -> dict:
+        """Gets the headers for a conditional request of the `url`.
+
+        :param url:         URL of the data stream.
+        :return:            dict with If-None-Match and/or If-Modified-Since, empty when not cached.
+        """
+        headers = {}
+        meta = self.__load( url )
+        if meta is not None:
+            if meta.get( 'etag' ):
+                headers[ 'If-None-Match' ] = meta[ 'etag' ]
+
+            if meta.get( 'last_modified' ):
+                headers[ 'If-Modified-Since' ] = meta[ 'last_modified' ]
+
+        return headers
+
+    def hit( self, url: str ) -> tuple:
+        """Registers a cache hit of the `url`, the server answered 304 Not Modified.
+
+        :param url:         URL of the data stream.
+        :return:            tuple ( <filename>, <encoding> ) of the cached data.
+        """
+        meta = self.__load( url ) or {}
+        with self.__lock:
+            self.__hits += 1
+            self.__bytes_saved += meta.get( 'size', 0 )
+
+        log.info( f'Cache hit {url}' )
+        return self.filename( url ), meta.get( 'encoding', 'utf-8' )
+
+    @contextmanager
+    def store( self, url: str, headers, encoding: str ):
+        """Registers a cache miss of the `url` and stores the downloaded data
+
+        The data is written to a temporary file which replaces the cached data when the context
+        exits without an exception. The data is only stored when the response has validators.
+
+        :param url:         URL of the data stream.
+        :param headers:     response headers of the download.
+        :param encoding:    encoding of the data.
+        :return:            binary stream to write the data to, or None when not cached.
+        """
+        meta = {
+            'url':              url,
+            'etag':             headers.get( 'ETag' ),
+            'last_modified':    headers.get( 'Last-Modified' ),
+            'encoding':         encoding,
+            'size':             0
+        }
+        with self.__lock:
+            self.__misses += 1
+
+        log.info( f'Cache miss {url}' )
+        if meta[ 'etag' ] is None and meta[ 'last_modified' ] is None:
+            yield None
+            return
+
+        key = self.__key( url )
+        stream = open( key + '.m3u.tmp', 'wb' )
+        try:
+            yield stream
+            meta[ 'size' ] = stream.tell()
+            stream.close()
+            os.replace( key + '.m3u.tmp', key + '.m3u' )
+            with open( key + '.json.tmp', 'w' ) as meta_stream:
+                json.dump( meta, meta_stream )
+
+            os.replace( key + '.json.tmp', key + '.json' )
+
+        except BaseException:
+            stream.close()
+            os.remove( key + '.m3u.tmp' )
+            raise
+
+        with self.__lock:
+            self.__bytes_stored += meta[ 'size' ]
+
+        return
+
+    def remove( self, url: str ) -> None:
+        """Removes the cached data of the `url`.
+
+        :param url:         URL of the data stream.
+        :return:            None
+        """
+        key = self.__key( url )
+        for filename in ( key + '.m3u', key + '.json' ):
+            if os.path.isfile( filename ):
+                os.remove( filename )
+
+        return
+
+    def statistics( self ) -> dict:
+        """Gets the statistics of the cache
+
+        :return:            dict with 'hits', 'misses', 'bytes_saved' and 'bytes_stored'
+        """
+        with self.__lock:
+            return {
+                'hits':         self.__hits,
+                'misses':       self.__misses,
+                'bytes_saved':  self.__bytes_saved,
+                'bytes_stored': self.__bytes_stored
+            }
+
+    @property
+    def Hits( self ) -> int:
+        return self.__hits
+
+    @property
+    def Misses( self ) -> int:
+        return self.__misses
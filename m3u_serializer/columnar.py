@@ -0,0 +1,318 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from array import array
+from collections import Counter
+from itertools import compress
+from typing import Iterable, Iterator, Optional, Callable
+from m3u_serializer.record import M3URecord, M3uItemType, RE_ATTRIBUTE
+
+
+class _StringColumn( object ):
+    """Column with high cardinality strings, stored as UTF-8 in a single buffer with an offset table.
+
+    """
+    def __init__( self ):
+        self.__buffer   = bytearray()
+        self.__offsets  = array( 'Q', [ 0 ] )
+        return
+
+    def append( self, value: str ) -> None:
+        self.__buffer += value.encode( 'utf-8' )
+        self.__offsets.append( len( self.__buffer ) )
+        return
+
+    def __len__( self ) -> int:
+        return len( self.__offsets ) - 1
+
+    def __getitem__( self, index: int ) -> str:
+        return self.__buffer[ self.__offsets[ index ]: self.__offsets[ index + 1 ] ].decode( 'utf-8' )
+
+    def __iter__( self ) -> Iterator[str]:
+        buffer, offsets = self.__buffer, self.__offsets
+        for index in range( len( offsets ) - 1 ):
+            yield buffer[ offsets[ index ]: offsets[ index + 1 ] ].decode( 'utf-8' )
+
+        return
+
+    def match( self, predicate: Callable, selection: Optional[Iterable[int]] = None ) -> array:
+        """Gets the indexes of the rows where the `predicate` is true
+
+        :param predicate:   callable with the value, returns True to select the row.
+        :param selection:   optional indexes to check, default all the rows.
+        :return:            array with the indexes
+        """
+        if selection is None:
+            return array( 'I', compress( range( len( self ) ), map( predicate, self ) ) )
+
+        return array( 'I', [ index for index in selection if predicate( self[ index ] ) ] )
+
+
+class _CategoryColumn( object ):
+    """Column with low cardinality values, stored as codes into a table of unique values.
+
+    """
+    def __init__( self ):
+        self.__values   = []
+        self.__index    = {}
+        self.__codes    = array( 'I' )
+        return
+
+    def append( self, value ) -> None:
+        code = self.__index.get( value )
+        if code is None:
+            code = self.__index[ value ] = len( self.__values )
+            self.__values.append( value )
+
+        self.__codes.append( code )
+        return
+
+    def __len__( self ) -> int:
+        return len( self.__codes )
+
+    def __getitem__( self, index: int ):
+        return self.__values[ self.__codes[ index ] ]
+
+    def __iter__( self ) -> Iterator:
+        return map( self.__values.__getitem__, self.__codes )
+
+    @property
+    def Categories( self ) -> list:
+        return list( self.__values )
+
+    def match( self, predicate: Callable, selection: Optional[Iterable[int]] = None ) -> array:
+        """Gets the indexes of the rows where the `predicate` is true
+
+        The predicate is evaluated once per unique value, the rows are selected on their codes.
+
+        :param predicate:   callable with the value, returns True to select the row.
+        :param selection:   optional indexes to check, default all the rows.
+        :return:            array with the indexes
+        """
+        flags = bytes( bool( predicate( value ) ) for value in self.__values )
+        if selection is None:
+            return array( 'I', compress( range( len( self.__codes ) ), map( flags.__getitem__, self.__codes ) ) )
+
+        codes = self.__codes
+        return array( 'I', [ index for index in selection if flags[ codes[ index ] ] ] )
+
+    def groups( self, selection: Optional[Iterable[int]] = None ) -> dict:
+        """Groups the row indexes by value
+
+        :param selection:   optional indexes to group, default all the rows.
+        :return:            dict with value: array of indexes
+        """
+        buckets = [ array( 'I' ) for _ in self.__values ]
+        codes = self.__codes
+        for index in ( range( len( codes ) ) if selection is None else selection ):
+            buckets[ codes[ index ] ].append( index )
+
+        return { value: bucket for value, bucket in zip( self.__values, buckets ) if len( bucket ) > 0 }
+
+    def counts( self, selection: Optional[Iterable[int]] = None ) -> dict:
+        """Counts the rows by value
+
+        :param selection:   optional indexes to count, default all the rows.
+        :return:            dict with value: count
+        """
+        codes = self.__codes if selection is None else map( self.__codes.__getitem__, selection )
+        return { self.__values[ code ]: count for code, count in Counter( codes ).items() }
+
+
+class M3UColumnarPlaylist( object ):
+    """Columnar container of a playlist, for filtering and grouping large playlists.
+
+    Each field is stored in its own compact column, instead of a M3URecordEx object per record.
+    The low cardinality columns (duration, group, type, country, season and episode) are stored as
+    codes into a table of unique values, the other columns as UTF-8 strings in a single buffer.
+    The attributes other than group-title, tvg-id and tvg-logo are kept as text in the 'attributes' column.
+    The #EXTGRP group is kept in the 'ext_group' column and the option lines in the 'options' column.
+
+    The filters return arrays of row indexes (selections), which can be passed to the next filter,
+    groupBy(), records() or write().
+
+        playlist = M3UColumnarPlaylist( M3UDeserializer( 'input.m3u', new_record = M3URecordEx ) )
+        selection = playlist.where( country = 'NL', type = M3uItemType.MOVIE )
+        for group, rows in playlist.groupBy( 'group', selection ).items():
+            ...
+
+    """
+    CATEGORY_COLUMNS    = ( 'duration', 'group', 'type', 'country', 'season', 'episode', 'ext_group' )
+    STRING_COLUMNS      = ( 'name', 'link', 'tvg_id', 'tvg_logo', 'attributes', 'options' )
+    __ATTRIBUTES        = { 'group-title', 'tvg-id', 'tvg-logo' }
+
+    def __init__( self, records: Optional[Iterable[M3URecord]] = None ):
+        """Constructor
+
+        :param records:     optional iterable of records, for example the M3UDeserializer.
+        """
+        self.__columns = {}
+        for name in self.CATEGORY_COLUMNS:
+            self.__columns[ name ] = _CategoryColumn()
+
+        for name in self.STRING_COLUMNS:
+            self.__columns[ name ] = _StringColumn()
+
+        if records is not None:
+            self.extend( records )
+
+        return
+
+    def append( self, record: M3URecord ) -> None:
+        """Appends the record to the playlist
+
+        :param record:      M3URecord or inherited class
+        :return:            None
+        """
+        columns = self.__columns
+        columns[ 'duration' ].append( str( record.Duration ) )
+        columns[ 'name' ].append( record.Name )
+        columns[ 'link' ].append( record.Link )
+        columns[ 'group' ].append( record.Group )
+        columns[ 'tvg_id' ].append( record.TvgId )
+        columns[ 'tvg_logo' ].append( record.TvgLogo )
+        columns[ 'type' ].append( getattr( record, 'Type', M3uItemType.NONE ) )
+        columns[ 'country' ].append( getattr( record, 'Country', '' ) )
+        columns[ 'season' ].append( getattr( record, 'Season', '' ) )
+        columns[ 'episode' ].append( getattr( record, 'Episode', '' ) )
+        columns[ 'ext_group' ].append( getattr( record, 'ExtGroup', None ) or '' )
+        columns[ 'options' ].append( '\n'.join( getattr( record, 'Options', () ) ) )
+        attributes = [ f'{label}={value}' for label, value in RE_ATTRIBUTE.findall( record.getAttributes() )
+                       if label not in self.__ATTRIBUTES ]
+        columns[ 'attributes' ].append( ' '.join( attributes ) )
+        return
+
+    def extend( self, records: Iterable[M3URecord] ) -> None:
+        """Appends the records to the playlist
+
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :return:            None
+        """
+        for record in records:
+            self.append( record )
+
+        return
+
+    def __len__( self ) -> int:
+        return len( self.__columns[ 'link' ] )
+
+    def column( self, name: str ):
+        """Gets the column `name`, supports len(), indexing and iteration.
+
+        :param name:        name of the column, see CATEGORY_COLUMNS and STRING_COLUMNS.
+        :return:            the column
+        """
+        return self.__columns[ name ]
+
+    def categories( self, name: str ) -> list:
+        """Gets the unique values of the category column `name`
+
+        :param name:        name of the column, see CATEGORY_COLUMNS.
+        :return:            list of values
+        """
+        return self.__columns[ name ].Categories
+
+    def where( self, selection: Optional[Iterable[int]] = None, **conditions ) -> array:
+        """Selects the rows matching all the conditions.
+
+        A condition is column = value, column = list/tuple/set of values, or column = callable
+        which is called with the value of the column.
+
+        :param selection:   optional row indexes to filter, default all the rows.
+        :param conditions:  the conditions per column.
+        :return:            array with the indexes of the selected rows
+        """
+        for name, condition in conditions.items():
+            if callable( condition ):
+                predicate = condition
+
+            elif isinstance( condition, ( list, tuple, set, frozenset ) ):
+                predicate = frozenset( condition ).__contains__
+
+            else:
+                # Not condition.__eq__, which gives the truthy NotImplemented for a value of another type
+                def predicate( value, condition = condition ) -> bool:
+                    return value == condition
+
+            selection = self.__columns[ name ].match( predicate, selection )
+
+        if selection is None:
+            selection = array( 'I', range( len( self ) ) )
+
+        return selection
+
+    def groupBy( self, name: str, selection: Optional[Iterable[int]] = None ) -> dict:
+        """Groups the rows by the value of the category column `name`
+
+        :param name:        name of the column, see CATEGORY_COLUMNS.
+        :param selection:   optional row indexes to group, default all the rows.
+        :return:            dict with value: array of row indexes
+        """
+        return self.__columns[ name ].groups( selection )
+
+    def counts( self, name: str, selection: Optional[Iterable[int]] = None ) -> dict:
+        """Counts the rows by the value of the category column `name`
+
+        :param name:        name of the column, see CATEGORY_COLUMNS.
+        :param selection:   optional row indexes to count, default all the rows.
+        :return:            dict with value: count
+        """
+        return self.__columns[ name ].counts( selection )
+
+    def record( self, index: int ) -> M3URecord:
+        """Creates a M3URecord of the row `index`
+
+        :param index:       row index.
+        :return:            M3URecord
+        """
+        columns = self.__columns
+        record = M3URecord()
+        record.set( columns[ 'duration' ][ index ], columns[ 'attributes' ][ index ],
+                    columns[ 'name' ][ index ], columns[ 'link' ][ index ] )
+        group, options = columns[ 'ext_group' ][ index ], columns[ 'options' ][ index ]
+        record.setDirectives( group or None, options.split( '\n' ) if options != '' else () )
+        for label, name in ( ( 'group-title', 'group' ), ( 'tvg-id', 'tvg_id' ), ( 'tvg-logo', 'tvg_logo' ) ):
+            value = columns[ name ][ index ]
+            # The group of the #EXTGRP directive is not set as group-title
+            if value != '' and ( label != 'group-title' or value != group ):
+                record.attribute( label, value )
+
+        return record
+
+    def records( self, selection: Optional[Iterable[int]] = None ) -> Iterator[M3URecord]:
+        """Creates the M3URecords of the selected rows
+
+        :param selection:   optional row indexes, default all the rows.
+        :return:            iterator of M3URecord
+        """
+        for index in ( range( len( self ) ) if selection is None else selection ):
+            yield self.record( index )
+
+        return
+
+    def write( self, serializer, selection: Optional[Iterable[int]] = None ) -> int:
+        """Writes the selected rows through the M3USerializer
+
+        :param serializer:  the opened M3USerializer.
+        :param selection:   optional row indexes, default all the rows.
+        :return:            number of written records
+        """
+        count = 0
+        for record in self.records( selection ):
+            serializer.write( record )
+            count += 1
+
+        return count
@@ -0,0 +1,144 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import sys
+import json
+from functools import lru_cache
+from typing import Union
+from m3u_serializer.record import M3URecordBase, M3URecordExBase, RE_ATTRIBUTE, NORMALIZER
+from m3u_serializer.exceptions import InvalidParameter
+
+
+@lru_cache( maxsize = 1024 )
+def _shape( keys: tuple ) -> tuple:
+    """Gets the tuple of attribute keys shared by the records with the same attributes, the keys are interned.
+
+    The cache is bounded, a playlist with many different attribute sets only shares the most recent ones.
+
+    :param keys:        tuple with the attribute keys.
+    :return:            the shared tuple
+    """
+    return tuple( sys.intern( key ) for key in keys )
+
+
+class M3UCompactRecord( M3URecordBase ):
+    """Contains the data elements of the M3U record, compact version of M3URecord
+
+    The record has no instance dictionary, the attributes are stored as a tuple of values together
+    with a tuple of (interned) keys that is shared by all records with the same attributes.
+    This is for playlists with millions of records, the property API is the same as M3URecord, see M3URecordBase.
+
+    Approximate size per record, measured with tracemalloc on CPython 3.11 for a record with
+    tvg-id, tvg-name, tvg-logo and group-title, including the strings of the record:
+
+        M3URecord           ~ 760 bytes
+        M3UCompactRecord    ~ 390 bytes
+
+    """
+    __slots__ = ( '__keys', '__values' )
+
+    def __init__( self, lazy_attributes: bool = False, **kwargs ):
+        """Constructor
+
+        :param lazy_attributes: not supported, the attributes are always parsed into the tuple of values.
+        """
+        if lazy_attributes:
+            raise InvalidParameter( 'M3UCompactRecord does not support lazy_attributes' )
+
+        super( M3UCompactRecord, self ).__init__()
+        self.__keys         = ()
+        self.__values       = ()
+        return
+
+    def _clearAttributes( self ) -> None:
+        self.__keys         = ()
+        self.__values       = ()
+        return
+
+    def _getAttribute( self, key: str, default = None ):
+        if key in self.__keys:
+            return self.__values[ self.__keys.index( key ) ]
+
+        return default
+
+    def _setAttribute( self, key: str, value ) -> None:
+        if key in self.__keys:
+            index = self.__keys.index( key )
+            self.__values = self.__values[ :index ] + ( value, ) + self.__values[ index + 1: ]
+
+        else:
+            self.__keys = _shape( self.__keys + ( key, ) )
+            self.__values = self.__values + ( value, )
+
+        return
+
+    def _setAttributes( self, attributes: Union[str,dict] ) -> None:
+        """Merges the attributes from the attribute string or a dictionary into the shared keys and tuple of values
+
+        :param attributes:  the attribute string or dictionary with the attributes
+        :return:            None
+        """
+        merged = dict( zip( self.__keys, self.__values ) )
+        if isinstance( attributes, str ):
+            for label, value in RE_ATTRIBUTE.findall( attributes ):
+                label = label.strip()
+                value = value.replace( '"', '' ).strip()
+                merged[ label ] = NORMALIZER.group( value ) if label == 'group-title' else value
+
+        elif isinstance( attributes, dict ):
+            merged.update( attributes )
+
+        self.__keys         = _shape( tuple( merged ) )
+        self.__values       = tuple( merged.values() )
+        return
+
+    def getAttributes( self ) -> str:
+        """This member functions returns a string with attributes and values for writing.
+
+        :return:    string
+        """
+        return ' '.join( f'{attr}="{value}"' for attr, value in zip( self.__keys, self.__values ) )
+
+    def jsonToAttributes( self, data ):
+        attributes = json.loads( data )
+        self.__keys         = _shape( tuple( attributes ) )
+        self.__values       = tuple( attributes.values() )
+        self.setSource( None )
+        return
+
+    def attributesSize( self ) -> int:
+        """The length of the attributes text, without building it.
+
+        :return:    number of characters
+        """
+        return sum( len( attr ) + len( str( value ) ) + 4 for attr, value in zip( self.__keys, self.__values ) )
+
+    def attributesToJson( self ):
+        return json.dumps( dict( zip( self.__keys, self.__values ) ) )
+
+
+class M3UCompactRecordEx( M3URecordExBase, M3UCompactRecord ):
+    """Compact version of M3URecordEx, with the same detection of series, movies and TV channels.
+
+    The media extensions are shared by all the records with the same configuration, not copied per record.
+
+    Approximate size per record, measured as for M3UCompactRecord:
+
+        M3URecordEx         ~ 1110 bytes
+        M3UCompactRecordEx  ~ 690 bytes
+
+    """
+    __slots__ = ( '_media_files', '_type', '_season', '_episode', '_genre', '_country', '_number' )
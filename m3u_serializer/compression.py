@@ -0,0 +1,202 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import io
+import bz2
+import gzip
+import lzma
+import zlib
+from typing import Optional, Iterator
+from m3u_serializer.exceptions import InvalidParameter
+try:
+    import zstandard
+
+except ImportError:
+    zstandard = None
+
+
+COMPRESSIONS    = ( 'gzip', 'bz2', 'xz', 'zstd' )
+EXTENSIONS      = {
+    '.gz':      'gzip',
+    '.bz2':     'bz2',
+    '.xz':      'xz',
+    '.lzma':    'xz',
+    '.zst':     'zstd',
+}
+MAGICS          = (
+    ( b'\x1f\x8b', 'gzip' ),
+    ( b'BZh', 'bz2' ),
+    ( b'\xfd7zXZ\x00', 'xz' ),
+    ( b'\x28\xb5\x2f\xfd', 'zstd' ),
+)
+MAGIC_SIZE      = 6
+
+
+def detect( filename: Optional[str] = None, header: Optional[bytes] = None ) -> Optional[str]:
+    """Detects the compression by the extension of the filename or the magic bytes
+
+    :param filename:    optional filename, the extension is checked first.
+    :param header:      optional first bytes of the data, at least MAGIC_SIZE bytes.
+    :return:            'gzip', 'bz2', 'xz', 'zstd' or None when not compressed
+    """
+    if filename is not None:
+        for extension, compression in EXTENSIONS.items():
+            if filename.lower().endswith( extension ):
+                return compression
+
+    if header is not None:
+        for magic, compression in MAGICS:
+            if header.startswith( magic ):
+                return compression
+
+    return None
+
+
+def detect_file( filename: str ) -> Optional[str]:
+    """Detects the compression of the file by its extension or magic bytes
+
+    :param filename:    the filename.
+    :return:            'gzip', 'bz2', 'xz', 'zstd' or None when not compressed
+    """
+    compression = detect( filename )
+    if compression is None:
+        with open( filename, 'rb' ) as stream:
+            compression = detect( header = stream.read( MAGIC_SIZE ) )
+
+    return compression
+
+
+def _zstandard():
+    if zstandard is None:
+        raise InvalidParameter( 'zstd compression requires the optional zstandard package' )
+
+    return zstandard
+
+
+def open_compressed( filename: str, mode: str = 'rb', compression: Optional[str] = None, level: Optional[int] = None,
+                     encoding: Optional[str] = None ):
+    """Opens the compressed file for reading or writing, the data is compressed or decompressed while streaming
+
+    :param filename:    the filename.
+    :param mode:        'rb', 'wb', 'rt' or 'wt'.
+    :param compression: 'gzip', 'bz2', 'xz', 'zstd' or None for a plain file.
+    :param level:       optional compression level for writing.
+    :param encoding:    the encoding for the text modes.
+    :return:            file object
+    """
+    if compression is None:
+        return open( filename, mode, encoding = encoding ) if 't' in mode else open( filename, mode )
+
+    binary_mode = mode.replace( 't', '' ).replace( 'b', '' ) + 'b'
+    if compression == 'gzip':
+        stream = gzip.open( filename, binary_mode, compresslevel = 9 if level is None else level )
+
+    elif compression == 'bz2':
+        stream = bz2.open( filename, binary_mode, compresslevel = 9 if level is None else level )
+
+    elif compression == 'xz':
+        stream = lzma.open( filename, binary_mode, preset = level if binary_mode == 'wb' else None )
+
+    elif compression == 'zstd':
+        if binary_mode == 'wb':
+            stream = _zstandard().ZstdCompressor( level = 3 if level is None else level ).stream_writer( open( filename, 'wb' ) )
+
+        else:
+            stream = _zstandard().ZstdDecompressor().stream_reader( open( filename, 'rb' ), read_across_frames = True,
+                                                                   closefd = True )
+
+    else:
+        raise InvalidParameter( f'Unknown compression {compression}, expected one of {COMPRESSIONS}' )
+
+    if 't' in mode:
+        return io.TextIOWrapper( stream, encoding = encoding or 'utf-8' )
+
+    return stream
+
+
+def _decompressor( compression: str ):
+    """Creates the incremental decompressor object
+
+    :param compression: 'gzip', 'bz2', 'xz' or 'zstd'.
+    :return:            object with decompress(), eof and unused_data
+    """
+    if compression == 'gzip':
+        return zlib.decompressobj( 16 + zlib.MAX_WBITS )
+
+    if compression == 'bz2':
+        return bz2.BZ2Decompressor()
+
+    if compression == 'xz':
+        return lzma.LZMADecompressor()
+
+    return _zstandard().ZstdDecompressor().decompressobj()
+
+
+def decompress_chunks( chunks: Iterator[bytes], compression: Optional[str] = None ) -> Iterator[bytes]:
+    """Decompresses the raw chunks while streaming
+
+    When compression is None it is detected from the magic bytes of the first chunk,
+    data without a known magic is passed unchanged. Concatenated streams, as written by
+    'cat a.gz b.gz', are decompressed as a whole.
+
+    :param chunks:      iterator of raw bytes chunks.
+    :param compression: optional 'gzip', 'bz2', 'xz' or 'zstd'.
+    :return:            iterator of decompressed bytes chunks
+    """
+    chunks = iter( chunks )
+    head = b''
+    for chunk in chunks:
+        head += chunk
+        if len( head ) >= MAGIC_SIZE:
+            break
+
+    if compression is None:
+        compression = detect( header = head )
+
+    if compression is None:
+        if head != b'':
+            yield head
+
+        yield from chunks
+        return
+
+    decompressor = _decompressor( compression )
+    for data in _prepend( head, chunks ):
+        while data != b'':
+            output = decompressor.decompress( data )
+            if output != b'':
+                yield output
+
+            data = b''
+            if getattr( decompressor, 'eof', False ):
+                # Next stream of concatenated data
+                data = decompressor.unused_data
+                decompressor = _decompressor( compression )
+
+    if hasattr( decompressor, 'flush' ):
+        output = decompressor.flush()
+        if output != b'':
+            yield output
+
+    return
+
+
+def _prepend( head: bytes, chunks: Iterator[bytes] ) -> Iterator[bytes]:
+    if head != b'':
+        yield head
+
+    yield from chunks
+    return
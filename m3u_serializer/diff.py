@@ -0,0 +1,275 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import sys
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Union, Callable, Optional
+from m3u_serializer.record import M3URecord
+from m3u_serializer.exceptions import InvalidParameter
+
+
+def _digest( text: str ) -> int:
+    return int.from_bytes( hashlib.blake2b( text.encode( 'utf-8' ), digest_size = 8 ).digest(), 'little' )
+
+
+_FIELDS     = {
+    'link':     lambda record: record.Link,
+    'name':     lambda record: record.Name,
+    'group':    lambda record: record.Group,
+    'duration': lambda record: str( record.Duration ),
+}
+
+
+def _field( name: str ) -> Callable:
+    if name in _FIELDS:
+        return _FIELDS[ name ]
+
+    return lambda record: record.attribute( name ) or ''
+
+
+def record_key( key: Union[str,tuple,list,Callable] ) -> Callable:
+    """Creates the function that gets the identity of a record
+
+    :param key:     a field name ('link', 'name', 'group', 'duration' or an attribute name like 'tvg-id'),
+                    a tuple of field names or a callable which returns the identity of the record as a str.
+    :return:        callable with the record, returns the identity as a str
+    """
+    if callable( key ):
+        return key
+
+    if isinstance( key, str ):
+        return _field( key )
+
+    if isinstance( key, ( tuple, list ) ) and len( key ) > 0:
+        fields = [ _field( name ) for name in key ]
+        return lambda record: '\x1f'.join( field( record ) for field in fields )
+
+    raise InvalidParameter( 'The key must be a field name, tuple of field names or callable' )
+
+
+class M3UPlaylistSnapshot( object ):
+    """Snapshot of a loaded playlist for M3UPlaylistDiff
+
+    The snapshot holds per record only a 64 bits hash of the identity, a 64 bits hash of the content
+    and the identity itself, in sorted arrays. It can be saved to and loaded from a binary file.
+
+    """
+    __MAGIC     = b'M3UD'
+    __VERSION   = 1
+    __HEADER    = struct.Struct( '<4sIQ' )
+
+    def __init__( self, keys: Optional[array] = None, hashes: Optional[array] = None,
+                  offsets: Optional[array] = None, identities: bytes = b'' ):
+        """Constructor, without parameters an empty snapshot
+
+        :param keys:        sorted array of the identity hashes.
+        :param hashes:      array of the content hashes, in the same order.
+        :param offsets:     array of the offsets of the identities in 'identities', in the same order.
+        :param identities:  the UTF-8 encoded identities.
+        """
+        self.__keys         = keys if keys is not None else array( 'Q' )
+        self.__hashes       = hashes if hashes is not None else array( 'Q' )
+        self.__offsets      = offsets if offsets is not None else array( 'Q', [ 0 ] )
+        self.__identities   = identities
+        return
+
+    def __len__( self ) -> int:
+        return len( self.__keys )
+
+    def find( self, key: int ) -> int:
+        """Finds the position of the identity hash `key`
+
+        :param key:         identity hash.
+        :return:            the position or -1 when not found
+        """
+        index = bisect_left( self.__keys, key )
+        if index < len( self.__keys ) and self.__keys[ index ] == key:
+            return index
+
+        return -1
+
+    def hash( self, index: int ) -> int:
+        return self.__hashes[ index ]
+
+    def identity( self, index: int ) -> str:
+        return self.__identities[ self.__offsets[ index ]: self.__offsets[ index + 1 ] ].decode( 'utf-8' )
+
+    def save( self, filename: str ) -> None:
+        """Saves the snapshot to the binary file `filename`
+
+        :param filename:    the filename of the snapshot.
+        :return:            None
+        """
+        with open( filename, 'wb' ) as stream:
+            stream.write( self.__HEADER.pack( self.__MAGIC, self.__VERSION, len( self.__keys ) ) )
+            for data in ( self.__keys, self.__hashes, self.__offsets ):
+                if sys.byteorder != 'little':
+                    data = array( 'Q', data )
+                    data.byteswap()
+
+                data.tofile( stream )
+
+            stream.write( self.__identities )
+
+        return
+
+    @classmethod
+    def load( cls, filename: str ) -> 'M3UPlaylistSnapshot':
+        """Loads the snapshot from the binary file `filename`
+
+        :param filename:    the filename of the snapshot.
+        :return:            M3UPlaylistSnapshot
+        """
+        with open( filename, 'rb' ) as stream:
+            magic, version, count = cls.__HEADER.unpack( stream.read( cls.__HEADER.size ) )
+            if magic != cls.__MAGIC or version != cls.__VERSION:
+                raise InvalidParameter( f'{filename} is not a playlist snapshot' )
+
+            arrays = []
+            for size in ( count, count, count + 1 ):
+                data = array( 'Q' )
+                data.fromfile( stream, size )
+                if sys.byteorder != 'little':
+                    data.byteswap()
+
+                arrays.append( data )
+
+            return cls( *arrays, stream.read() )
+
+
+class M3UChangeSet( object ):
+    """The changes between the previous and the current load of a playlist
+
+    """
+    def __init__( self, added: list, modified: list, removed: list, unchanged: int, snapshot: M3UPlaylistSnapshot ):
+        # The records not in the previous load
+        self.Added      = added
+        # The records with changed content
+        self.Modified   = modified
+        # The identities of the records not in the current load
+        self.Removed    = removed
+        # The number of unchanged records
+        self.Unchanged  = unchanged
+        # The snapshot of the current load, for the next diff
+        self.Snapshot   = snapshot
+        return
+
+    def __repr__( self ):
+        return ( f'<M3UChangeSet added={len(self.Added)} modified={len(self.Modified)} removed={len(self.Removed)} '
+                 f'unchanged={self.Unchanged}>' )
+
+
+class M3UPlaylistDiff( object ):
+    """Computes the added, modified and removed records between two loads of a playlist
+
+    The records are identified by a key, by default the link. The key may be a field name ('link', 'name',
+    'group', 'duration' or an attribute name like 'tvg-id'), a tuple of field names or a callable which
+    returns the identity of the record as a str. Records with the same identity within one load are numbered.
+
+    Of the previous load only the snapshot with the hashes is needed, the unchanged records of the
+    current load are not kept. The snapshot of the current load has the hashes and identity of every
+    record, so that part of the memory grows with the size of the playlist.
+
+    The channel number set by the deserializer is not one of the attributes, so it is not part of the
+    compared content and inserting a record does not modify the records after it.
+
+        snapshot = M3UPlaylistSnapshot.load( 'playlist.state' )
+        changes = M3UPlaylistDiff( key = 'tvg-id' ).diff( M3UDeserializer( url ), snapshot )
+        changes.Snapshot.save( 'playlist.state' )
+
+    """
+    def __init__( self, key: Union[str,tuple,list,Callable] = 'link' ):
+        """Constructor
+
+        :param key:     field name, tuple of field names or callable giving the identity of a record.
+        """
+        self.__key = record_key( key )
+        return
+
+    @staticmethod
+    def content( record: M3URecord ) -> str:
+        """Gets the content of the record that is compared
+
+        :param record:  M3URecord or inherited class
+        :return:        str
+        """
+        return f'{record.Duration}\x00{record.getAttributes()}\x00{record.Name}\x00{record.Link}'
+
+    def diff( self, records: Iterable[M3URecord], snapshot: Optional[M3UPlaylistSnapshot] = None ) -> M3UChangeSet:
+        """Compares the `records` with the `snapshot` of the previous load
+
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :param snapshot:    the snapshot of the previous load, None for the first load.
+        :return:            M3UChangeSet, with the snapshot of the records
+        """
+        if snapshot is None:
+            snapshot = M3UPlaylistSnapshot()
+
+        seen = bytearray( len( snapshot ) )
+        duplicates = {}
+        added = []
+        modified = []
+        keys = array( 'Q' )
+        hashes = array( 'Q' )
+        identities = []
+        unchanged = 0
+        for record in records:
+            identity = self.__key( record )
+            key = _digest( identity )
+            # The duplicates are counted by the hash of the identity, not by the identity text
+            count = duplicates.get( key, -1 ) + 1
+            duplicates[ key ] = count
+            if count > 0:
+                identity = f'{identity}\x1e{count}'
+                key = _digest( identity )
+
+            content = _digest( self.content( record ) )
+            keys.append( key )
+            hashes.append( content )
+            identities.append( identity )
+            index = snapshot.find( key )
+            if index == -1:
+                added.append( record )
+
+            else:
+                seen[ index ] = 1
+                if snapshot.hash( index ) != content:
+                    modified.append( record )
+
+                else:
+                    unchanged += 1
+
+        removed = [ snapshot.identity( index ) for index in range( len( snapshot ) ) if not seen[ index ] ]
+        return M3UChangeSet( added, modified, removed, unchanged, self.__snapshot( keys, hashes, identities ) )
+
+    def __snapshot( self, keys: array, hashes: array, identities: list ) -> M3UPlaylistSnapshot:
+        """Creates the sorted snapshot
+
+        :return:        M3UPlaylistSnapshot
+        """
+        order = sorted( range( len( keys ) ), key = keys.__getitem__ )
+        offsets = array( 'Q', [ 0 ] )
+        data = bytearray()
+        for index in order:
+            data += identities[ index ].encode( 'utf-8' )
+            offsets.append( len( data ) )
+
+        return M3UPlaylistSnapshot( array( 'Q', ( keys[ index ] for index in order ) ),
+                                    array( 'Q', ( hashes[ index ] for index in order ) ),
+                                    offsets, bytes( data ) )
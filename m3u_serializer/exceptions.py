@@ -44,3 +44,7 @@ class NoDataAvailable( Exception ):
 class InvalidParameter( Exception ):
     pass
 
+
+
+class OutdatedSnapshot( Exception ):
+    pass
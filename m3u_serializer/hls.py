@@ -0,0 +1,695 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import re
+import time
+import logging
+from typing import Optional, Iterator
+from m3u_serializer.session import M3USession
+from m3u_serializer.exceptions import DownloadError, NoDataAvailable
+
+log = logging.getLogger( 'M3U-HLS' )
+
+# A line with either a tag and its value or an URI
+RE_HLS_LINE         = re.compile( r'^[ \t]*(?:#(EXT[-A-Z0-9]*)(?::([^\r\n]*))?|([^#\s][^\r\n]*))', re.M )
+RE_HLS_ATTRIBUTE    = re.compile( r'([A-Z0-9-]+)=("[^"]*"|[^",\s]*)' )
+RE_HLS_BYTERANGE    = re.compile( r'#EXT-X-BYTERANGE:(\d+)(?:@(\d+))?' )
+
+
+def _attributes( value: str ) -> dict:
+    """Parses an attribute list, the quotes of the quoted strings are removed.
+
+    :param value:       the attribute list of the tag.
+    :return:            dict with the attributes
+    """
+    return { key: value.strip( '"' ) for key, value in RE_HLS_ATTRIBUTE.findall( value ) }
+
+
+class M3UHlsKey( object ):
+    """The #EXT-X-KEY in effect for the segments, one object is shared by all these segments
+
+    """
+    __slots__ = ( '__method', '__uri', '__iv', '__key_format' )
+
+    def __init__( self, attributes: dict ):
+        """Constructor
+
+        :param attributes:  the attributes of the #EXT-X-KEY tag.
+        """
+        self.__method       = attributes.get( 'METHOD', 'NONE' )
+        self.__uri          = attributes.get( 'URI' )
+        self.__iv           = attributes.get( 'IV' )
+        self.__key_format   = attributes.get( 'KEYFORMAT', 'identity' )
+        return
+
+    @property
+    def Method( self ) -> str:
+        """The encryption method, AES-128 or SAMPLE-AES
+
+        :return:        the method
+        """
+        return self.__method
+
+    @property
+    def Uri( self ) -> Optional[str]:
+        """The URI of the key
+
+        :return:        the URI or None
+        """
+        return self.__uri
+
+    @property
+    def IV( self ) -> Optional[str]:
+        """The initialization vector as hexadecimal string
+
+        :return:        the IV or None
+        """
+        return self.__iv
+
+    @property
+    def KeyFormat( self ) -> str:
+        """The format of the key, default identity
+
+        :return:        the key format
+        """
+        return self.__key_format
+
+    def __repr__( self ):
+        return f'<M3UHlsKey method="{self.__method}" uri="{self.__uri}">'
+
+
+class M3UHlsSegment( object ):
+    """Media segment of an HLS media playlist
+
+    The segment has no instance dictionary, tens of thousands of segments per playlist are common.
+
+    """
+    __slots__ = ( '__sequence', '__duration', '__title', '__uri', '__byte_range', '__key', '__discontinuity',
+                  '__program_date_time' )
+
+    def __init__( self, sequence: int, duration: float, title: str, uri: str, byte_range: Optional[tuple] = None,
+                  key: Optional[M3UHlsKey] = None, discontinuity: bool = False, program_date_time: Optional[str] = None ):
+        """Constructor
+
+        :param sequence:            the media sequence number.
+        :param duration:            the duration of #EXTINF in seconds.
+        :param title:               the title of #EXTINF.
+        :param uri:                 the URI of the segment.
+        :param byte_range:          optional tuple ( length, offset ) of #EXT-X-BYTERANGE.
+        :param key:                 optional M3UHlsKey in effect.
+        :param discontinuity:       True when preceded by #EXT-X-DISCONTINUITY.
+        :param program_date_time:   optional value of #EXT-X-PROGRAM-DATE-TIME.
+        """
+        self.__sequence             = sequence
+        self.__duration             = duration
+        self.__title                = title
+        self.__uri                  = uri
+        self.__byte_range           = byte_range
+        self.__key                  = key
+        self.__discontinuity        = discontinuity
+        self.__program_date_time    = program_date_time
+        return
+
+    @property
+    def Sequence( self ) -> int:
+        """The media sequence number of the segment
+
+        :return:        the sequence number
+        """
+        return self.__sequence
+
+    @property
+    def Duration( self ) -> float:
+        """The duration of the segment in seconds
+
+        :return:        the duration
+        """
+        return self.__duration
+
+    @property
+    def Title( self ) -> str:
+        """The title of the segment, maybe an empty string
+
+        :return:        the title
+        """
+        return self.__title
+
+    @property
+    def Uri( self ) -> str:
+        """The URI of the segment, relative to the playlist when not absolute
+
+        :return:        the URI
+        """
+        return self.__uri
+
+    @property
+    def ByteRange( self ) -> Optional[tuple]:
+        """The sub-range of the resource of the URI
+
+        :return:        tuple ( length, offset ) or None
+        """
+        return self.__byte_range
+
+    @property
+    def Key( self ) -> Optional[M3UHlsKey]:
+        """The key to decrypt the segment
+
+        :return:        the M3UHlsKey or None when not encrypted
+        """
+        return self.__key
+
+    @property
+    def Discontinuity( self ) -> bool:
+        """True when there is a discontinuity between the previous segment and this segment
+
+        :return:        the discontinuity flag
+        """
+        return self.__discontinuity
+
+    @property
+    def ProgramDateTime( self ) -> Optional[str]:
+        """The date and time of the first sample of the segment, ISO 8601
+
+        :return:        the date and time or None
+        """
+        return self.__program_date_time
+
+    def __repr__( self ):
+        return f'<M3UHlsSegment sequence={self.__sequence} duration={self.__duration} uri="{self.__uri}">'
+
+
+class M3UHlsVariant( object ):
+    """Variant stream of an HLS master playlist, #EXT-X-STREAM-INF or #EXT-X-I-FRAME-STREAM-INF
+
+    """
+    def __init__( self, attributes: dict, uri: Optional[str] ):
+        """Constructor
+
+        :param attributes:  the attributes of the tag.
+        :param uri:         the URI of the media playlist.
+        """
+        self.Attributes = attributes
+        self.Uri        = uri
+        return
+
+    @property
+    def Bandwidth( self ) -> int:
+        """The peak bit rate of the variant
+
+        :return:        the bandwidth in bits per second, 0 when not available
+        """
+        return int( self.Attributes.get( 'BANDWIDTH', 0 ) )
+
+    @property
+    def Resolution( self ) -> Optional[str]:
+        """The resolution of the video, like 1280x720
+
+        :return:        the resolution or None
+        """
+        return self.Attributes.get( 'RESOLUTION' )
+
+    @property
+    def Codecs( self ) -> Optional[str]:
+        """The codecs of the variant
+
+        :return:        the codecs or None
+        """
+        return self.Attributes.get( 'CODECS' )
+
+    def __repr__( self ):
+        return f'<M3UHlsVariant bandwidth={self.Bandwidth} resolution="{self.Resolution}" uri="{self.Uri}">'
+
+
+class M3UHlsPlaylist( object ):
+    """HLS master or media playlist, see draft-pantos-http-live-streaming
+
+    A master playlist has the Variants of #EXT-X-STREAM-INF, the IFrames of #EXT-X-I-FRAME-STREAM-INF and
+    the Media renditions of #EXT-X-MEDIA. A media playlist has the Segments with the #EXT-X-TARGETDURATION,
+    #EXT-X-MEDIA-SEQUENCE, #EXT-X-PLAYLIST-TYPE and #EXT-X-ENDLIST. The #EXT-X-KEY in effect and the
+    #EXT-X-BYTERANGE are set in the segments. The value of other tags is kept in Tags.
+
+    With 'after' only the segments with a higher media sequence number are parsed. The segments before
+    the last seen segment are skipped with a plain search for the #EXTINF tags, the #EXT-X-KEY in effect
+    is found with a backward search. The byte ranges continue from the start of the byte range of the
+    last seen segment ('offset'), otherwise it is found with a backward search for #EXT-X-BYTERANGE.
+    This is for refreshed live playlists, see M3UHlsLivePlaylist.
+
+    """
+    def __init__( self, data: Optional[str] = None, after: Optional[int] = None ):
+        """Constructor
+
+        :param data:        optional playlist data to parse.
+        :param after:       optional media sequence number of the last seen segment.
+        """
+        self.clear()
+        if data is not None:
+            self.parse( data, after )
+
+        return
+
+    def clear( self ) -> None:
+        """Clear all the internal data elements
+
+        :return:            None
+        """
+        self.__master                   = False
+        self.__variants                 = []
+        self.__iframes                  = []
+        self.__media                    = []
+        self.__segments                 = []
+        self.__tags                     = {}
+        self.__version                  = None
+        self.__target_duration          = None
+        self.__media_sequence           = 0
+        self.__discontinuity_sequence   = 0
+        self.__playlist_type            = None
+        self.__end_list                 = False
+        return
+
+    def parse( self, data: str, after: Optional[int] = None, offset: Optional[int] = None ) -> list:
+        """Parses the playlist data, the segments replace the segments of a previous parse.
+
+        :param data:        the playlist data.
+        :param after:       optional media sequence number of the last seen segment.
+        :param offset:      optional start of the byte range of the last seen segment.
+        :return:            list with the segments
+        """
+        self.__segments = list( self.segments( data, after, offset ) )
+        return self.__segments
+
+    def segments( self, data: str, after: Optional[int] = None, offset: Optional[int] = None ) -> Iterator[M3UHlsSegment]:
+        """Parses the playlist data and yields the segments while parsing, without keeping them.
+
+        The tags before the first segment are set when the first segment is yielded, the #EXT-X-ENDLIST
+        when the iteration is complete.
+
+        :param data:        the playlist data.
+        :param after:       optional media sequence number of the last seen segment.
+        :param offset:      optional start of the byte range of the last seen segment.
+        :return:            iterator of M3UHlsSegment
+        """
+        self.clear()
+        if not isinstance( data, str ) or data == '':
+            raise NoDataAvailable()
+
+        duration, title, byte_range, discontinuity, program_date_time = None, '', None, False, None
+        key = None
+        keys = {}
+        last_offset = offset
+        offset = 0
+        variant = None
+        sequence = None
+        matches = RE_HLS_LINE.finditer( data )
+        restart = True
+        while restart:
+            restart = False
+            for match in matches:
+                tag, value, uri = match.groups()
+                if uri is not None:
+                    if variant is not None:
+                        self.__variants.append( M3UHlsVariant( variant, uri.strip() ) )
+                        variant = None
+                        continue
+
+                    if sequence is None:
+                        sequence = self.__media_sequence
+
+                    if after is None or sequence > after:
+                        yield M3UHlsSegment( sequence, duration or 0.0, title, uri.strip(), byte_range, key, discontinuity,
+                                             program_date_time )
+
+                    sequence += 1
+                    duration, title, byte_range, discontinuity, program_date_time = None, '', None, False, None
+                    continue
+
+                if tag == 'EXTINF':
+                    if sequence is None:
+                        sequence = self.__media_sequence
+                        if after is not None and after > sequence:
+                            start, skipped = self.__skip( data, match.start(), after - sequence )
+                            if skipped > 0:
+                                # Continue at the last seen segment, its byte range is the offset of the next segment
+                                sequence += skipped
+                                key = self.__key_before( data, start, keys )
+                                if last_offset is not None and sequence == after:
+                                    offset = last_offset
+
+                                else:
+                                    offset = self.__offset_before( data, start )
+
+                                duration, title, byte_range, discontinuity, program_date_time = None, '', None, False, None
+                                matches = RE_HLS_LINE.finditer( data, start )
+                                restart = True
+                                break
+
+                    duration, _, title = ( value or '' ).partition( ',' )
+                    duration = float( duration )
+                    title = title.strip()
+
+                elif tag == 'EXT-X-BYTERANGE':
+                    length, _, begin = value.partition( '@' )
+                    byte_range = ( int( length ), int( begin ) if begin else offset )
+                    offset = byte_range[ 0 ] + byte_range[ 1 ]
+
+                elif tag == 'EXT-X-KEY':
+                    key = self.__key( value, keys )
+
+                elif tag == 'EXT-X-DISCONTINUITY':
+                    discontinuity = True
+
+                elif tag == 'EXT-X-PROGRAM-DATE-TIME':
+                    program_date_time = value.strip()
+
+                elif tag == 'EXT-X-MEDIA-SEQUENCE':
+                    self.__media_sequence = int( value )
+
+                elif tag == 'EXT-X-TARGETDURATION':
+                    self.__target_duration = int( value )
+
+                elif tag == 'EXT-X-ENDLIST':
+                    self.__end_list = True
+
+                elif tag == 'EXT-X-VERSION':
+                    self.__version = int( value )
+
+                elif tag == 'EXT-X-DISCONTINUITY-SEQUENCE':
+                    self.__discontinuity_sequence = int( value )
+
+                elif tag == 'EXT-X-PLAYLIST-TYPE':
+                    self.__playlist_type = value.strip()
+
+                elif tag == 'EXT-X-STREAM-INF':
+                    self.__master = True
+                    variant = _attributes( value )
+
+                elif tag == 'EXT-X-I-FRAME-STREAM-INF':
+                    self.__master = True
+                    attributes = _attributes( value )
+                    self.__iframes.append( M3UHlsVariant( attributes, attributes.get( 'URI' ) ) )
+
+                elif tag == 'EXT-X-MEDIA':
+                    self.__master = True
+                    self.__media.append( _attributes( value ) )
+
+                elif tag != 'EXTM3U':
+                    self.__tags[ tag ] = value
+
+        return
+
+    @staticmethod
+    def __skip( data: str, position: int, count: int ) -> tuple:
+        """Skips `count` segments from the #EXTINF tag at `position`, with a plain search for the #EXTINF tags.
+
+        :param data:        the playlist data.
+        :param position:    position of the first #EXTINF tag.
+        :param count:       the number of segments to skip.
+        :return:            tuple ( position, skipped ), the line start of the #EXTINF tag after the skipped segments
+        """
+        skipped = 0
+        while skipped < count:
+            found = data.find( '\n#EXTINF:', position )
+            if found == -1:
+                break
+
+            position = found + 1
+            skipped += 1
+
+        return position, skipped
+
+    def __key_before( self, data: str, position: int, keys: dict ) -> Optional[M3UHlsKey]:
+        """Gets the #EXT-X-KEY in effect at `position` with a backward search.
+
+        :param data:        the playlist data.
+        :param position:    the position in the data.
+        :param keys:        dict with the keys by the value of the tag.
+        :return:            the M3UHlsKey or None
+        """
+        found = data.rfind( '#EXT-X-KEY:', 0, position )
+        if found == -1:
+            return None
+
+        end = data.find( '\n', found )
+        return self.__key( data[ found + 11: end if end != -1 else len( data ) ].rstrip( '\r' ), keys )
+
+    @staticmethod
+    def __offset_before( data: str, position: int ) -> int:
+        """Gets the offset of the byte range following the ranges before `position`, with a backward search
+        up to the last byte range with an explicit offset.
+
+        :param data:        the playlist data.
+        :param position:    the position in the data.
+        :return:            the offset
+        """
+        offset = 0
+        while True:
+            found = data.rfind( '#EXT-X-BYTERANGE:', 0, position )
+            if found == -1:
+                return offset
+
+            length, begin = RE_HLS_BYTERANGE.match( data, found ).groups()
+            offset += int( length )
+            if begin is not None:
+                return offset + int( begin )
+
+            position = found
+
+    @staticmethod
+    def __key( value: str, keys: dict ) -> Optional[M3UHlsKey]:
+        """Gets the key of the #EXT-X-KEY tag, the same key object is shared while the value is the same.
+
+        :param value:       the value of the tag.
+        :param keys:        dict with the keys by the value of the tag.
+        :return:            the M3UHlsKey or None for METHOD=NONE
+        """
+        if value not in keys:
+            attributes = _attributes( value )
+            keys[ value ] = None if attributes.get( 'METHOD', 'NONE' ) == 'NONE' else M3UHlsKey( attributes )
+
+        return keys[ value ]
+
+    @property
+    def IsMaster( self ) -> bool:
+        """True for a master playlist
+
+        :return:        True when the playlist has variant streams or renditions
+        """
+        return self.__master
+
+    @property
+    def Variants( self ) -> list:
+        """The variant streams of #EXT-X-STREAM-INF
+
+        :return:        list with M3UHlsVariant
+        """
+        return self.__variants
+
+    @property
+    def IFrames( self ) -> list:
+        """The I-frame streams of #EXT-X-I-FRAME-STREAM-INF
+
+        :return:        list with M3UHlsVariant
+        """
+        return self.__iframes
+
+    @property
+    def Media( self ) -> list:
+        """The renditions of #EXT-X-MEDIA
+
+        :return:        list with the attributes of the renditions
+        """
+        return self.__media
+
+    @property
+    def Segments( self ) -> list:
+        """The segments of the last parse
+
+        :return:        list with M3UHlsSegment
+        """
+        return self.__segments
+
+    @property
+    def Tags( self ) -> dict:
+        """The values of the tags without a property, like #EXT-X-INDEPENDENT-SEGMENTS
+
+        :return:        dict with the last value by tag
+        """
+        return self.__tags
+
+    @property
+    def Version( self ) -> Optional[int]:
+        """The #EXT-X-VERSION of the playlist
+
+        :return:        the version or None
+        """
+        return self.__version
+
+    @property
+    def TargetDuration( self ) -> Optional[int]:
+        """The #EXT-X-TARGETDURATION, the maximum duration of the segments in seconds
+
+        :return:        the target duration or None
+        """
+        return self.__target_duration
+
+    @property
+    def MediaSequence( self ) -> int:
+        """The #EXT-X-MEDIA-SEQUENCE, the sequence number of the first segment of the playlist
+
+        :return:        the media sequence number
+        """
+        return self.__media_sequence
+
+    @property
+    def DiscontinuitySequence( self ) -> int:
+        """The #EXT-X-DISCONTINUITY-SEQUENCE
+
+        :return:        the discontinuity sequence number
+        """
+        return self.__discontinuity_sequence
+
+    @property
+    def PlaylistType( self ) -> Optional[str]:
+        """The #EXT-X-PLAYLIST-TYPE, EVENT or VOD
+
+        :return:        the playlist type or None
+        """
+        return self.__playlist_type
+
+    @property
+    def EndList( self ) -> bool:
+        """True when the playlist has the #EXT-X-ENDLIST tag, no more segments are added
+
+        :return:        the end list flag
+        """
+        return self.__end_list
+
+
+class M3UHlsLivePlaylist( object ):
+    """Polls a live HLS media playlist
+
+    On each refresh only the segments after the last seen media sequence number are parsed and returned.
+    The playlist is downloaded with a M3USession, by default the shared session, or read from a file.
+
+        live = M3UHlsLivePlaylist( 'https://example.org/live/stream.m3u8' )
+        for segment in live.segments():
+            ...
+
+    """
+    def __init__( self, url_filename: str, session: Optional[M3USession] = None, encoding: str = 'utf-8' ):
+        """Constructor
+
+        :param url_filename:    filename or web address of the media playlist.
+        :param session:         optional M3USession for http/https addresses, default the shared session.
+        :param encoding:        encoding of the playlist, utf-8 by the specification.
+        """
+        self.__url_filename = url_filename
+        self.__session      = session
+        self.__encoding     = encoding
+        self.__playlist     = M3UHlsPlaylist()
+        self.__last         = None
+        self.__offset       = None
+        self.__sequence     = 0
+        return
+
+    @property
+    def Playlist( self ) -> M3UHlsPlaylist:
+        """The playlist of the last refresh, with the new segments
+
+        :return:        M3UHlsPlaylist
+        """
+        return self.__playlist
+
+    @property
+    def LastSequence( self ) -> Optional[int]:
+        """The media sequence number of the last seen segment
+
+        :return:        the sequence number or None before the first segment
+        """
+        return self.__last
+
+    def update( self, data: str ) -> list:
+        """Parses the refreshed playlist data
+
+        When the media sequence number is lower than at the previous refresh, for example after a restart
+        of the server, the playlist starts again and all its segments are new.
+
+        :param data:        the playlist data.
+        :return:            list with the new segments
+        """
+        segments = self.__playlist.parse( data, self.__last, self.__offset )
+        if self.__last is not None and self.__playlist.MediaSequence < self.__sequence:
+            log.warning( f'Media sequence reset from {self.__sequence} to {self.__playlist.MediaSequence}' )
+            segments = self.__playlist.parse( data )
+
+        self.__sequence = self.__playlist.MediaSequence
+        if len( segments ) > 0:
+            self.__last = segments[ -1 ].Sequence
+            byte_range = segments[ -1 ].ByteRange
+            self.__offset = byte_range[ 1 ] if byte_range is not None else None
+
+        return segments
+
+    def refresh( self ) -> list:
+        """Reloads the playlist and parses it
+
+        :return:            list with the new segments
+        """
+        return self.update( self.__fetch() )
+
+    def segments( self, interval: Optional[float] = None ) -> Iterator[M3UHlsSegment]:
+        """Yields the segments while polling the playlist until the #EXT-X-ENDLIST tag.
+
+        Without `interval` the playlist is reloaded after the target duration, or half of it when the
+        playlist was unchanged.
+
+        :param interval:    optional reload interval in seconds.
+        :return:            iterator of M3UHlsSegment
+        """
+        while True:
+            segments = self.refresh()
+            yield from segments
+            if self.__playlist.EndList:
+                break
+
+            if interval is None:
+                target = self.__playlist.TargetDuration or 1
+                time.sleep( target if len( segments ) > 0 else target / 2 )
+
+            else:
+                time.sleep( interval )
+
+        return
+
+    def __fetch( self ) -> str:
+        """Downloads or reads the playlist
+
+        :return:            the playlist data
+        """
+        url = self.__url_filename
+        if url.startswith( ( 'http://', 'https://' ) ):
+            session = self.__session if self.__session is not None else M3USession.shared()
+            with session.get( url ) as r:
+                if r.status_code != 200:
+                    log.error( f'Download error {r.status_code}' )
+                    raise DownloadError( r.status_code )
+
+                return r.content.decode( self.__encoding, 'replace' )
+
+        if url.startswith( 'file://' ):
+            url = url[ 7: ]
+
+        with open( url, 'r', encoding = self.__encoding ) as stream:
+            return stream.read()
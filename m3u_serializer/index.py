@@ -0,0 +1,188 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from array import array
+from typing import Iterable, Iterator, Optional
+from m3u_serializer.record import M3URecord
+
+
+def _trigrams( text: str ) -> set:
+    return { text[ index: index + 3 ] for index in range( len( text ) - 2 ) }
+
+
+class M3UIndexedPlaylist( object ):
+    """Playlist with hash indexes on group, tvg-id, tvg-name, country and type and a trigram index on the name
+
+    The records are loaded once, for example from the M3UDeserializer or M3UPlaylistStore. The lookups
+    use the indexes, the cost depends on the number of records found and not on the size of the playlist.
+
+        playlist = M3UIndexedPlaylist( M3UDeserializer( 'input.m3u', new_record = M3URecordEx ) )
+        channel = playlist.get( 'npo1.nl' )
+        for record in playlist.find( country = 'NL', type = M3uItemType.MOVIE ):
+            ...
+        for record in playlist.search( 'zomergasten' ):
+            ...
+
+    The country and type indexes are only filled for records with these properties, as M3URecordEx.
+
+    """
+    INDEXES     = {
+        'group':    lambda record: record.Group,
+        'tvg_id':   lambda record: record.TvgId,
+        'tvg_name': lambda record: record.TvgName,
+        'country':  lambda record: getattr( record, 'Country', None ),
+        'type':     lambda record: getattr( record, 'Type', None ),
+    }
+
+    def __init__( self, records: Optional[Iterable[M3URecord]] = None ):
+        """Constructor
+
+        :param records:     optional iterable of records, for example the M3UDeserializer.
+        """
+        self.__records  = []
+        self.__indexes  = { name: {} for name in self.INDEXES }
+        self.__trigrams = {}
+        if records is not None:
+            self.extend( records )
+
+        return
+
+    def append( self, record: M3URecord ) -> None:
+        """Appends the record to the playlist and the indexes
+
+        :param record:      M3URecord or inherited class
+        :return:            None
+        """
+        position = len( self.__records )
+        self.__records.append( record )
+        for name, value in self.INDEXES.items():
+            value = value( record )
+            if value is not None:
+                index = self.__indexes[ name ]
+                positions = index.get( value )
+                if positions is None:
+                    positions = index[ value ] = array( 'I' )
+
+                positions.append( position )
+
+        for trigram in _trigrams( record.Name.lower() ):
+            positions = self.__trigrams.get( trigram )
+            if positions is None:
+                positions = self.__trigrams[ trigram ] = array( 'I' )
+
+            positions.append( position )
+
+        return
+
+    def extend( self, records: Iterable[M3URecord] ) -> None:
+        """Appends the records to the playlist and the indexes
+
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :return:            None
+        """
+        for record in records:
+            self.append( record )
+
+        return
+
+    def __len__( self ) -> int:
+        return len( self.__records )
+
+    def __getitem__( self, index: int ) -> M3URecord:
+        return self.__records[ index ]
+
+    def __iter__( self ) -> Iterator[M3URecord]:
+        return iter( self.__records )
+
+    def keys( self, name: str ) -> list:
+        """Gets the indexed values of the index `name`
+
+        :param name:        name of the index, see INDEXES.
+        :return:            list of values
+        """
+        return list( self.__indexes[ name ] )
+
+    def positions( self, **conditions ) -> array:
+        """Gets the positions of the records matching all the conditions.
+
+        A condition is index = value, for example group = 'Nederland SD' or type = M3uItemType.MOVIE.
+        The smallest index list is taken, the other conditions are checked on its records.
+
+        :param conditions:  the conditions per index, see INDEXES.
+        :return:            array with the positions of the records
+        """
+        if len( conditions ) == 0:
+            return array( 'I', range( len( self.__records ) ) )
+
+        empty = array( 'I' )
+        candidates = sorted( ( ( self.__indexes[ name ].get( value, empty ), name )
+                               for name, value in conditions.items() ), key = lambda item: len( item[ 0 ] ) )
+        positions, name = candidates[ 0 ]
+        checks = [ ( self.INDEXES[ name ], conditions[ name ] ) for _, name in candidates[ 1: ] ]
+        if len( checks ) == 0:
+            return array( 'I', positions )
+
+        records = self.__records
+        return array( 'I', [ position for position in positions
+                             if all( value( records[ position ] ) == expected for value, expected in checks ) ] )
+
+    def find( self, **conditions ) -> Iterator[M3URecord]:
+        """Gets the records matching all the conditions, see positions()
+
+        :param conditions:  the conditions per index, see INDEXES.
+        :return:            iterator of records
+        """
+        return map( self.__records.__getitem__, self.positions( **conditions ) )
+
+    def get( self, tvg_id: str ) -> Optional[M3URecord]:
+        """Gets the first record with the tvg-id
+
+        :param tvg_id:      the tvg-id
+        :return:            the record or None
+        """
+        positions = self.__indexes[ 'tvg_id' ].get( tvg_id )
+        return self.__records[ positions[ 0 ] ] if positions else None
+
+    def search( self, text: str, limit: Optional[int] = None ) -> Iterator[M3URecord]:
+        """Searches the records with `text` in the name, case insensitive
+
+        The trigrams of the text select the candidates, which are checked on the name.
+        Text shorter than three characters has no trigrams and checks all the names.
+
+        :param text:        the text to search for.
+        :param limit:       optional maximum number of records.
+        :return:            iterator of records
+        """
+        text = text.lower()
+        trigrams = _trigrams( text )
+        if len( trigrams ) == 0:
+            positions = range( len( self.__records ) )
+
+        else:
+            empty = array( 'I' )
+            positions = min( ( self.__trigrams.get( trigram, empty ) for trigram in trigrams ), key = len )
+
+        count = 0
+        for position in positions:
+            if limit is not None and count >= limit:
+                break
+
+            record = self.__records[ position ]
+            if text in record.Name.lower():
+                count += 1
+                yield record
+
+        return
@@ -0,0 +1,231 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import time
+import logging
+from typing import Iterable, Iterator, Optional, Callable, List
+from contextlib import contextmanager
+
+
+class M3UInstrumentation( object ):
+    """Phase timers and counters for the M3UDeserializer and M3USerializer
+
+    The deserializer measures the phases 'fetch' (reading the file or download), 'decode', 'tokenize'
+    (the regular expression), 'build' (creating and setting the records, for M3URecordEx including the
+    classification), the serializer 'serialize' (formatting) and 'write' (the output stream).
+    The timers are exclusive, when a phase runs inside another phase, for example the fetch of the next
+    chunk while tokenizing in streaming mode, the time is only counted for the inner phase.
+
+    The counters are 'bytes_read', 'chars_read', 'bytes_fetched', 'chars_decoded', 'items', 'records',
+    'records_written' and 'chars_written'.
+
+    When the deserializer is exhausted or the serializer is closed the statistics are passed to the sinks,
+    a sink is a callable with the statistics dict, see M3ULoggingSink and M3UPrometheusSink.
+    Without instrumentation the deserializer and serializer run their normal code paths.
+
+        instrumentation = M3UInstrumentation( [ M3ULoggingSink() ] )
+        with M3UDeserializer( url, instrumentation = instrumentation ) as deserializer:
+            for record in deserializer:
+                ...
+
+        print( instrumentation.prometheus() )
+
+    An instance is not thread safe, use one per thread.
+
+    """
+    PHASES  = ( 'fetch', 'decode', 'tokenize', 'build', 'serialize', 'write' )
+
+    def __init__( self, sinks: Optional[List[Callable[[dict],None]]] = None, clock: Callable[[],float] = time.perf_counter ):
+        """Constructor
+
+        :param sinks:       optional list of callables, called with the statistics by report().
+        :param clock:       the clock for the timers, default time.perf_counter.
+        """
+        self.__sinks    = list( sinks ) if sinks is not None else []
+        self.__clock    = clock
+        self.__timers   = {}
+        self.__counters = {}
+        self.__stack    = []
+        return
+
+    def addSink( self, sink: Callable[[dict],None] ) -> None:
+        self.__sinks.append( sink )
+        return
+
+    def start( self, phase: str ) -> None:
+        """Starts the timer of the phase, the running phase is paused
+
+        :param phase:       name of the phase.
+        :return:            None
+        """
+        now = self.__clock()
+        if len( self.__stack ) > 0:
+            parent, started = self.__stack[ -1 ]
+            self.__timers[ parent ] = self.__timers.get( parent, 0.0 ) + now - started
+
+        self.__stack.append( ( phase, now ) )
+        return
+
+    def stop( self ) -> None:
+        """Stops the timer of the running phase, the paused phase continues
+
+        :return:            None
+        """
+        now = self.__clock()
+        phase, started = self.__stack.pop()
+        self.__timers[ phase ] = self.__timers.get( phase, 0.0 ) + now - started
+        if len( self.__stack ) > 0:
+            self.__stack[ -1 ] = ( self.__stack[ -1 ][ 0 ], now )
+
+        return
+
+    @contextmanager
+    def timer( self, phase: str ):
+        """Times the block as the phase
+
+        :param phase:       name of the phase.
+        """
+        self.start( phase )
+        try:
+            yield
+
+        finally:
+            self.stop()
+
+    def count( self, name: str, value: int = 1 ) -> None:
+        self.__counters[ name ] = self.__counters.get( name, 0 ) + value
+        return
+
+    def iterate( self, phase: str, iterable: Iterable, counter: Optional[str] = None, sized: bool = False ) -> Iterator:
+        """Yields the items of the iterable, the time to get each item is counted for the phase
+
+        :param phase:       name of the phase.
+        :param iterable:    the iterable.
+        :param counter:     optional name of the counter of the items.
+        :param sized:       when True the counter counts len() of the items instead of the items.
+        :return:            iterator of the items
+        """
+        iterator = iter( iterable )
+        while True:
+            self.start( phase )
+            try:
+                item = next( iterator )
+
+            except StopIteration:
+                return
+
+            finally:
+                self.stop()
+
+            if counter is not None:
+                self.count( counter, len( item ) if sized else 1 )
+
+            yield item
+
+    @property
+    def Timers( self ) -> dict:
+        return dict( self.__timers )
+
+    @property
+    def Counters( self ) -> dict:
+        return dict( self.__counters )
+
+    def statistics( self, source: Optional[str] = None ) -> dict:
+        """Gets the timers and counters
+
+        :param source:      optional name of the source, the logger name of the deserializer or serializer.
+        :return:            dict with source, timers (seconds per phase) and counters
+        """
+        return { 'source': source, 'timers': dict( self.__timers ), 'counters': dict( self.__counters ) }
+
+    def report( self, source: Optional[str] = None ) -> None:
+        """Passes the statistics to the sinks
+
+        :param source:      optional name of the source, the logger name of the deserializer or serializer.
+        :return:            None
+        """
+        if len( self.__sinks ) > 0:
+            statistics = self.statistics( source )
+            for sink in self.__sinks:
+                sink( statistics )
+
+        return
+
+    def reset( self ) -> None:
+        self.__timers.clear()
+        self.__counters.clear()
+        return
+
+    def prometheus( self, prefix: str = 'm3u', source: Optional[str] = None ) -> str:
+        """Formats the timers and counters in the Prometheus text exposition format
+
+        :param prefix:      prefix of the metric names.
+        :param source:      optional source label.
+        :return:            str
+        """
+        return _prometheus( self.statistics( source ), prefix )
+
+
+def _prometheus( statistics: dict, prefix: str ) -> str:
+    label = '' if statistics[ 'source' ] is None else f',source="{statistics[ "source" ]}"'
+    lines = [ f'# HELP {prefix}_phase_seconds_total Time spent per phase.',
+              f'# TYPE {prefix}_phase_seconds_total counter' ]
+    for phase, seconds in sorted( statistics[ 'timers' ].items() ):
+        lines.append( f'{prefix}_phase_seconds_total{{phase="{phase}"{label}}} {seconds:.6f}' )
+
+    for name, value in sorted( statistics[ 'counters' ].items() ):
+        lines.append( f'# TYPE {prefix}_{name}_total counter' )
+        lines.append( f'{prefix}_{name}_total{{{label[ 1: ]}}} {value}' if label else f'{prefix}_{name}_total {value}' )
+
+    return '\n'.join( lines ) + '\n'
+
+
+class M3ULoggingSink( object ):
+    """Sink that logs the statistics, by default to the logger of the source ('M3U-Deserializer' or 'M3U-Serializer')
+
+    """
+    def __init__( self, logger: Optional[logging.Logger] = None, level: int = logging.INFO ):
+        self.__logger   = logger
+        self.__level    = level
+        return
+
+    def __call__( self, statistics: dict ) -> None:
+        logger = self.__logger or logging.getLogger( statistics[ 'source' ] or 'M3U-Instrumentation' )
+        if logger.isEnabledFor( self.__level ):
+            timers = ', '.join( f'{phase} {seconds:.3f}s' for phase, seconds in statistics[ 'timers' ].items() )
+            counters = ', '.join( f'{name} {value}' for name, value in statistics[ 'counters' ].items() )
+            logger.log( self.__level, f'Timers: {timers}; Counters: {counters}' )
+
+        return
+
+
+class M3UPrometheusSink( object ):
+    """Sink that writes the statistics in the Prometheus text format, for the node exporter textfile collector
+
+    """
+    def __init__( self, filename: str, prefix: str = 'm3u' ):
+        self.__filename = filename
+        self.__prefix   = prefix
+        return
+
+    def __call__( self, statistics: dict ) -> None:
+        temp_filename = f'{self.__filename}.tmp'
+        with open( temp_filename, 'w' ) as stream:
+            stream.write( _prometheus( statistics, self.__prefix ) )
+
+        os.replace( temp_filename, self.__filename )
+        return
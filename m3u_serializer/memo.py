@@ -0,0 +1,113 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import threading
+from collections import OrderedDict
+from typing import Hashable, Callable, Any
+
+
+class M3ULRUCache( object ):
+    """Bounded memoization cache with least recently used eviction and hit/miss counters
+
+        cache = M3ULRUCache( 4096 )
+        value = cache.get( key, compute )
+
+    """
+    def __init__( self, maxsize: int = 4096 ):
+        """Constructor
+
+        :param maxsize:     maximum number of entries, the least recently used entry is evicted.
+        """
+        self.__maxsize  = maxsize
+        self.__data     = OrderedDict()
+        self.__lock     = threading.Lock()
+        self.__hits     = 0
+        self.__misses   = 0
+        self.__evictions = 0
+        return
+
+    def get( self, key: Hashable, compute: Callable[[Hashable],Any] ) -> Any:
+        """Gets the value of `key`, when not cached the value is computed and stored
+
+        :param key:         the key.
+        :param compute:     callable with the key, computes the value.
+        :return:            the value
+        """
+        # The OrderedDict operations are atomic, the lock is only needed when inserting and evicting
+        try:
+            value = self.__data[ key ]
+            self.__data.move_to_end( key )
+            self.__hits += 1
+            return value
+
+        except KeyError:
+            self.__misses += 1
+
+        value = compute( key )
+        with self.__lock:
+            self.__data[ key ] = value
+            if len( self.__data ) > self.__maxsize:
+                self.__data.popitem( last = False )
+                self.__evictions += 1
+
+        return value
+
+    def invalidate( self, key: Hashable ) -> None:
+        """Removes `key` from the cache
+
+        :param key:         the key.
+        :return:            None
+        """
+        with self.__lock:
+            self.__data.pop( key, None )
+
+        return
+
+    def clear( self ) -> None:
+        """Removes all the entries, the counters are kept
+
+        :return:            None
+        """
+        with self.__lock:
+            self.__data.clear()
+
+        return
+
+    def __len__( self ) -> int:
+        return len( self.__data )
+
+    @property
+    def Hits( self ) -> int:
+        return self.__hits
+
+    @property
+    def Misses( self ) -> int:
+        return self.__misses
+
+    def statistics( self ) -> dict:
+        """Gets the counters of the cache
+
+        :return:            dict with size, hits, misses, evictions and hit_rate
+        """
+        with self.__lock:
+            total = self.__hits + self.__misses
+            return {
+                'size':         len( self.__data ),
+                'hits':         self.__hits,
+                'misses':       self.__misses,
+                'evictions':    self.__evictions,
+                'hit_rate':     self.__hits / total if total else 0.0
+            }
@@ -0,0 +1,269 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import math
+import queue
+import hashlib
+import logging
+import threading
+from typing import Iterable, Iterator, Optional, Union, Callable, List
+from m3u_serializer.reader import M3UDeserializer
+from m3u_serializer.diff import record_key
+from m3u_serializer.exceptions import InvalidParameter
+
+log = logging.getLogger( 'M3U-Merge' )
+
+_DONE = object()
+
+
+class M3UBloomFilter( object ):
+    """Bloom filter with a fixed size for the expected number of keys and false positive rate
+
+    """
+    def __init__( self, capacity: int, error_rate: float = 0.001 ):
+        """Constructor
+
+        :param capacity:    the expected number of keys.
+        :param error_rate:  the false positive rate at the capacity.
+        """
+        self.__size     = max( 8, int( -capacity * math.log( error_rate ) / ( math.log( 2 ) ** 2 ) ) )
+        self.__hashes   = max( 1, round( self.__size / capacity * math.log( 2 ) ) )
+        self.__bits     = bytearray( ( self.__size + 7 ) // 8 )
+        return
+
+    def add( self, key: bytes ) -> bool:
+        """Adds the key
+
+        :param key:         the key.
+        :return:            True when the key was (probably) already present
+        """
+        digest = hashlib.blake2b( key, digest_size = 16 ).digest()
+        first, second = int.from_bytes( digest[ :8 ], 'little' ), int.from_bytes( digest[ 8: ], 'little' ) | 1
+        present = True
+        bits = self.__bits
+        for index in range( self.__hashes ):
+            position = ( first + index * second ) % self.__size
+            mask = 1 << ( position & 7 )
+            if not bits[ position >> 3 ] & mask:
+                bits[ position >> 3 ] |= mask
+                present = False
+
+        return present
+
+    @property
+    def SizeBytes( self ) -> int:
+        """The size of the bit array in bytes
+
+        """
+        return len( self.__bits )
+
+
+class M3UPlaylistMerge( object ):
+    """Merges several playlists into one, without duplicates
+
+    The sources, filenames, URLs, opened M3UDeserializer objects or other iterables of records, are read
+    concurrently in threads, so the downloads and decompression overlap. The records are deduplicated on the key,
+    see M3UPlaylistDiff for the key. The precedence policy decides which duplicate is kept:
+
+        'priority'  the record of the first source in the list, the sources are read ahead
+                    into bounded queues and merged in the order of the list.
+        'arrival'   the record that is read first, the records are merged as they arrive.
+
+    Only the 64 bits hash of each key is kept. With 'bloom_capacity' a Bloom filter of fixed size is used
+    instead, for very large inputs; a unique record is then dropped with the probability 'error_rate'.
+
+        merge = M3UPlaylistMerge( [ 'provider1.m3u', 'http://provider2/get.php' ], key = 'tvg-id' )
+        with M3USerializer( 'combined.m3u' ) as serializer:
+            merge.write( serializer )
+
+    """
+    POLICIES    = ( 'priority', 'arrival' )
+
+    def __init__( self, sources: List[Union[str,M3UDeserializer,Iterable]], key: Union[str,tuple,list,Callable] = 'link',
+                  policy: str = 'priority', queue_size: int = 1024, bloom_capacity: Optional[int] = None,
+                  error_rate: float = 0.001, **kwargs ):
+        """Constructor
+
+        :param sources:         the filenames, URLs, opened M3UDeserializer objects or iterables of records.
+        :param key:             field name, tuple of field names or callable giving the identity of a record.
+        :param policy:          'priority' or 'arrival', see the class.
+        :param queue_size:      number of records read ahead per source.
+        :param bloom_capacity:  optional expected number of unique records, to deduplicate with a Bloom filter.
+        :param error_rate:      the false positive rate of the Bloom filter.
+        :param kwargs:          keyword arguments for the M3UDeserializer of the filenames and URLs.
+        """
+        if policy not in self.POLICIES:
+            raise InvalidParameter( f'M3UPlaylistMerge( policy ) must be one of {self.POLICIES}' )
+
+        self.__sources      = list( sources )
+        self.__key          = record_key( key )
+        self.__policy       = policy
+        self.__queue_size   = queue_size
+        self.__bloom_capacity = bloom_capacity
+        self.__error_rate   = error_rate
+        self.__kwargs       = kwargs
+        self.__counts       = [ 0 ] * len( self.__sources )
+        self.__duplicates   = 0
+        return
+
+    @property
+    def Counts( self ) -> list:
+        """The number of merged records per source
+
+        """
+        return list( self.__counts )
+
+    @property
+    def Duplicates( self ) -> int:
+        return self.__duplicates
+
+    def __read( self, index: int, source, output: queue.Queue, stop: threading.Event ) -> None:
+        """Reads the source into the queue, runs in a thread
+
+        :return:            None
+        """
+        try:
+            if isinstance( source, str ):
+                with M3UDeserializer( source, **self.__kwargs ) as deserializer:
+                    self.__forward( index, deserializer, output, stop )
+
+            else:
+                self.__forward( index, source, output, stop )
+
+        except Exception as exc:
+            log.error( f'Source {index}: {exc}' )
+            self.__send( output, ( index, exc ), stop )
+
+        finally:
+            self.__send( output, ( index, _DONE ), stop )
+
+        return
+
+    def __forward( self, index: int, records: Iterable, output: queue.Queue, stop: threading.Event ) -> None:
+        for record in records:
+            if not self.__send( output, ( index, record ), stop ):
+                return
+
+        return
+
+    @staticmethod
+    def __send( output: queue.Queue, item: tuple, stop: threading.Event ) -> bool:
+        """Puts the item in the queue, gives up when the merge is stopped
+
+        :return:            False when stopped
+        """
+        while not stop.is_set():
+            try:
+                output.put( item, timeout = 0.1 )
+                return True
+
+            except queue.Full:
+                pass
+
+        return False
+
+    def __arrivals( self, stop: threading.Event ) -> Iterator[tuple]:
+        """Yields ( index, record ) in the order of arrival
+
+        """
+        output = queue.Queue( self.__queue_size * len( self.__sources ) )
+        threads = [ threading.Thread( target = self.__read, args = ( index, source, output, stop ), daemon = True )
+                    for index, source in enumerate( self.__sources ) ]
+        for thread in threads:
+            thread.start()
+
+        running = len( threads )
+        while running > 0:
+            index, record = output.get()
+            if record is _DONE:
+                running -= 1
+
+            elif isinstance( record, Exception ):
+                raise record
+
+            else:
+                yield index, record
+
+        return
+
+    def __priorities( self, stop: threading.Event ) -> Iterator[tuple]:
+        """Yields ( index, record ) in the order of the sources
+
+        """
+        outputs = [ queue.Queue( self.__queue_size ) for _ in self.__sources ]
+        for index, source in enumerate( self.__sources ):
+            threading.Thread( target = self.__read, args = ( index, source, outputs[ index ], stop ), daemon = True ).start()
+
+        for output in outputs:
+            while True:
+                index, record = output.get()
+                if record is _DONE:
+                    break
+
+                if isinstance( record, Exception ):
+                    raise record
+
+                yield index, record
+
+        return
+
+    def records( self ) -> Iterator:
+        """Yields the merged records
+
+        :return:            iterator of records
+        """
+        self.__counts       = [ 0 ] * len( self.__sources )
+        self.__duplicates   = 0
+        if self.__bloom_capacity is not None:
+            bloom = M3UBloomFilter( self.__bloom_capacity, self.__error_rate )
+            seen = bloom.add
+
+        else:
+            keys = set()
+            def seen( digest ):
+                if digest in keys:
+                    return True
+
+                keys.add( digest )
+                return False
+
+        stop = threading.Event()
+        items = self.__priorities( stop ) if self.__policy == 'priority' else self.__arrivals( stop )
+        try:
+            for index, record in items:
+                digest = hashlib.blake2b( self.__key( record ).encode( 'utf-8' ), digest_size = 8 ).digest()
+                if seen( digest ):
+                    self.__duplicates += 1
+                    continue
+
+                self.__counts[ index ] += 1
+                yield record
+
+        finally:
+            stop.set()
+
+        return
+
+    def __iter__( self ) -> Iterator:
+        return self.records()
+
+    def write( self, serializer ) -> int:
+        """Writes the merged records through the M3USerializer
+
+        :param serializer:  the opened M3USerializer.
+        :return:            number of written records
+        """
+        return serializer.write_many( self.records() )
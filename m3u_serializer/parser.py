@@ -0,0 +1,151 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import re
+from typing import Iterator, Optional
+
+
+RE_ITEM         = re.compile( r"(?:^|\n)#EXTINF:([-+]?(?:\d*\.\d+|\d+))[. ]([^,]+)?,([A-Z].*?)[\r\n]+(.*)" )
+# The same pattern for bytes, for memory-mapped files
+RE_ITEM_BYTES   = re.compile( RE_ITEM.pattern.encode( 'ascii' ) )
+
+# Tokenizer for all the supported directives in a single pass, either a record with the groups
+#   1: duration, 2: attributes, 3: name, 4: option lines between #EXTINF and link, 5: link
+# or a directive with the groups
+#   6: directive name, 7: value
+RE_DIRECTIVE        = re.compile( r"(?:^|\n)(?:#EXTINF:([-+]?(?:\d*\.\d+|\d+))[. ]([^,]*),([A-Z].*?)[\r\n]+"
+                                  r"((?:#(?:EXTVLCOPT|KODIPROP|EXTGRP)[^\r\n]*[\r\n]+)*)(.*)"
+                                  r"|#(EXTM3U|PLAYLIST|EXTGRP|EXTVLCOPT|KODIPROP)\b:?[ \t]*([^\r\n]*))" )
+RE_DIRECTIVE_BYTES  = re.compile( RE_DIRECTIVE.pattern.encode( 'ascii' ) )
+# The last group of a record match, the lastindex of the directive matches is higher.
+RECORD_GROUP        = 5
+RE_HEADER_ATTRIBUTE = re.compile( r"""([\w-]+)=("[^"]*"|'[^']*'|\S+)""" )
+OPTION_DIRECTIVES   = ( '#EXTVLCOPT', '#KODIPROP' )
+
+
+class M3UDirectives( object ):
+    """State of the directives other than #EXTINF while tokenizing a playlist
+
+    The attributes of the #EXTM3U header (url-tvg, x-tvg-url, ...) are collected in Header and the
+    #PLAYLIST title in Playlist. A #EXTGRP applies to the record it is part of and all the following
+    records, until the next #EXTGRP. The #EXTVLCOPT and #KODIPROP options belong to the record they
+    are part of, options that precede the #EXTINF directive belong to the next record.
+
+    """
+    def __init__( self, group: Optional[str] = None ):
+        """Constructor
+
+        :param group:       optional #EXTGRP group in effect at the start of the data.
+        """
+        self.Header     = {}
+        self.Playlist   = None
+        self.Group      = group
+        self.Pending    = []
+        return
+
+    def update( self, directive: str, value: str, line: str ) -> None:
+        """Updates the state with a directive outside of a record
+
+        :param directive:   name of the directive without the '#'.
+        :param value:       value of the directive.
+        :param line:        the directive line.
+        :return:            None
+        """
+        if directive == 'EXTGRP':
+            self.Group = value.strip() or None
+
+        elif directive == 'PLAYLIST':
+            self.Playlist = value.strip()
+
+        elif directive == 'EXTM3U':
+            for name, text in RE_HEADER_ATTRIBUTE.findall( value ):
+                self.Header[ name ] = text.strip( '"\'' )
+
+        else:
+            self.Pending.append( line.strip() )
+
+        return
+
+    def record( self, block: str ) -> Optional[tuple]:
+        """Gets the directives of the next record, the pending options are consumed.
+
+        :param block:       the directive lines between the #EXTINF directive and the link.
+        :return:            None or tuple ( group, options, <True when the block has the #EXTGRP directive> )
+        """
+        options = self.Pending
+        inline = False
+        if block:
+            for line in block.splitlines():
+                line = line.strip()
+                if line.startswith( '#EXTGRP' ):
+                    self.Group = line[ 8: ].strip() or None
+                    inline = True
+
+                elif line != '':
+                    options.append( line )
+
+        if len( options ) > 0:
+            self.Pending = []
+
+        elif self.Group is None:
+            return None
+
+        return self.Group, tuple( options ), inline
+
+
+class M3UChunkParser( object ):
+    """Incremental parser for the M3U data stream
+
+    The data is fed in chunks, as soon as a chunk contains the start of the next #EXTINF directive
+    all the records before it are complete and are yielded as regular expression match objects.
+    Only the incomplete tail of the data is kept, so the memory usage is bound to the chunk size
+    and the size of a single record.
+
+    """
+    def __init__( self, pattern = RE_DIRECTIVE ):
+        """Constructor
+
+        :param pattern:     the compiled regular expression to match the records with.
+        """
+        self.__pattern      = pattern
+        self.__separator    = '\n#EXTINF'
+        self.__buffer       = ''
+        return
+
+    def feed( self, chunk: str ) -> Iterator:
+        """Feeds a chunk of data to the parser and yields the complete records
+
+        :param chunk:       chunk of the M3U data stream.
+        :return:            iterator of match objects
+        """
+        buffer = self.__buffer + chunk
+        cut = buffer.rfind( self.__separator )
+        if cut <= 0:
+            self.__buffer = buffer
+            return iter( () )
+
+        # The tail is kept including the newline, so that the next record still matches the pattern.
+        self.__buffer = buffer[ cut: ]
+        return self.__pattern.finditer( buffer, 0, cut )
+
+    def finish( self ) -> Iterator:
+        """Yields the remaining records at the end of the data stream
+
+        :return:            iterator of match objects
+        """
+        buffer = self.__buffer
+        self.__buffer = ''
+        return self.__pattern.finditer( buffer )
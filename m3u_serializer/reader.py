@@ -14,18 +14,131 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
-from typing import Union, Optional
-import re
+from typing import Union, Optional, Iterator
+import os
+import mmap
+import codecs
 import requests
 import logging
 import _io
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 from m3u_serializer.record import M3URecord
+from m3u_serializer.parser import ( RE_DIRECTIVE, RE_DIRECTIVE_BYTES, RECORD_GROUP, OPTION_DIRECTIVES, M3UChunkParser,
+                                    M3UDirectives )
+from m3u_serializer.cache import M3UFetchCache
+from m3u_serializer.session import M3USession
+from m3u_serializer.instrument import M3UInstrumentation
+from m3u_serializer.compression import detect, detect_file, open_compressed, decompress_chunks
 from m3u_serializer.exceptions import *
 from contextlib import contextmanager
 
 log = logging.getLogger( 'M3U-Deserializer' )
 
 
+def _items( matches: Iterator, encoding: Optional[str] = None, keep_source: bool = False,
+            directives: Optional[M3UDirectives] = None ) -> Iterator[tuple]:
+    """Yields the elements of the records from the RE_DIRECTIVE matches.
+
+    The other directives update the `directives` state, the directives of a record are yielded as
+    ( group, options ), or None for the common case of a record without #EXTGRP and options.
+    The source of a record includes the options preceding its #EXTINF directive.
+
+    :param matches:         iterator of match objects, of str or bytes data.
+    :param encoding:        encoding of the bytes data, None for str data.
+    :param keep_source:     when True the original text of the record is yielded as well.
+    :param directives:      optional M3UDirectives with the state, updated while iterating.
+    :return:                iterator of tuples ( ( duration, attributes, name, link ), source, directives )
+    """
+    if directives is None:
+        directives = M3UDirectives()
+
+    # Without any directive state the records take the same path as with #EXTINF only
+    active = directives.Group is not None or len( directives.Pending ) > 0
+    for match in matches:
+        if match.lastindex != RECORD_GROUP:
+            if encoding is None:
+                directives.update( *match.group( 6, 7, 0 ) )
+
+            else:
+                directives.update( *( group.decode( encoding, 'replace' ) for group in match.group( 6, 7, 0 ) ) )
+
+            active = True
+            continue
+
+        if encoding is None:
+            item = match.group( 1, 2, 3, 5 )
+            block = match.group( 4 )
+
+        else:
+            item = tuple( group.decode( encoding, 'replace' ) for group in match.group( 1, 2, 3, 5 ) )
+            block = match.group( 4 ).decode( encoding, 'replace' )
+
+        pending = 0
+        extras = None
+        if active or block:
+            pending = len( directives.Pending )
+            extras = directives.record( block )
+            active = directives.Group is not None
+
+        source = None
+        if keep_source:
+            source = match.group( 0 ).lstrip( b'\n' if encoding else '\n' )
+            if encoding is not None:
+                source = source.decode( encoding, 'replace' )
+
+            if pending > 0:
+                source = '\n'.join( extras[ 1 ][ :pending ] ) + '\n' + source
+
+        yield item, source, extras
+
+    return
+
+
+def _parse_shard( shard, encoding: str, new_record, record_kwargs: dict, keep_source: bool = False,
+                  group: Optional[str] = None ) -> list:
+    """Parses a shard of the M3U data stream in a worker process.
+
+    The shard is either a str with part of the data or a tuple ( filename, start, end ) of a part of
+    a memory-mapped file. The records are numbered from 1, the caller renumbers the channels.
+    The #EXTGRP group in effect at the start of the shard is passed by the caller.
+
+    :param shard:           str or tuple with the data of the shard.
+    :param encoding:        encoding of memory-mapped file.
+    :param new_record:      the record class.
+    :param record_kwargs:   keyword arguments for the record class.
+    :param keep_source:     when True the original text is set in the records.
+    :param group:           the #EXTGRP group in effect at the start of the shard.
+    :return:                list of records
+    """
+    def build( items ):
+        for item, source, extras in items:
+            record = new_record( **record_kwargs )
+            if extras is not None:
+                record.setDirectives( *extras )
+
+            record.set( *item, channel = len( records ) + 1 )
+            if keep_source:
+                record.setSource( source )
+
+            records.append( record )
+
+        return
+
+    records = []
+    if isinstance( shard, str ):
+        build( _items( RE_DIRECTIVE.finditer( shard ), None, keep_source, M3UDirectives( group ) ) )
+        return records
+
+    filename, start, end = shard
+    with open( filename, 'rb' ) as stream:
+        with mmap.mmap( stream.fileno(), 0, access = mmap.ACCESS_READ ) as data:
+            build( _items( RE_DIRECTIVE_BYTES.finditer( data, start, end ), encoding, keep_source, M3UDirectives( group ) ) )
+
+    return records
+
+
 class M3UDeserializer( object ):
     """M3U deserializer for IPTV streams
 
@@ -33,6 +146,23 @@ class M3UDeserializer( object ):
 
     The Regular Expression gets duration, attributes, title and stream address from the data.
     Optional the data stream can be saved to a separate filename for later use, specially for http/https.
+    With a M3UFetchCache the http/https downloads are conditional, unchanged data is read from the cache.
+    The http/https downloads use a M3USession, by default the session shared by all deserializers,
+    which keeps the connections alive and retries transient errors.
+
+    With 'memory_map' local files are memory-mapped, the regular expression runs over the mapped bytes
+    and only the captured fields are decoded. Several processes mapping the same file share the page cache.
+
+    With 'workers' the loaded or memory-mapped data is split into shards at the #EXTINF boundaries, which
+    are parsed in a process pool. The records are yielded in the original order with the correct channel numbers.
+    The streaming mode is always parsed in process.
+
+    Compressed files (gzip, bz2, xz and with the optional zstandard package zstd) are detected by the
+    extension or the magic bytes and decompressed while reading, as are compressed downloads.
+    When the 'store_filename' has a compression extension the stored copy is compressed.
+
+    With an M3UInstrumentation the time per phase and the byte and record counters are measured,
+    and reported to its sinks when the iteration is complete.
 
     By default the follewing extensions are are used to detect series and movies.
           .mp4, .avi, .mkv and .flv
@@ -42,26 +172,67 @@ class M3UDeserializer( object ):
 
     Using the class iterator the records can be retrieved from the data stream.
 
-    Only the directives #EXTM3U or #EXTINF are supported.
+    In streaming mode the data is not loaded into memory by open(), but read in chunks of 'chunk_size'
+    while iterating. The records are yielded as soon as they are complete, so the memory usage stays
+    bound no matter how big the M3U file or download is.
 
-    """
-    # __RE_ITEM         = re.compile( r"(?:^|\n)#EXTINF:([\w+.])([^,]+)?,([A-Z].*?)[\r\n]+(.*)" )
-    __RE_ITEM         = re.compile( r"(?:^|\n)#EXTINF:([-+]?(?:\d*\.\d+|\d+))[. ]([^,]+)?,([A-Z].*?)[\r\n]+(.*)" )
+    The directives are tokenized in a single pass over the data. Besides #EXTINF the attributes of the
+    #EXTM3U header (Header), the #PLAYLIST title (Playlist), the #EXTGRP groups and the #EXTVLCOPT and
+    #KODIPROP options of the records are supported, see M3URecord.ExtGroup and M3URecord.Options.
+    For loaded and memory-mapped data the Header and Playlist are available after open(), in streaming
+    mode after the iteration has started.
 
+    """
     def __init__( self,
                   url_filename: Optional[str] = None,
                   store_filename: Optional[str] = None,
                   media_files: Union[list,tuple,None] = None,
-                  new_record = M3URecord ):
+                  new_record = M3URecord,
+                  streaming: bool = False,
+                  chunk_size: int = 65536,
+                  encoding: Optional[str] = None,
+                  cache: Optional[M3UFetchCache] = None,
+                  memory_map: bool = False,
+                  workers: int = 0,
+                  shard_size: int = 4194304,
+                  lazy_attributes: bool = False,
+                  keep_source: bool = False,
+                  session: Optional[M3USession] = None,
+                  instrumentation: Optional[M3UInstrumentation] = None ):
         """The constructor of the deserializer
 
         :param url_filename:    maybe filename or webaddress, when supplied the stream is directly loaded.
         :param store_filename:  optional filename to store the data in a file. specially when using web address.
         :param media_files:     list/tuple with additional extensions for recognizing movies and series.
         :param new_record:      optional for overriding the default M3URecord class.
+        :param streaming:       when True the data is parsed in chunks while iterating instead of loaded into memory.
+        :param chunk_size:      size of the chunks read in streaming mode and while downloading.
+        :param encoding:        optional encoding of the downloaded data, default from the Content-Type header or utf-8.
+        :param cache:           optional M3UFetchCache for conditional downloads of http/https addresses.
+        :param memory_map:      when True local files are memory-mapped and parsed without a decoded copy of the file.
+        :param workers:         number of worker processes to parse the loaded or memory-mapped data, 0 or 1 parses in process.
+        :param shard_size:      approximate size of the shards parsed by the worker processes.
+        :param lazy_attributes: when True the records parse the attributes on first access, see M3URecord.
+        :param keep_source:     when True the records keep their original text, see M3URecord.Source.
+        :param session:         optional M3USession for http/https addresses, default the shared session.
+        :param instrumentation: optional M3UInstrumentation to measure the phases.
 
         """
         self.__DATA             = None
+        self.__source           = None
+        self.__MMAP             = None
+        self.__memory_map       = memory_map
+        self.__mapped_filename  = None
+        self.__workers          = workers
+        self.__shard_size       = shard_size
+        self.__keep_source      = keep_source
+        self.__streaming        = streaming
+        self.__chunk_size       = chunk_size
+        self.__encoding         = encoding
+        self.__cache            = cache
+        self.__session          = session
+        self.__instrumentation  = instrumentation
+        self.__directives       = M3UDirectives()
         self.__media_files      = [ '.mp4', '.avi', '.mkv', '.flv' ]
         self.__store_filename   = store_filename
         self.__new_record       = new_record
@@ -70,6 +241,10 @@ class M3UDeserializer( object ):
                 if item not in self.__media_files:
                     self.__media_files.append( item )
 
+        self.__record_kwargs    = { 'media_files': self.__media_files }
+        if lazy_attributes:
+            self.__record_kwargs[ 'lazy_attributes' ] = True
+
         self.__url_filename = url_filename
         return
 
@@ -83,21 +258,27 @@ class M3UDeserializer( object ):
         if isinstance( data, str ):
             self.__DATA             = data
 
+        elif isinstance( data, _io.TextIOWrapper ) and self.__streaming:
+            self.__source           = partial( self.__read_chunks, data )
+
         elif isinstance( data, _io.TextIOWrapper ):
             self.__DATA             = data.read()
 
         else:
             raise InvalidParameter( 'M3UDeserializer.set( data ) data must be str or stream' )
 
+        self.__scan_header()
         return
 
     def open( self, url_filename:Optional[str] = None ) -> None:
         """Opens the url or filename and loads the data to internal memory
 
+        In streaming mode the data is not loaded, it is read while iterating.
+
         :param url_filename:    maybe filename or webaddress, when supplied the stream is directly loaded.
         :return:                None
         """
-        if self.__DATA is not None:
+        if self.__DATA is not None or self.__source is not None or self.__MMAP is not None:
             raise AlreadyOpened()
 
         if isinstance( url_filename, str ):
@@ -115,15 +296,66 @@ class M3UDeserializer( object ):
         else:
             self.__open_file( self.__url_filename )
 
+        self.__scan_header()
+        return
+
+    def __scan_header( self ) -> None:
+        """Reads the #EXTM3U and #PLAYLIST directives before the first record of the loaded or memory-mapped data.
+
+        :return:                None
+        """
+        directives = M3UDirectives()
+        if self.__MMAP is not None:
+            matches, encoding = RE_DIRECTIVE_BYTES.finditer( self.__MMAP ), self.__encoding or 'utf-8'
+
+        elif isinstance( self.__DATA, str ):
+            matches, encoding = RE_DIRECTIVE.finditer( self.__DATA ), None
+
+        else:
+            return
+
+        for _ in _items( matches, encoding, False, directives ):
+            break
+
+        self.__directives = directives
         return
 
+    @property
+    def Header( self ) -> dict:
+        """The attributes of the #EXTM3U header, like url-tvg and x-tvg-url
+
+        :return:                dict with the attributes
+        """
+        return self.__directives.Header
+
+    @property
+    def Playlist( self ) -> Optional[str]:
+        """The title of the #PLAYLIST directive
+
+        :return:                the title or None
+        """
+        return self.__directives.Playlist
+
     def close( self ) -> None:
         """Deletes the allocted data.
 
         :return:                None
         """
         self.__DATA             = None
+        self.__source           = None
         self.__url_filename     = None
+        self.__close_mmap()
+        return
+
+    def __close_mmap( self ) -> None:
+        """Closes the memory-mapped file when opened.
+
+        :return:                None
+        """
+        if self.__MMAP is not None:
+            self.__MMAP.close()
+            self.__MMAP = None
+
         return
 
     def __open_file( self, filename: str ) -> None:
@@ -132,9 +364,44 @@ class M3UDeserializer( object ):
         :param filename:        filename to be loaded into memory.
         :return:                None
         """
-        log.info( f'Loading FILE {filename}' )
-        with open( filename, 'r' ) as stream:
-            self.__DATA = stream.read()
+        compression = detect_file( filename )
+        if self.__streaming:
+            self.__source = partial( self.__stream_file, filename, compression )
+            return
+
+        if self.__memory_map and compression is None:
+            log.info( f'Mapping FILE {filename}' )
+            with open( filename, 'rb' ) as stream:
+                size = os.fstat( stream.fileno() ).st_size
+                if size == 0:
+                    # An empty file cannot be mapped
+                    self.__DATA = ''
+                    return
+
+                self.__MMAP = mmap.mmap( stream.fileno(), 0, access = mmap.ACCESS_READ )
+                self.__mapped_filename = filename
+
+            log.info( f'Size of mapped data {size}' )
+            return
+
+        if compression is None:
+            log.info( f'Loading FILE {filename}' )
+            stream = open( filename, 'r' )
+
+        else:
+            # A compressed file cannot be mapped, it is decompressed into memory
+            log.info( f'Loading {compression} compressed FILE {filename}' )
+            stream = open_compressed( filename, 'rt', compression, encoding = self.__encoding )
+
+        with stream:
+            if self.__instrumentation is None:
+                self.__DATA = stream.read()
+
+            else:
+                with self.__instrumentation.timer( 'fetch' ):
+                    self.__DATA = stream.read()
+
+                self.__instrumentation.count( 'bytes_read', stream.buffer.tell() )
 
         log.info( f'Size of loaded data {len(self.__DATA)}' )
         return
@@ -145,18 +412,302 @@ class M3UDeserializer( object ):
         :param url:             URL to be loaded into memory.
         :return:                None
         """
+        if self.__streaming:
+            self.__source = partial( self.__download_chunks, url )
+            return
+
+        self.__DATA = ''.join( self.__download_chunks( url ) )
+        log.info( f'Size of downloaded data {len(self.__DATA)}' )
+        return
+
+    def __read_chunks( self, stream ) -> Iterator[str]:
+        """Reads the text `stream` in chunks of `chunk_size`.
+
+        :param stream:          text stream to read from.
+        :return:                iterator of str chunks
+        """
+        while True:
+            chunk = stream.read( self.__chunk_size )
+            if chunk == '':
+                break
+
+            yield chunk
+
+        return
+
+    def __stream_file( self, filename: str, compression: Optional[str] = None ) -> Iterator[str]:
+        """Opens the `filename` and reads the data in chunks, compressed files are decompressed while reading.
+
+        :param filename:        filename to be streamed.
+        :param compression:     optional compression of the file, see compression.detect().
+        :return:                iterator of str chunks
+        """
+        log.info( f'Streaming FILE {filename}' )
+        with ( open( filename, 'r' ) if compression is None else
+               open_compressed( filename, 'rt', compression, encoding = self.__encoding ) ) as stream:
+            if self.__instrumentation is None:
+                yield from self.__read_chunks( stream )
+
+            else:
+                yield from self.__instrumentation.iterate( 'fetch', self.__read_chunks( stream ), 'chars_read', sized = True )
+
+        return
+
+    def __download_chunks( self, url: str ) -> Iterator[str]:
+        """Opens the `url` and yields the decoded data in chunks while downloading.
+
+        When a cache is set a conditional request is sent, on 304 Not Modified the data is read
+        from the cached copy.
+
+        :param url:             URL to be downloaded.
+        :return:                iterator of str chunks
+        """
         log.info( f'Downloading URL {url}' )
-        r = requests.get( url )
-        if r.status_code == 200:
-            log.info( f'Size of downloaded data {len(r.text)}' )
-            self.__DATA = r.text
-            if isinstance( self.__store_filename, str ):
-                with open( self.__store_filename, 'w' ) as stream:
-                    stream.write( self.__DATA  )
+        headers = {} if self.__cache is None else self.__cache.headers( url )
+        session = self.__session if self.__session is not None else M3USession.shared()
+        with session.get( url, headers = headers ) as r:
+            if r.status_code == 304 and self.__cache is not None:
+                filename, encoding = self.__cache.hit( url )
+                with open( filename, 'rb' ) as stream:
+                    yield from self.__decode_chunks( iter( partial( stream.read, self.__chunk_size ), b'' ), encoding )
+
+                return
+
+            if r.status_code != 200:
+                log.error( f'Download error {r.status_code}' )
+                raise DownloadError( r.status_code )
+
+            encoding = self.__response_encoding( r )
+            chunks = r.iter_content( self.__chunk_size )
+            if self.__instrumentation is not None:
+                chunks = self.__instrumentation.iterate( 'fetch', chunks, 'bytes_fetched', sized = True )
+
+            if self.__cache is None:
+                yield from self.__decode_chunks( chunks, encoding )
+
+            else:
+                with self.__cache.store( url, r.headers, encoding ) as cache_stream:
+                    yield from self.__decode_chunks( chunks, encoding, cache_stream )
+
+        return
+
+    def __decode_chunks( self, chunks: Iterator[bytes], encoding: str, cache_stream = None ) -> Iterator[str]:
+        """Decodes the raw `chunks` and yields the data as str chunks.
+
+        The raw bytes are written to the cache as they arrive, compressed data is decompressed and written to
+        the `store_filename`, compressed when its extension is of a compression. The body is never held
+        as a whole in memory by this function.
+
+        :param chunks:          iterator of raw bytes chunks.
+        :param encoding:        encoding of the data.
+        :param cache_stream:    optional binary stream of the cache to write the data to.
+        :return:                iterator of str chunks
+        """
+        decoder = codecs.getincrementaldecoder( encoding )( errors = 'replace' )
+        instrumentation = self.__instrumentation
+        store = None
+        if isinstance( self.__store_filename, str ):
+            store = open_compressed( self.__store_filename, 'wb', detect( self.__store_filename ) )
+
+        try:
+            for data in decompress_chunks( self.__tee_chunks( chunks, cache_stream ) ):
+                if store is not None:
+                    store.write( data )
+
+                if instrumentation is None:
+                    chunk = decoder.decode( data )
+
+                else:
+                    with instrumentation.timer( 'decode' ):
+                        chunk = decoder.decode( data )
+
+                    instrumentation.count( 'chars_decoded', len( chunk ) )
+
+                if chunk != '':
+                    yield chunk
+
+            chunk = decoder.decode( b'', final = True )
+            if chunk != '':
+                yield chunk
+
+        finally:
+            if store is not None:
+                store.close()
+
+        return
+
+    def __tee_chunks( self, chunks: Iterator[bytes], cache_stream = None ) -> Iterator[bytes]:
+        """Yields the raw `chunks` and writes them to the cache.
+
+        :param chunks:          iterator of raw bytes chunks.
+        :param cache_stream:    optional binary stream of the cache to write the data to.
+        :return:                iterator of raw bytes chunks
+        """
+        size = 0
+        for data in chunks:
+            size += len( data )
+            if cache_stream is not None:
+                cache_stream.write( data )
+
+            yield data
+
+        log.info( f'Size of downloaded bytes {size}' )
+        return
+
+    def __response_encoding( self, response: requests.Response ) -> str:
+        """Gets the encoding of the downloaded data
+
+        This is the 'encoding' passed to the constructor, the charset from the Content-Type header or 'utf-8'.
+        The body is not inspected to guess the charset.
+
+        :param response:        the response of the download.
+        :return:                name of the encoding
+        """
+        if self.__encoding is not None:
+            return self.__encoding
+
+        for parameter in response.headers.get( 'content-type', '' ).split( ';' )[ 1: ]:
+            key, _, value = parameter.partition( '=' )
+            if key.strip().lower() == 'charset':
+                try:
+                    return codecs.lookup( value.strip( ' "\'' ) ).name
+
+                except LookupError:
+                    log.warning( f'Unknown charset {value}, using utf-8' )
+
+        return 'utf-8'
+
+    def __items( self ) -> Iterator[tuple]:
+        """Yields the elements ( duration, attributes, name, link ), source and directives of the records from the data stream.
+
+        :return:                iterator of tuples ( ( duration, attributes, name, link ), source, directives )
+        """
+        directives = self.__directives = M3UDirectives()
+        if self.__MMAP is not None:
+            yield from _items( RE_DIRECTIVE_BYTES.finditer( self.__MMAP ), self.__encoding or 'utf-8', self.__keep_source,
+                               directives )
+            return
+
+        if self.__source is None:
+            if not isinstance( self.__DATA, str ) or self.__DATA == '':
+                raise NoDataAvailable()
+
+            yield from _items( RE_DIRECTIVE.finditer( self.__DATA ), None, self.__keep_source, directives )
+            return
+
+        yield from _items( self.__stream_matches(), None, self.__keep_source, directives )
+        return
+
+    def __stream_matches( self ) -> Iterator:
+        """Yields the regular expression matches of the records while reading the data in chunks.
+
+        :return:                iterator of match objects
+        """
+        parser = M3UChunkParser()
+        empty = True
+        for chunk in self.__source():
+            empty = empty and chunk == ''
+            yield from parser.feed( chunk )
+
+        if empty:
+            raise NoDataAvailable()
+
+        yield from parser.finish()
+        return
+
+    def __shards( self ) -> Iterator:
+        """Splits the loaded or memory-mapped data into shards at the #EXTINF boundaries.
+
+        The options preceding the #EXTINF directive are kept in the shard of the record, the #EXTGRP group
+        in effect at the start of the shard is found with a backward search in the preceding shard.
+
+        :return:                iterator of tuples ( shard, group ), the shard is a str or tuple ( filename, start, end )
+        """
+        if self.__MMAP is not None:
+            data, encoding = self.__MMAP, self.__encoding or 'utf-8'
+            separator, newline, grouping = b'\n#EXTINF', b'\n', b'\n#EXTGRP'
+            options = tuple( option.encode( 'ascii' ) for option in OPTION_DIRECTIVES )
+
+        elif isinstance( self.__DATA, str ) and self.__DATA != '':
+            data, encoding = self.__DATA, None
+            separator, newline, grouping, options = '\n#EXTINF', '\n', '\n#EXTGRP', OPTION_DIRECTIVES
 
         else:
-            log.error( f'Download error {r.status_code}' )
-            raise DownloadError( r.status_code )
+            raise NoDataAvailable()
+
+        group = None
+        start = 0
+        while start < len( data ):
+            # The shard contains at least one #EXTINF directive, also when it starts with options
+            end = data.find( separator, max( start + self.__shard_size, data.find( separator, start ) + 1 ) )
+            if end == -1:
+                end = len( data )
+
+            else:
+                while True:
+                    line = data.rfind( newline, start, end )
+                    if line <= start or not data[ line + 1: line + 11 ].startswith( options ):
+                        break
+
+                    end = line
+
+            yield ( ( self.__mapped_filename, start, end ) if self.__MMAP is not None else data[ start: end ] ), group
+            # The line start of the last #EXTGRP directive, also on the first line without a preceding newline
+            position = data.rfind( grouping, start, end ) + 1
+            if position > 0 or ( start == 0 and data[ :7 ] == grouping[ 1: ] ):
+                eol = data.find( newline, position, end )
+                value = data[ position + 7: eol if eol != -1 else end ]
+                if encoding is not None:
+                    value = value.decode( encoding, 'replace' )
+
+                group = value.lstrip( ':' ).strip() or None
+
+            start = end
+
+        return
+
+    def __parallel_records( self ) -> Iterator[M3URecord]:
+        """Parses the shards in a process pool and yields the records in the original order.
+
+        The channel numbers are corrected for the records of the preceding shards.
+
+        :return:                iterator of records
+        """
+        encoding = self.__encoding or 'utf-8'
+        debug = log.isEnabledFor( logging.DEBUG )
+        pending = deque()
+        channelNumber = 1
+        with ProcessPoolExecutor( max_workers = self.__workers ) as executor:
+            try:
+                shards = self.__shards()
+                while True:
+                    # Keep the number of shards in flight bound, to keep the memory usage bound.
+                    for shard, group in shards:
+                        pending.append( executor.submit( _parse_shard, shard, encoding, self.__new_record, self.__record_kwargs,
+                                                       self.__keep_source, group ) )
+                        if len( pending ) >= self.__workers * 2:
+                            break
+
+                    if len( pending ) == 0:
+                        break
+
+                    records = pending.popleft().result()
+                    for record in records:
+                        # The stored channel number, the lazy attributes are not parsed and the source is kept
+                        channel = record.Channel
+                        if channelNumber > 1 and channel is not None:
+                            record.attribute( 'channel', channel + channelNumber - 1 )
+
+                        if debug:
+                            log.debug( f'{record.Group} :: {record}' )
+
+                        yield record
+
+                    channelNumber += len( records )
+
+            finally:
+                for future in pending:
+                    future.cancel()
 
         return
 
@@ -165,18 +716,70 @@ class M3UDeserializer( object ):
 
         :return:                None
         """
-        # Conversion needed as endswith() only accepts str or tuple
-        if not isinstance( self.__DATA, str ) or self.__DATA == '':
-            raise NoDataAvailable()
+        if self.__instrumentation is not None:
+            yield from self.__instrumented_records()
+            return
 
+        if self.__workers > 1 and self.__source is None:
+            yield from self.__parallel_records()
+            return
+
+        debug = log.isEnabledFor( logging.DEBUG )
         channelNumber = 1
-        for item in self.__RE_ITEM.findall( self.__DATA ):
-            record = self.__new_record( media_files = self.__media_files )
+        for item, source, extras in self.__items():
+            record = self.__new_record( **self.__record_kwargs )
+            if extras is not None:
+                record.setDirectives( *extras )
+
             record.set( *item, channel = channelNumber )
-            log.debug( f'{record.Group} :: {record}' )
+            if source is not None:
+                record.setSource( source )
+
+            if debug:
+                log.debug( f'{record.Group} :: {record}' )
+
+            yield record
+            channelNumber += 1
+
+        return
+
+    def __instrumented_records( self ) -> Iterator:
+        """The same as __iter__(), with the phases measured by the instrumentation.
+
+        With workers the phases run in the worker processes, the time waiting for the shards is counted as 'build'.
+
+        :return:                iterator of records
+        """
+        instrumentation = self.__instrumentation
+        if self.__workers > 1 and self.__source is None:
+            yield from instrumentation.iterate( 'build', self.__parallel_records(), 'records' )
+            instrumentation.report( log.name )
+            return
+
+        debug = log.isEnabledFor( logging.DEBUG )
+        channelNumber = 1
+        for item, source, extras in instrumentation.iterate( 'tokenize', self.__items(), 'items' ):
+            instrumentation.start( 'build' )
+            try:
+                record = self.__new_record( **self.__record_kwargs )
+                if extras is not None:
+                    record.setDirectives( *extras )
+
+                record.set( *item, channel = channelNumber )
+                if source is not None:
+                    record.setSource( source )
+
+            finally:
+                instrumentation.stop()
+
+            instrumentation.count( 'records' )
+            if debug:
+                log.debug( f'{record.Group} :: {record}' )
+
             yield record
             channelNumber += 1
 
+        instrumentation.report( log.name )
         return
 
     def __enter__( self ):
@@ -190,4 +793,6 @@ class M3UDeserializer( object ):
 
     def __exit__( self, exc_type, exc_value, exc_traceback ):
         self.__DATA = ''
+        self.__source = None
+        self.__close_mmap()
         return
@@ -15,9 +15,13 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import re
+import sys
 import json
 from typing import Union, Optional
+from functools import lru_cache
+from collections import deque
 from enum import Enum
+from m3u_serializer.memo import M3ULRUCache
 
 
 class M3uItemType( Enum ):
@@ -27,20 +31,233 @@ class M3uItemType( Enum ):
     MOVIE           = 3
 
 
-class M3URecord( object ):
-    """Contains the data elements of the M3U record
+RE_ATTRIBUTE    = re.compile( r"(\w*-\w*)=([\"'].*?[\"'])" )
+MEDIA_FILES     = ( '.mp4', '.avi', '.mkv', '.flv' )
+RE_SERIE        = re.compile( r'([\W\w\s\d&!-_]+)(([Ss]\d{1,2})([ -]+|)([EeXx]\d{1,2}))', re.UNICODE )
+# Zero-width, so every position is tried once without backtracking over the title
+RE_EPISODE      = re.compile( r'(?=([Ss]\d{1,2})[ -]*([EeXx]\d{1,2}))' )
+COUNTRY_CODES   = [ 'UK', 'FR', 'PL', 'US', 'NL', 'BE', 'DE', 'SE', 'DK', 'ES', 'NO', 'RO', 'PT', 'TR', 'IN', 'AR', 'IE', 'IT', 'AF',
+                    'CA', 'AL', 'GR', 'HU', 'BG', 'YU', 'FI', 'PK', 'RU', 'PB' ]
+COUNTRY_TRANSLATES  = {
+    'EX YU': 'YU',
+    'EX-YU': 'YU',
+    'CA-FR': 'FR',
+    'NL H265': 'NL',
+    'NL HEVC': 'NL',
+    'SE VIP': 'SE',
+    'NO VIP': 'NO',
+    'PL VIP': 'PL',
+    'RO(L)': 'RO'
+}
+
+
+@lru_cache( maxsize = 64 )
+def _media_extensions( media_files: tuple = () ) -> tuple:
+    """Gets the tuple of media extensions, the default extensions with the additional `media_files`.
+
+    The result is cached, so all the records with the same configuration share the same tuple.
+
+    :param media_files:     tuple with additional extensions.
+    :return:                tuple with extensions
+    """
+    return MEDIA_FILES + tuple( item for item in dict.fromkeys( media_files ) if item not in MEDIA_FILES )
+
 
+def media_extensions( media_files: Union[list,tuple,None] = None ) -> tuple:
+    """Gets the shared tuple of media extensions for recognizing movies and series.
+
+    :param media_files:     list/tuple with additional extensions.
+    :return:                tuple with extensions
     """
-    __RE_ATTRIBUTE      = re.compile( r"(\w*-\w*)=([\"'].*?[\"'])" )
+    if isinstance( media_files, ( list, tuple ) ):
+        return _media_extensions( tuple( media_files ) )
 
-    def __init__( self, *args, **kwargs ):
+    return _media_extensions()
+
+
+def classify( name: str, group: str, link: str, media_files: tuple ) -> tuple:
+    """Detects the series, movie or TV channel from the name and link of the record.
+
+    :param name:            name (title) of the record.
+    :param group:           the group-title of the record.
+    :param link:            the stream link address.
+    :param media_files:     tuple with extensions for recognizing movies and series.
+    :return:                tuple ( <type>, <season>, <episode>, <genre>, <group> )
+    """
+    # Same result as RE_SERIE.search(), the last season/episode that is not at the start of the name
+    last = deque( RE_EPISODE.finditer( name, 1 ), maxlen = 1 )
+    if len( last ) > 0:
+        result = last[ 0 ]
+        return M3uItemType.SERIE_EPISODE, result.group( 1 ), result.group( 2 ), group, name[ :result.start() ].strip()
+
+    if link.endswith( media_files ):
+        return M3uItemType.MOVIE, '', '', group, f'Movies: {group}'
+
+    return M3uItemType.IPTV_CHANNEL, '', '', group, group
+
+
+def country_code( name: str, char: str, codes = COUNTRY_CODES, translates = COUNTRY_TRANSLATES ) -> tuple:
+    """This retrieve the country code from the 'name' string,
+
+    :param name:        May be the title of the stream or the group-title
+    :param char:        character to be used to split the title and country code.
+    :param codes:       the country codes.
+    :param translates:  dictionary with the translations to the country codes.
+    :return:            tuple of two elements ( <title>, <country-code> ), where country-code maybe None when not found
+    """
+    country = None
+    names = [ item.strip() for item in name.split( char, 1 ) ]
+    if len( names ) > 1:
+        prefix, suffix = names
+        if prefix in translates:
+            prefix = translates[ prefix ]
+
+        if suffix in translates:
+            suffix = translates[ suffix ]
+
+        if len( prefix ) == 2 and prefix in codes:
+            name = suffix
+            country = prefix
+
+        elif len( suffix ) == 2 and suffix in codes:
+            name = prefix
+            country = suffix
+
+    return name, country
+
+
+class M3UNormalizer( object ):
+    """Memoized country code detection and group normalisation
+
+    The name prefixes and suffixes ("NL", "UK", "EX-YU") and the group titles repeat a lot in a playlist.
+    The country code of each prefix or suffix and the interned group titles are kept in bounded LRU caches.
+    The country codes and translations can be extended, only the affected entries are invalidated.
+
+    Each normalizer has its own copy of the country codes and translations, extending one normalizer
+    does not change COUNTRY_CODES, COUNTRY_TRANSLATES or the default normalizer NORMALIZER.
+
+    """
+    def __init__( self, codes: list = COUNTRY_CODES, translates: dict = COUNTRY_TRANSLATES, maxsize: int = 4096 ):
+        """Constructor
+
+        :param codes:       the country codes.
+        :param translates:  dictionary with the translations to the country codes.
+        :param maxsize:     the maximum number of entries per cache.
+        """
+        self.__codes        = list( codes )
+        self.__translates   = dict( translates )
+        self.__tokens       = M3ULRUCache( maxsize )
+        self.__groups       = M3ULRUCache( maxsize )
+        self.__token_size   = max( [ 2 ] + [ len( token ) for token in self.__translates ] )
+        return
+
+    def __token( self, token: str ) -> tuple:
+        """Translates the prefix or suffix of a name
+
+        :param token:       the prefix or suffix.
+        :return:            tuple ( <translated token>, <True when a country code> )
+        """
+        token = self.__translates.get( token, token )
+        return token, len( token ) == 2 and token in self.__codes
+
+    def countryCode( self, name: str, char: str ) -> tuple:
+        """This retrieve the country code from the 'name' string, with the same result as country_code()
+
+        :param name:        May be the title of the stream or the group-title
+        :param char:        character to be used to split the title and country code.
+        :return:            tuple of two elements ( <title>, <country-code> ), where country-code maybe None when not found
+        """
+        names = name.split( char, 1 )
+        if len( names ) > 1:
+            prefix, is_prefix = self.__lookup( names[ 0 ].strip() )
+            suffix, is_suffix = self.__lookup( names[ 1 ].strip() )
+            if is_prefix:
+                return suffix, prefix
+
+            if is_suffix:
+                return prefix, suffix
+
+        return name, None
+
+    def __lookup( self, token: str ) -> tuple:
+        """Gets the translated token, only tokens that may be a country code are cached,
+        so the titles do not push the country codes out of the cache.
+
+        :param token:       the prefix or suffix.
+        :return:            tuple ( <translated token>, <True when a country code> )
+        """
+        if len( token ) > self.__token_size:
+            return token, False
+
+        return self.__tokens.get( token, self.__token )
+
+    def group( self, value: str ) -> str:
+        """Gets the interned group title, so the records with the same group share the string
+
+        :param value:       the group title.
+        :return:            the interned group title
+        """
+        return self.__groups.get( value, sys.intern )
+
+    def addCountryCode( self, code: str ) -> None:
+        """Adds the country code, only the cached entries of the code and its translations are invalidated
+
+        :param code:        the two letter country code.
+        :return:            None
+        """
+        if code not in self.__codes:
+            self.__codes.append( code )
+
+        self.__tokens.invalidate( code )
+        for token, value in self.__translates.items():
+            if value == code:
+                self.__tokens.invalidate( token )
+
+        return
+
+    def addCountryTranslate( self, token: str, code: str ) -> None:
+        """Adds the translation of a prefix or suffix to a country code, only the cached entry of the token is invalidated
+
+        :param token:       the prefix or suffix, for example 'EX-YU'.
+        :param code:        the country code, for example 'YU'.
+        :return:            None
+        """
+        self.__translates[ token ] = code
+        self.__token_size = max( self.__token_size, len( token ) )
+        self.__tokens.invalidate( token )
+        return
+
+    def statistics( self ) -> dict:
+        """Gets the counters of the caches
+
+        :return:            dict with the statistics of the 'country' and 'group' caches
+        """
+        return { 'country': self.__tokens.statistics(), 'group': self.__groups.statistics() }
+
+
+NORMALIZER = M3UNormalizer()
+class M3URecordBase( object ):
+    """Contains the data elements and the property API shared by M3URecord and M3UCompactRecord
+
+    The classes only differ in how the attributes are stored, they implement _getAttribute(), _setAttribute(),
+    _setAttributes() and _clearAttributes(), and getAttributes(), jsonToAttributes() and attributesToJson().
+
+    The deserializer may set the original text of the record (Source), any modification clears it.
+    The serializer writes the original text verbatim as long as it is available.
+
+    """
+    __slots__ = ( '__duration', '__name', '__link', '__source', '__directives', '__channel' )
+
+    def __init__( self ):
         """Constructor
 
         """
         self.__duration     = '-1'
         self.__name         = ''
         self.__link         = ''
-        self.__attributes   = {}
+        self.__source       = None
+        self.__directives   = None
+        self.__channel      = None
         return
 
     def clear( self ) -> None:
@@ -51,7 +268,33 @@ class M3URecord( object ):
         self.__duration     = '-1'
         self.__name         = ''
         self.__link         = ''
-        self.__attributes   = {}
+        self.__source       = None
+        self.__directives   = None
+        self.__channel      = None
+        self._clearAttributes()
+        return
+
+    def _clearAttributes( self ) -> None:
+        raise NotImplementedError()
+
+    def _getAttribute( self, key: str, default = None ):
+        raise NotImplementedError()
+
+    def _setAttribute( self, key: str, value ) -> None:
+        raise NotImplementedError()
+
+    def _setAttributes( self, attributes: Union[str,dict] ) -> None:
+        raise NotImplementedError()
+
+    def __put( self, key: str, value ) -> None:
+        """Sets the value of the attribute `key`, the original text of the record is cleared.
+
+        :param key:         name of the attribute
+        :param value:       attribute value
+        :return:            None
+        """
+        self._setAttribute( key, value )
+        self.__source = None
         return
 
     ARG_DURATION    = 0
@@ -70,17 +313,10 @@ class M3URecord( object ):
         :param data:            list of elements
         :return:                None
         """
+        self.__source       = None
         self.__duration     = args[ self.ARG_DURATION ]
         if len( args ) == self.FULL_ARGS:
-            if isinstance( args[ self.ARG_ATTRIBUTES ], str ):
-                for label, value in self.__RE_ATTRIBUTE.findall( args[ self.ARG_ATTRIBUTES ] ):
-                    value = value.replace( '"', '' ).strip()
-                    self.__attributes[ label.strip() ] = value
-
-            elif isinstance( args[ self.ARG_ATTRIBUTES ], dict ):
-                for attr, value in args[ self.ARG_ATTRIBUTES ].items():
-                    self.__attributes[ attr ] = value
-
+            self._setAttributes( args[ self.ARG_ATTRIBUTES ] )
             offset = self.ARG_NAME
 
         else:
@@ -99,9 +335,6 @@ class M3URecord( object ):
             elif key == 'name':
                 self.attribute( 'tvg-name', value )
 
-            elif key == 'id':
-                self.attribute( 'tvg-logo', value )
-
         return
 
     @property
@@ -118,22 +351,20 @@ class M3URecord( object ):
 
         :return:        Returns the duration of the stream, maybe -1
         """
+        self.__source = None
         if isinstance( value, str ):
             value = value.strip()
             try:
                 self.__duration = str( float( value ) )
 
-            except:
+            except ValueError:
                 try:
                     self.__duration = str( int( value ) )
 
-                except:
+                except ValueError:
                     raise ValueError( 'M3URecord::Duration as string must contain a int or float' )
 
-        elif isinstance( value, int ):
-            self.__duration = str( value )
-
-        elif isinstance( value, float ):
+        elif isinstance( value, ( int, float ) ):
             self.__duration = str( value )
 
         else:
@@ -158,6 +389,7 @@ class M3URecord( object ):
         """
         if isinstance( value, str ):
             self.__name = value
+            self.__source = None
             return
 
         raise ValueError( 'M3URecord::Name must contain a string' )
@@ -168,9 +400,15 @@ class M3URecord( object ):
 
         In case of a series this shall contain the series name
 
+        Without a group-title the group of the #EXTGRP directive is used.
+
         :return:        the group-title or empty string.
         """
-        return self.__attributes.get( 'group-title', '' )
+        group = self._getAttribute( 'group-title' )
+        if group is None and self.__directives is not None:
+            return self.__directives[ 0 ] or ''
+
+        return group if group is not None else ''
 
     @Group.setter
     def Group( self, value: str ) -> None:
@@ -180,7 +418,7 @@ class M3URecord( object ):
         :return:        None
         """
         if isinstance( value, str ):
-            self.__attributes[ 'group-title' ] = value
+            self.__put( 'group-title', value )
             return
 
         raise ValueError( 'M3URecord::Group must contain a string' )
@@ -202,6 +440,7 @@ class M3URecord( object ):
         """
         if isinstance( value, str ):
             self.__link = value
+            self.__source = None
             return
 
         raise ValueError( 'M3URecord::Link must contain a string' )
@@ -212,7 +451,7 @@ class M3URecord( object ):
 
         :return:        the tvg-id or empty string.
         """
-        return self.__attributes.get( 'tvg-id', '' )
+        return self._getAttribute( 'tvg-id', '' )
 
     @TvgId.setter
     def TvgId( self, value: str ) -> None:
@@ -222,7 +461,7 @@ class M3URecord( object ):
         :return:        None
         """
         if isinstance( value, str ):
-            self.__attributes[ 'tvg-id' ] = value
+            self.__put( 'tvg-id', value )
             return
 
         raise ValueError( 'M3URecord::TvgId must contain a string' )
@@ -233,7 +472,7 @@ class M3URecord( object ):
 
         :return:        the tvg-logo or empty string.
         """
-        return self.__attributes.get( 'tvg-logo', '' )
+        return self._getAttribute( 'tvg-logo', '' )
 
     @TvgLogo.setter
     def TvgLogo( self, value: str ) -> None:
@@ -243,7 +482,7 @@ class M3URecord( object ):
         :return:        None
         """
         if isinstance( value, str ):
-            self.__attributes[ 'tvg-logo' ] = value
+            self.__put( 'tvg-logo', value )
             return
 
         raise ValueError( 'M3URecord::TvgLogo must contain a string' )
@@ -254,7 +493,7 @@ class M3URecord( object ):
 
         :return:        the tvg-name or empty string.
         """
-        return self.__attributes.get( 'tvg-name', '' )
+        return self._getAttribute( 'tvg-name', '' )
 
     @TvgName.setter
     def TvgName( self, value: str ) -> None:
@@ -264,7 +503,7 @@ class M3URecord( object ):
         :return:        None
         """
         if isinstance( value, str ):
-            self.__attributes[ 'tvg-name' ] = value
+            self.__put( 'tvg-name', value )
             return
 
         raise ValueError( 'M3URecord::TvgName must contain a string' )
@@ -272,83 +511,246 @@ class M3URecord( object ):
     def attribute( self, key, value: Optional[str] = None ) -> Optional[str]:
         """Returns the attribute requested by key or None
 
+        The channel number set by the deserializer is kept apart from the attributes, it is not written
+        and leaves the original attribute text untouched.
+
         :param key:     name of the attribute
         :rtype:         str or None
         :return:        attribute value as a string
         """
         if value is None:
-            return self.__attributes.get( key )
+            if key == 'channel' and self.__channel is not None:
+                return self.__channel
+
+            return self._getAttribute( key )
 
         if isinstance( value, str ):
-            self.__attributes[ key ] = value
+            self.__put( key, value )
             return
 
         if isinstance( value, int ) and key == 'channel':
-            self.__attributes[ key ] = value
+            self.__channel = value
             return
 
         raise ValueError( f'M3URecord::attribute( {key}, value ) must contain a string' )
 
+    @property
+    def Channel( self ) -> Optional[int]:
+        """The channel number set by the deserializer, without parsing the attributes
+
+        :return:        the channel number or None
+        """
+        return self.__channel
+
+    @property
+    def Source( self ) -> Optional[str]:
+        """The original text of the record, the #EXTINF directive and link, without the last line end.
+
+        This is only available when set by the deserializer (keep_source) and as long as the record is not modified.
+
+        :return:        the original text or None
+        """
+        return self.__source
+
+    def setSource( self, source: Optional[str] ) -> None:
+        """Sets the original text of the record, it is cleared when the record is modified.
+
+        :param source:  the #EXTINF directive and link text or None
+        :return:        None
+        """
+        self.__source = source
+        return
+
+    @property
+    def ExtGroup( self ) -> Optional[str]:
+        """The group of the #EXTGRP directive in effect for the record, see M3UDirectives
+
+        :return:        the group or None
+        """
+        return self.__directives[ 0 ] if self.__directives is not None else None
+
+    @property
+    def Options( self ) -> tuple:
+        """The #EXTVLCOPT and #KODIPROP option lines of the record, written between the #EXTINF directive and the link.
+
+        :return:        tuple with the option lines
+        """
+        return self.__directives[ 1 ] if self.__directives is not None else ()
+
+    @property
+    def InlineGroup( self ) -> bool:
+        """True when the #EXTGRP directive is part of the record text, between the #EXTINF directive and the link, see Source.
+
+        :return:        True when the source contains the #EXTGRP directive
+        """
+        return self.__directives[ 2 ] if self.__directives is not None else False
+
+    def setDirectives( self, group: Optional[str] = None, options: Union[tuple,list] = (), inline: bool = False ) -> None:
+        """Sets the #EXTGRP group and the option lines of the record.
+
+        :param group:   the group of the #EXTGRP directive or None
+        :param options: the #EXTVLCOPT and #KODIPROP option lines
+        :param inline:  True when the #EXTGRP directive is part of the record text
+        :return:        None
+        """
+        self.__directives = ( group, tuple( options ), inline ) if group is not None or len( options ) > 0 else None
+        return
+
+    def getAttributes( self ) -> str:
+        raise NotImplementedError()
+
+    def attributesSize( self ) -> int:
+        """The length of the attributes text, without parsing or building it.
+
+        :return:    number of characters
+        """
+        return len( self.getAttributes() )
+
+    def __repr__(self):
+        return f'<{type( self ).__name__} name="{self.__name}" {self.getAttributes()} link="{self.__link}">'
+
+
+class M3URecord( M3URecordBase ):
+    """Contains the data elements of the M3U record
+
+    With 'lazy_attributes' the attribute string is stored as is and only parsed when an attribute is
+    accessed. As long as no attribute is modified getAttributes() returns the original text, so
+    pass-through copies write the attributes back untouched.
+
+    The deserializer may set the original text of the record (Source), any modification clears it.
+    The serializer writes the original text verbatim as long as it is available.
+
+    """
+    __RE_ATTRIBUTE      = RE_ATTRIBUTE
+    LAZY_ATTRIBUTES     = False
+
+    def __init__( self, *args, **kwargs ):
+        """Constructor
+
+        :param lazy_attributes: optional keyword, when True the attributes are parsed on first access.
+        """
+        super( M3URecord, self ).__init__()
+        self.__attributes   = {}
+        self.__raw_attributes   = None
+        self.__lazy         = kwargs.get( 'lazy_attributes', self.LAZY_ATTRIBUTES )
+        return
+
+    def __parsed( self ) -> dict:
+        """Gets the attributes, parses the attribute string when not done yet.
+
+        :return:            dict with the attributes
+        """
+        if self.__attributes is None:
+            self.__attributes = {}
+            for label, value in self.__RE_ATTRIBUTE.findall( self.__raw_attributes ):
+                label = label.strip()
+                value = value.replace( '"', '' ).strip()
+                self.__attributes[ label ] = NORMALIZER.group( value ) if label == 'group-title' else value
+
+        return self.__attributes
+
+    def __modified( self ) -> dict:
+        """Gets the attributes for modification, the original attribute string is dropped.
+
+        :return:            dict with the attributes
+        """
+        attributes = self.__parsed()
+        self.__raw_attributes = None
+        return attributes
+
+    def _clearAttributes( self ) -> None:
+        self.__attributes   = {}
+        self.__raw_attributes   = None
+        return
+
+    def _getAttribute( self, key: str, default = None ):
+        return self.__parsed().get( key, default )
+
+    def _setAttribute( self, key: str, value ) -> None:
+        self.__modified()[ key ] = value
+        return
+
+    def _setAttributes( self, attributes: Union[str,dict] ) -> None:
+        """Sets the attributes from the attribute string or a dictionary, with lazy attributes the string is kept.
+
+        :param attributes:  the attribute string or dictionary with the attributes
+        :return:            None
+        """
+        if isinstance( attributes, str ):
+            if self.__lazy and self.__attributes is not None and len( self.__attributes ) == 0:
+                self.__raw_attributes = attributes.strip()
+                self.__attributes = None
+
+            else:
+                parsed = self.__modified()
+                for label, value in self.__RE_ATTRIBUTE.findall( attributes ):
+                    label = label.strip()
+                    value = value.replace( '"', '' ).strip()
+                    parsed[ label ] = NORMALIZER.group( value ) if label == 'group-title' else value
+
+        elif isinstance( attributes, dict ):
+            parsed = self.__modified()
+            for attr, value in attributes.items():
+                parsed[ attr ] = value
+
+        return
+
     def getAttributes( self ) -> str:
         """This member functions returns a string with attributes and values for writing.
 
         :return:    string
         """
+        if self.__raw_attributes is not None:
+            return self.__raw_attributes
+
         result = []
-        for attr, value in self.__attributes.items():
+        for attr, value in self.__parsed().items():
             result.append( f'{attr}="{value}"' )
 
         return ' '.join( result )
 
-    def __repr__(self):
-        return f'<M3URecord name="{self.__name}" {self.getAttributes()} link="{self.__link}">'
+    def attributesSize( self ) -> int:
+        """The length of the attributes text, without parsing the lazy attributes.
+
+        :return:    number of characters
+        """
+        if self.__raw_attributes is not None:
+            return len( self.__raw_attributes )
+
+        return sum( len( attr ) + len( str( value ) ) + 4 for attr, value in self.__parsed().items() )
 
     def jsonToAttributes( self, data ):
         self.__attributes = json.loads( data )
+        self.__raw_attributes = None
+        self.setSource( None )
         return
 
     def attributesToJson( self ):
-        return json.dumps( self.__attributes )
+        return json.dumps( self.__parsed() )
 
 
-class M3URecordEx( M3URecord ):
-    """By default the following extensions are recognized as movie or serie. when in the name Sxx Exx is detected in the title
-    the type is assigned to
+class M3URecordExBase( object ):
+    """The detection of series, movies and TV channels shared by M3URecordEx and M3UCompactRecordEx
+
+    By default the following extensions are recognized as movie or serie. when in the name Sxx Exx is detected in the title
+    the type is assigned to. The elements are declared by the record class, M3UCompactRecordEx declares them as slots.
 
     """
-    __RE_SERIE      = re.compile( r'([\W\w\s\d&!-_]+)(([Ss]\d{1,2})([ -]+|)([EeXx]\d{1,2}))', re.UNICODE )
-    __COUNTRY_CODES = [ 'UK', 'FR', 'PL', 'US', 'NL', 'BE', 'DE', 'SE', 'DK', 'ES', 'NO', 'RO', 'PT', 'TR', 'IN', 'AR', 'IE', 'IT', 'AF', 'CA', 'AL',
-                        'GR', 'HU', 'BG', 'YU', 'FI', 'PK', 'RU', 'PB' ]
-    __COUNTRY_TRANSLATES    = {
-        'EX YU': 'YU',
-        'EX-YU': 'YU',
-        'CA-FR': 'FR',
-        'NL H265': 'NL',
-        'NL HEVC': 'NL',
-        'SE VIP': 'SE',
-        'NO VIP': 'NO',
-        'PL VIP': 'PL',
-        'RO(L)': 'RO'
-    }
-
-    def __init__( self, media_files: Optional[list] = None ):
+    __slots__ = ()
+
+    def __init__( self, media_files: Optional[list] = None, **kwargs ):
         """
 
         :param media_files:     optional
         """
-        super( M3URecordEx, self ).__init__()
-        self.__type         = M3uItemType.NONE
-        self.__MEDIA_FILES  = [ '.mp4', '.avi', '.mkv', '.flv' ]
-        self.__season       = ''
-        self.__episode      = ''
-        self.__genre        = ''
-        self.__country      = ''
-        self.__number       = 9999
-        if isinstance( media_files, ( list, tuple ) ):
-            for item in media_files:
-                if item not in self.__MEDIA_FILES:
-                    self.__MEDIA_FILES.append( item )
-
+        super( M3URecordExBase, self ).__init__( **kwargs )
+        self._media_files   = media_extensions( media_files )
+        self._type          = M3uItemType.NONE
+        self._season        = ''
+        self._episode       = ''
+        self._genre         = ''
+        self._country       = ''
+        self._number        = 9999
         return
 
     def clear( self ) -> None:
@@ -356,13 +758,13 @@ class M3URecordEx( M3URecord ):
 
         :return:            None
         """
-        super( M3URecordEx, self ).clear()
-        self.__type         = M3uItemType.NONE
-        self.__season       = ''
-        self.__episode      = ''
-        self.__genre        = ''
-        self.__country      = ''
-        self.__number       = 9999
+        super( M3URecordExBase, self ).clear()
+        self._type          = M3uItemType.NONE
+        self._season        = ''
+        self._episode       = ''
+        self._genre         = ''
+        self._country       = ''
+        self._number        = 9999
         return
 
     def set( self, *args, **kwargs ) -> None:
@@ -380,49 +782,43 @@ class M3URecordEx( M3URecord ):
         :return:                None
         """
         if len( args ) > 0:
-            super( M3URecordEx, self ).set( *args, **kwargs )
-            result = self.__RE_SERIE.search( self.Name )
-            if result:
-                self.__type     = M3uItemType.SERIE_EPISODE
-                groups = result.groups()
-                self.__season   = groups[ 2 ].strip()
-                self.__episode  = groups[ 4 ].strip()
-                self.__genre    = self.Group
-                self.Group      = groups[ 0 ].strip()
-
-            else:
-                self.__type     = M3uItemType.MOVIE if self.Link.endswith( tuple( self.__MEDIA_FILES ) ) else M3uItemType.IPTV_CHANNEL
-                self.__genre    = self.Group
-                if self.__type == M3uItemType.MOVIE:
-                    self.Group  = f'Movies: {self.Group}'
+            super( M3URecordExBase, self ).set( *args, **kwargs )
+            self._type, self._season, self._episode, self._genre, group = classify( self.Name, self.Group, self.Link,
+                                                                                    self._media_files )
+            if self._type != M3uItemType.IPTV_CHANNEL:
+                self.Group      = NORMALIZER.group( group )
 
             for char in ( '|', ':', '-' ):
-                self.Name, country = self._retrieve_country_code( self.Name, char )
+                if char not in self.Name:
+                    continue
+
+                name, country = self._retrieve_country_code( self.Name, char )
                 if country is not None:
-                    self.__country = country
+                    self.Name = name
+                    self._country = sys.intern( country )
                     break
 
         for key, value in kwargs.items():
             if key == 'country':
-                self.__country = value
+                self._country = value
 
             elif key == 'season':
-                self.__season = value
+                self._season = value
 
             elif key == 'episode':
-                self.__episode = value
+                self._episode = value
 
             elif key == 'genre':
-                self.__genre = value
+                self._genre = value
 
             elif key == 'group':
                 self.Group = value
 
             elif key == 'type':
-                self.__type = value
+                self._type = value
 
             elif key == 'number':
-                self.__number = value
+                self._number = value
 
             else:
                 self.attribute( key, value )
@@ -440,32 +836,14 @@ class M3URecordEx( M3URecord ):
         :return:            tuple of two elements ( <title>, <country-code> ), where country-code maybe None when not found
 
         """
-        country = None
-        names = [ item.strip() for item in name.split( char, 1 ) ]
-        if len( names ) > 1:
-            prefix, suffix = names
-            if prefix in self.__COUNTRY_TRANSLATES:
-                prefix = self.__COUNTRY_TRANSLATES[ prefix ]
-
-            if suffix in self.__COUNTRY_TRANSLATES:
-                suffix = self.__COUNTRY_TRANSLATES[ suffix ]
-
-            if len( prefix ) == 2 and prefix in self.__COUNTRY_CODES:
-                name = suffix
-                country = prefix
-
-            elif len( suffix ) == 2 and suffix in self.__COUNTRY_CODES:
-                name = prefix
-                country = suffix
-
-        return name, country
+        return NORMALIZER.countryCode( name, char )
 
     def __repr__(self):
-        return f"<M3URecordEx name='{self.Name}' {self.getAttributes()} link='{self.Link}'>"
+        return f"<{type( self ).__name__} name='{self.Name}' {self.getAttributes()} link='{self.Link}'>"
 
     @property
     def ChannelNumber( self ) -> int:
-        return self.__number
+        return self._number
 
     @property
     def Type( self ) -> M3uItemType:
@@ -473,7 +851,7 @@ class M3URecordEx( M3URecord ):
 
         :rtype:         M3uItemType
         """
-        return self.__type
+        return self._type
 
     @property
     def TypeStr( self ) -> str:
@@ -482,7 +860,7 @@ class M3URecordEx( M3URecord ):
         :rtype:         str
         :return:        returns string with 'NONE', 'IPTV_CHANNEL', 'SERIE_EPISODE' or 'MOVIE'
         """
-        return str( self.__type )
+        return str( self._type )
 
     @property
     def Genre( self ) -> Optional[str]:
@@ -491,16 +869,23 @@ class M3URecordEx( M3URecord ):
         :rtype:         str
         :return:        group-title for series.
         """
-        return self.__genre if self.__genre is not None else ""
+        return self._genre if self._genre is not None else ""
 
     @property
     def Season( self ) -> str:
-        return self.__season
+        return self._season
 
     @property
     def Episode( self ) -> str:
-        return self.__episode
+        return self._episode
 
     @property
     def Country( self ) -> str:
-        return self.__country
\ No newline at end of file
+        return self._country
+
+
+class M3URecordEx( M3URecordExBase, M3URecord ):
+    """By default the following extensions are recognized as movie or serie. when in the name Sxx Exx is detected in the title
+    the type is assigned to
+
+    """
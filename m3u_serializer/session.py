@@ -0,0 +1,168 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Union, Callable
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+log = logging.getLogger( 'M3U-Session' )
+
+
+def _accept_encoding() -> str:
+    """Gets the Accept-Encoding header, brotli is only accepted when the decoder is installed.
+
+    :return:            str with the encodings
+    """
+    encodings = [ 'gzip', 'deflate' ]
+    for module in ( 'brotli', 'brotlicffi' ):
+        try:
+            __import__( module )
+            encodings.append( 'br' )
+            break
+
+        except ImportError:
+            pass
+
+    return ', '.join( encodings )
+
+
+class M3UTiming( object ):
+    """Timing of a single download
+
+    """
+    def __init__( self, url: str, status: int, elapsed: float ):
+        self.Url        = url
+        self.Status     = status
+        # Time until the headers were received, in seconds
+        self.Elapsed    = elapsed
+        # Time until the body was read, in seconds
+        self.Duration   = elapsed
+        # Number of bytes received, before decompression
+        self.Size       = 0
+        return
+
+    def __repr__( self ):
+        return f'<M3UTiming url="{self.Url}" status={self.Status} elapsed={self.Elapsed:.3f} duration={self.Duration:.3f} size={self.Size}>'
+
+
+class M3USession( object ):
+    """HTTP session for downloading M3U data streams
+
+    The session keeps the connections alive in a pool per host, so repeated downloads from the same
+    provider do not pay for a new TCP and TLS handshake. Transient errors (connection errors and the
+    status codes 429, 500, 502, 503 and 504) are retried with an exponential backoff. The gzip, deflate
+    and, when the brotli package is installed, br content encodings are decoded transparently.
+
+    The timing of each download is kept in Timings, and optionally passed to the 'on_timing' callback.
+
+    By default the deserializers share the session returned by M3USession.shared().
+
+    """
+    __shared        = None
+    __shared_lock   = threading.Lock()
+
+    def __init__( self,
+                  timeout: Union[float,tuple,None] = ( 30, 300 ),
+                  retries: int = 3,
+                  backoff_factor: float = 0.5,
+                  pool_connections: int = 10,
+                  pool_maxsize: int = 10,
+                  history: int = 100,
+                  on_timing: Optional[Callable] = None,
+                  session: Optional[requests.Session] = None ):
+        """Constructor
+
+        :param timeout:             timeout in seconds, or tuple ( <connect>, <read> ) timeout, None for no timeout.
+        :param retries:             number of retries on transient errors.
+        :param backoff_factor:      backoff factor between the retries.
+        :param pool_connections:    number of hosts to keep connection pools for.
+        :param pool_maxsize:        maximum number of connections kept per host.
+        :param history:             number of timings kept in Timings.
+        :param on_timing:           optional callback called with the M3UTiming of each download.
+        :param session:             optional requests.Session to use, the adapters are mounted on it.
+        """
+        self.__timeout      = timeout
+        self.__on_timing    = on_timing
+        self.__timings      = deque( maxlen = history )
+        self.__session      = session if session is not None else requests.Session()
+        retry = Retry( total = retries,
+                       backoff_factor = backoff_factor,
+                       status_forcelist = ( 429, 500, 502, 503, 504 ),
+                       raise_on_status = False )
+        adapter = HTTPAdapter( pool_connections = pool_connections, pool_maxsize = pool_maxsize, max_retries = retry )
+        self.__session.mount( 'http://', adapter )
+        self.__session.mount( 'https://', adapter )
+        self.__session.headers[ 'Accept-Encoding' ] = _accept_encoding()
+        return
+
+    @classmethod
+    def shared( cls ) -> 'M3USession':
+        """Gets the session shared by the deserializers without their own session.
+
+        :return:            M3USession
+        """
+        with cls.__shared_lock:
+            if cls.__shared is None:
+                cls.__shared = cls()
+
+        return cls.__shared
+
+    @contextmanager
+    def get( self, url: str, headers: Optional[dict] = None ):
+        """Starts the download of the `url`, the body is read while streaming.
+
+        :param url:         URL to be downloaded.
+        :param headers:     optional extra request headers.
+        :return:            context manager with the requests.Response
+        """
+        start = time.perf_counter()
+        response = self.__session.get( url, headers = headers, stream = True, timeout = self.__timeout )
+        timing = M3UTiming( url, response.status_code, response.elapsed.total_seconds() )
+        try:
+            yield response
+
+        finally:
+            timing.Size = int( getattr( response.raw, 'tell', lambda: 0 )() )
+            response.close()
+            timing.Duration = time.perf_counter() - start
+            log.info( f'Download timing {timing}' )
+            self.__timings.append( timing )
+            if self.__on_timing is not None:
+                self.__on_timing( timing )
+
+        return
+
+    @property
+    def Timings( self ) -> list:
+        """The timings of the last downloads
+
+        :return:            list of M3UTiming
+        """
+        return list( self.__timings )
+
+    def close( self ) -> None:
+        """Closes the connections of the session
+
+        :return:            None
+        """
+        self.__session.close()
+        return
@@ -0,0 +1,214 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import heapq
+import pickle
+import logging
+import tempfile
+from operator import itemgetter
+from typing import Iterable, Iterator, Optional, Union, Callable
+from m3u_serializer.record import M3URecordEx
+from m3u_serializer.store import record_fields, restore_record
+from m3u_serializer.exceptions import InvalidParameter
+
+log = logging.getLogger( 'M3U-Sort' )
+
+
+def _channel( record ) -> int:
+    channel = record.attribute( 'channel' )
+    if channel is None:
+        return getattr( record, 'ChannelNumber', 0 )
+
+    try:
+        return int( channel )
+
+    except ValueError:
+        return 0
+
+
+class M3UPlaylistSort( object ):
+    """External sort of a record stream, with the memory use capped by a budget
+
+    The records are collected until the estimated size reaches 'memory_budget', then the run is sorted
+    and written to a temporary file as pickled blocks of compact tuples. At the end the runs are merged
+    with heapq.merge() into one sorted stream. When all the records fit in the budget nothing is written
+    and the records are yielded as they are.
+
+    The sort key is a field name ('group', 'name', 'link', 'channel', 'duration', 'country', 'type' or
+    an attribute name like 'tvg-id'), a tuple of field names or a callable returning a sortable value.
+    The sort is stable, records with the same key keep their order.
+
+        sorter = M3UPlaylistSort( key = ( 'group', 'channel' ), memory_budget = 64 * 1024 * 1024 )
+        with M3UDeserializer( 'input.m3u', new_record = M3URecordEx ) as deserializer:
+            with M3USerializer( 'sorted.m3u' ) as serializer:
+                sorter.write( deserializer, serializer )
+
+    The records read back from the runs are created with 'new_record', with the classification of
+    M3URecordEx restored, and keep their original text when the deserializer did (keep_source).
+    The size of a record is estimated from the length of its text, the budget is approximate.
+
+    """
+    FIELDS      = {
+        'group':    lambda record: record.Group,
+        'name':     lambda record: record.Name,
+        'link':     lambda record: record.Link,
+        'channel':  _channel,
+        'duration': lambda record: float( record.Duration ),
+        'country':  lambda record: getattr( record, 'Country', '' ) or '',
+        'type':     lambda record: record.Type.value if hasattr( record, 'Type' ) else 0,
+    }
+    # Estimated size of a record object and its entry in the run, besides its text
+    RECORD_OVERHEAD = 600
+    BLOCK_SIZE      = 1024
+
+    def __init__( self, key: Union[str,tuple,list,Callable] = ( 'group', 'channel' ), reverse: bool = False,
+                  memory_budget: int = 67108864, tempdir: Optional[str] = None, new_record = M3URecordEx,
+                  media_files: Optional[list] = None ):
+        """Constructor
+
+        :param key:             field name, tuple of field names or callable giving the sort value of a record.
+        :param reverse:         when True the records are sorted in descending order.
+        :param memory_budget:   the approximate memory for the records in bytes, default 64 MiB.
+        :param tempdir:         optional folder for the temporary run files.
+        :param new_record:      the record class for the records read back from the runs.
+        :param media_files:     list of media extensions, see M3UDeserializer.
+        """
+        if callable( key ):
+            self.__key = key
+
+        elif isinstance( key, str ):
+            self.__key = self.__field( key )
+
+        elif isinstance( key, ( tuple, list ) ) and len( key ) > 0:
+            fields = [ self.__field( name ) for name in key ]
+            self.__key = lambda record: tuple( field( record ) for field in fields )
+
+        else:
+            raise InvalidParameter( 'M3UPlaylistSort( key ) must be a field name, tuple of field names or callable' )
+
+        self.__reverse      = reverse
+        self.__budget       = memory_budget
+        self.__tempdir      = tempdir
+        self.__new_record   = new_record
+        self.__record_kwargs = { 'media_files': media_files }
+        self.__runs         = 0
+        return
+
+    def __field( self, name: str ) -> Callable:
+        if name in self.FIELDS:
+            return self.FIELDS[ name ]
+
+        return lambda record: record.attribute( name ) or ''
+
+    @property
+    def Runs( self ) -> int:
+        """The number of runs written to temporary files by the last sort
+
+        """
+        return self.__runs
+
+    def sort( self, records: Iterable ) -> Iterator:
+        """Sorts the records
+
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :return:            iterator of the sorted records
+        """
+        self.__runs = 0
+        runs = []
+        buffer = []
+        size = 0
+        try:
+            # With reverse the sequence is negated, records with equal keys keep their original order
+            order = -1 if self.__reverse else 1
+            for sequence, record in enumerate( records ):
+                buffer.append( ( self.__key( record ), order * sequence, record ) )
+                size += self.RECORD_OVERHEAD + 2 * ( record.attributesSize() + len( record.Name ) + len( record.Link ) )
+                if size >= self.__budget:
+                    runs.append( self.__spill( buffer ) )
+                    buffer = []
+                    size = 0
+
+            buffer.sort( key = itemgetter( 0, 1 ), reverse = self.__reverse )
+            if len( runs ) == 0:
+                for _, _, record in buffer:
+                    yield record
+
+                return
+
+            log.info( f'Merging {len( runs )} runs and {len( buffer )} records in memory' )
+            streams = [ self.__read( run ) for run in runs ]
+            streams.append( buffer )
+            for _, _, item in heapq.merge( *streams, key = itemgetter( 0, 1 ), reverse = self.__reverse ):
+                if isinstance( item, tuple ):
+                    fields, channel, source, inline = item
+                    item = restore_record( fields, self.__new_record, self.__record_kwargs, channel )
+                    if source is not None:
+                        if inline:
+                            item.setDirectives( item.ExtGroup, item.Options, inline )
+
+                        item.setSource( source )
+
+                yield item
+
+        finally:
+            for run in runs:
+                run.close()
+
+        return
+
+    def __spill( self, buffer: list ):
+        """Sorts the run and writes it to a temporary file
+
+        :param buffer:      list of ( key, sequence, record ).
+        :return:            the temporary file
+        """
+        buffer.sort( key = itemgetter( 0, 1 ), reverse = self.__reverse )
+        run = tempfile.TemporaryFile( dir = self.__tempdir )
+        for start in range( 0, len( buffer ), self.BLOCK_SIZE ):
+            block = [ ( key, sequence, ( record_fields( record ), record.Channel,
+                                         getattr( record, 'Source', None ), getattr( record, 'InlineGroup', False ) ) )
+                      for key, sequence, record in buffer[ start: start + self.BLOCK_SIZE ] ]
+            pickle.dump( block, run, pickle.HIGHEST_PROTOCOL )
+
+        self.__runs += 1
+        log.info( f'Written run {self.__runs} with {len( buffer )} records, {run.tell()} bytes' )
+        run.seek( 0 )
+        return run
+
+    @staticmethod
+    def __read( run ) -> Iterator[tuple]:
+        """Reads the run back, block by block
+
+        :param run:         the temporary file.
+        :return:            iterator of ( key, sequence, ( fields, channel, source, inline ) )
+        """
+        while True:
+            try:
+                block = pickle.load( run )
+
+            except EOFError:
+                return
+
+            yield from block
+
+    def write( self, records: Iterable, serializer ) -> int:
+        """Sorts the records and writes them through the M3USerializer
+
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :param serializer:  the opened M3USerializer.
+        :return:            number of written records
+        """
+        return serializer.write_many( self.sort( records ) )
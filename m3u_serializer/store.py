@@ -0,0 +1,298 @@
+# M3U Serializer - serialize/de-serialize M3U data streams special for IPTV
+# Copyright (C) 2022  Marc Bertens-Nguyen <m.bertens@pe2mbs.nl>
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; only version 2
+# of the License.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+import os
+import sys
+import mmap
+import struct
+import logging
+from array import array
+from typing import Iterable, Iterator, Optional, Union
+from m3u_serializer.record import M3URecordBase, M3URecordExBase, M3URecord, M3URecordEx, M3uItemType
+from m3u_serializer.compact import M3UCompactRecord
+from m3u_serializer.reader import M3UDeserializer
+from m3u_serializer.exceptions import OutdatedSnapshot, InvalidParameter
+
+log = logging.getLogger( 'M3U-Store' )
+
+
+def _source_stat( source: Optional[str] ) -> tuple:
+    """Gets the size and modification time of the source playlist file
+
+    :param source:      filename of the source playlist, None when there is no source.
+    :return:            tuple ( <size>, <mtime in ns> ), ( 0, 0 ) without source
+    """
+    if source is None:
+        return 0, 0
+
+    stat = os.stat( source )
+    return stat.st_size, stat.st_mtime_ns
+
+
+def record_fields( record ) -> tuple:
+    """Gets the fields of the record as str, to restore it with restore_record()
+
+    :param record:      record of any class.
+    :return:            tuple ( duration, attributes, name, link ), for classified records
+                        with type, country, season, episode and genre, followed by the #EXTGRP
+                        group and the option lines joined by newlines
+    """
+    directives = ( getattr( record, 'ExtGroup', None ) or '', '\n'.join( getattr( record, 'Options', () ) ) )
+    record_type = getattr( record, 'Type', None )
+    if record_type is not None:
+        return ( str( record.Duration ), record.getAttributes(), record.Name, record.Link, str( record_type.value ),
+                 record.Country or '', record.Season, record.Episode, record.Genre ) + directives
+
+    return ( str( record.Duration ), record.getAttributes(), record.Name, record.Link ) + directives
+
+
+def _classified( fields: Union[tuple,list] ) -> bool:
+    return len( fields ) > 6
+
+
+def restore_record( fields: Union[tuple,list], new_record, record_kwargs: dict, channel = None ):
+    """Creates the record from the fields of record_fields()
+
+    The classification of the fields is restored instead of classifying the record again.
+
+    :param fields:          the fields.
+    :param new_record:      the record class.
+    :param record_kwargs:   keyword arguments for the record class.
+    :param channel:         optional channel number, as set by the M3UDeserializer.
+    :return:                record of the 'new_record' class
+    """
+    record = new_record( **record_kwargs )
+    record.setDirectives( fields[ -2 ] or None, fields[ -1 ].split( '\n' ) if fields[ -1 ] != '' else () )
+    if _classified( fields ) and issubclass( new_record, M3URecordExBase ):
+        M3URecordBase.set( record, *fields[ :4 ] )
+        record.set( type = M3uItemType( int( fields[ 4 ] ) ), country = fields[ 5 ], season = fields[ 6 ],
+                    episode = fields[ 7 ], genre = fields[ 8 ], channel = channel )
+
+    else:
+        record.set( *fields[ :4 ], channel = channel )
+
+    return record
+
+
+class M3UPlaylistStore( object ):
+    """Binary snapshot of a parsed playlist, read back with a memory map
+
+    The snapshot holds for each record the duration, attributes, name and link, the classification
+    of M3URecordEx; type, country, season, episode and genre, and the #EXTGRP group and options. The records are stored after the header
+    as UTF-8 fields separated by a null character, followed by a table with the offsets of the records.
+    Opening a snapshot only maps the file, the records are decoded when accessed by index or iterated,
+    without parsing or classifying them again.
+
+    The snapshot stores the size and modification time of the source playlist file, when the source
+    changed opening the snapshot raises OutdatedSnapshot.
+
+        M3UPlaylistStore.write( 'playlist.snapshot', M3UDeserializer( 'playlist.m3u', new_record = M3URecordEx ),
+                                source = 'playlist.m3u' )
+        with M3UPlaylistStore( 'playlist.snapshot', source = 'playlist.m3u' ) as store:
+            channel = store[ 1000 ]
+
+    Or let load() parse the source only when the snapshot is missing or outdated.
+
+        store = M3UPlaylistStore.load( 'playlist.snapshot', 'playlist.m3u' )
+
+    """
+    __MAGIC         = b'M3US'
+    __VERSION       = 2
+    __HEADER        = struct.Struct( '<4sHHQQQQ' )
+    FLAG_CLASSIFIED = 0x0001
+
+    def __init__( self, filename: str, source: Optional[str] = None,
+                  new_record = M3URecordEx, media_files: Optional[list] = None, lazy_attributes: bool = False ):
+        """Constructor, opens the snapshot
+
+        :param filename:        the filename of the snapshot.
+        :param source:          optional filename of the source playlist, to check if the snapshot is outdated.
+        :param new_record:      the record class, default M3URecordEx.
+        :param media_files:     list of media extensions, see M3UDeserializer.
+        :param lazy_attributes: when True the attributes of the records are parsed on first access.
+        """
+        self.__filename     = filename
+        self.__new_record   = new_record
+        self.__record_kwargs = { 'media_files': media_files }
+        if lazy_attributes:
+            self.__record_kwargs[ 'lazy_attributes' ] = True
+
+        with open( filename, 'rb' ) as stream:
+            if os.fstat( stream.fileno() ).st_size < self.__HEADER.size:
+                # An empty file cannot be mapped, an interrupted write is rebuilt as an outdated snapshot
+                raise OutdatedSnapshot( f'{filename} is empty or truncated' )
+
+            self.__MMAP = mmap.mmap( stream.fileno(), 0, access = mmap.ACCESS_READ )
+
+        try:
+            magic, version, self.__flags, count, size, mtime, position = self.__HEADER.unpack_from( self.__MMAP, 0 )
+            if magic != self.__MAGIC or version != self.__VERSION:
+                raise InvalidParameter( f'{filename} is not a playlist snapshot' )
+
+            if position + ( count + 1 ) * 8 > len( self.__MMAP ):
+                raise OutdatedSnapshot( f'{filename} is truncated' )
+
+            if source is not None and not self.isCurrent( source, size, mtime ):
+                raise OutdatedSnapshot( f'{filename} is outdated, {source} changed' )
+
+            # The offset table is little-endian, on big-endian hosts it is decoded into an array
+            table = memoryview( self.__MMAP )[ position: position + ( count + 1 ) * 8 ]
+            if sys.byteorder == 'little':
+                self.__offsets = table.cast( 'Q' )
+
+            else:
+                self.__offsets = array( 'Q', table.tobytes() )
+                self.__offsets.byteswap()
+                table.release()
+
+        except Exception:
+            self.__MMAP.close()
+            raise
+
+        self.__count = count
+        return
+
+    @staticmethod
+    def isCurrent( source: str, size: int, mtime: int ) -> bool:
+        """Checks if the source playlist file is unchanged
+
+        :param source:      filename of the source playlist.
+        :param size:        the size stored in the snapshot.
+        :param mtime:       the modification time stored in the snapshot.
+        :return:            True when unchanged
+        """
+        try:
+            return _source_stat( source ) == ( size, mtime )
+
+        except OSError:
+            return False
+
+    @classmethod
+    def write( cls, filename: str, records: Iterable, source: Optional[str] = None ) -> int:
+        """Writes the snapshot of the records
+
+        The snapshot is written to a temporary file and replaces 'filename' when complete.
+
+        :param filename:    the filename of the snapshot.
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :param source:      optional filename of the source playlist, stored to detect changes.
+        :return:            the number of records written
+        """
+        # Take the stat before reading, so a change while parsing invalidates the snapshot
+        size, mtime = _source_stat( source )
+        offsets = array( 'Q' )
+        flags = 0
+        temp_filename = f'{filename}.tmp'
+        with open( temp_filename, 'wb' ) as stream:
+            stream.write( bytes( cls.__HEADER.size ) )
+            position = cls.__HEADER.size
+            for record in records:
+                fields = record_fields( record )
+                if _classified( fields ):
+                    flags |= cls.FLAG_CLASSIFIED
+
+                offsets.append( position )
+                position += stream.write( '\x00'.join( fields ).encode( 'utf-8' ) )
+
+            offsets.append( position )
+            # Align the offset table
+            position += stream.write( bytes( -position % 8 ) )
+            if sys.byteorder != 'little':
+                offsets.byteswap()
+
+            offsets.tofile( stream )
+            stream.seek( 0 )
+            stream.write( cls.__HEADER.pack( cls.__MAGIC, cls.__VERSION, flags, len( offsets ) - 1,
+                                             size, mtime, position ) )
+
+        os.replace( temp_filename, filename )
+        return len( offsets ) - 1
+
+    @classmethod
+    def load( cls, filename: str, source: str, new_record = M3URecordEx, media_files: Optional[list] = None,
+              lazy_attributes: bool = False, **kwargs ) -> 'M3UPlaylistStore':
+        """Opens the snapshot, when missing or outdated the source playlist is parsed and the snapshot written
+
+        :param filename:        the filename of the snapshot.
+        :param source:          the filename of the source playlist.
+        :param new_record:      the record class, default M3URecordEx.
+        :param media_files:     list of media extensions, see M3UDeserializer.
+        :param lazy_attributes: when True the attributes of the records are parsed on first access.
+        :param kwargs:          extra keyword arguments for the M3UDeserializer.
+        :return:                M3UPlaylistStore
+        """
+        if os.path.isfile( filename ):
+            try:
+                return cls( filename, source, new_record, media_files, lazy_attributes )
+
+            except ( OutdatedSnapshot, InvalidParameter ) as exc:
+                log.info( exc )
+
+        with M3UDeserializer( source, new_record = new_record, media_files = media_files, **kwargs ) as deserializer:
+            cls.write( filename, deserializer, source )
+
+        return cls( filename, source, new_record, media_files, lazy_attributes )
+
+    def __len__( self ) -> int:
+        return self.__count
+
+    def __getitem__( self, index: int ) -> Union[M3URecord,M3UCompactRecord]:
+        """Gets the record by index
+
+        :param index:       index of the record, negative indexes count from the end.
+        :return:            record of the 'new_record' class
+        """
+        if index < 0:
+            index += self.__count
+
+        if index < 0 or index >= self.__count:
+            raise IndexError( 'M3UPlaylistStore index out of range' )
+
+        return self.__record( index )
+
+    def __iter__( self ) -> Iterator:
+        for index in range( self.__count ):
+            yield self.__record( index )
+
+    def __record( self, index: int ):
+        """Decodes the record at 'index'
+
+        :param index:       index of the record.
+        :return:            record of the 'new_record' class
+        """
+        fields = self.__MMAP[ self.__offsets[ index ]: self.__offsets[ index + 1 ] ].decode( 'utf-8' ).split( '\x00' )
+        return restore_record( fields, self.__new_record, self.__record_kwargs, index + 1 )
+
+    def close( self ) -> None:
+        """Closes the snapshot
+
+        :return:            None
+        """
+        if self.__MMAP is not None:
+            if isinstance( self.__offsets, memoryview ):
+                self.__offsets.release()
+
+            self.__MMAP.close()
+            self.__MMAP = None
+
+        return
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, exc_type, exc_value, exc_traceback ):
+        self.close()
+        return
@@ -15,17 +15,141 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import re
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional, Union, Callable
+
+
+@lru_cache( maxsize = 1024 )
+def _compile( pattern: str ):
+    return re.compile( pattern, re.IGNORECASE )
 
 
 def matchList( ilist: list, data: str ):
-    """
+    """Checks if one of the patterns in the list matches at the start of the data, case insensitive
 
-    :param ilist:
-    :param data:
-    :return:
+    :param ilist:   list of regular expression patterns.
+    :param data:    the string to match.
+    :return:        True when one of the patterns matches
     """
     for item in ilist:
-        if re.match( item, data, re.IGNORECASE ) is not None:
+        if _compile( item ).match( data ) is not None:
             return True
 
     return False
+
+
+class M3UPatternFilter( object ):
+    """Filters the records on a list of patterns, matched at the start of the value, case insensitive
+
+    The patterns are combined in a single regular expression, an alternation with a named group per pattern,
+    so each value is matched once whatever the number of patterns. The alternatives are tried in the order
+    of the list, so the reported pattern is the first one that matches, as with matchList().
+    Patterns with back references or their own named groups cannot be combined, then the patterns are
+    matched one by one.
+
+    The values of the fields used for filtering, as the group-title, repeat a lot, so the results are
+    kept per value, up to 'cache_size' values.
+
+    The filter is a predicate for the records, it can be used between the deserializer and serializer.
+
+        whitelist = M3UPatternFilter( [ 'NL', 'BE' ], field = 'group' )
+        with M3UDeserializer( 'input.m3u' ) as in_stream, M3USerializer( 'output.m3u' ) as out_stream:
+            out_stream.write_many( whitelist.filter( in_stream ) )
+
+    """
+    __GROUP         = '_m3u_p'
+    __RE_REFERENCE  = re.compile( r'\\[1-9]|\(\?P[=<]' )
+    __FIELDS        = {
+        'group':    lambda record: record.Group,
+        'name':     lambda record: record.Name,
+        'link':     lambda record: record.Link,
+    }
+
+    def __init__( self, patterns: Iterable[str], field: Union[str,Callable] = 'group', exclude: bool = False,
+                  cache_size: int = 65536 ):
+        """Constructor
+
+        :param patterns:    the regular expression patterns.
+        :param field:       'group', 'name', 'link', an attribute name or callable giving the value of the record.
+        :param exclude:     when True the records matching one of the patterns are rejected (blacklist).
+        :param cache_size:  the maximum number of values for which the result is kept, 0 disables it.
+        """
+        self.__patterns = list( patterns )
+        self.__exclude  = exclude
+        self.__results  = {}
+        self.__cache_size = cache_size
+        if callable( field ):
+            self.__field = field
+
+        elif field in self.__FIELDS:
+            self.__field = self.__FIELDS[ field ]
+
+        else:
+            self.__field = lambda record: record.attribute( field ) or ''
+
+        self.__combined = None
+        if len( self.__patterns ) > 0 and not any( self.__RE_REFERENCE.search( pattern ) for pattern in self.__patterns ):
+            try:
+                self.__combined = re.compile( '|'.join( f'(?P<{self.__GROUP}{index}>{pattern})'
+                                                        for index, pattern in enumerate( self.__patterns ) ),
+                                              re.IGNORECASE )
+
+            except re.error:
+                pass
+
+        return
+
+    @property
+    def Patterns( self ) -> list:
+        return list( self.__patterns )
+
+    def match( self, value: str ) -> Optional[str]:
+        """Gets the first pattern that matches at the start of the value
+
+        :param value:       the string to match.
+        :return:            the pattern or None
+        """
+        try:
+            return self.__results[ value ]
+
+        except KeyError:
+            pass
+
+        pattern = self.__match( value )
+        if self.__cache_size > 0:
+            if len( self.__results ) >= self.__cache_size:
+                self.__results.clear()
+
+            self.__results[ value ] = pattern
+
+        return pattern
+
+    def __match( self, value: str ) -> Optional[str]:
+        if self.__combined is not None:
+            result = self.__combined.match( value )
+            if result is None:
+                return None
+
+            return self.__patterns[ int( result.lastgroup[ len( self.__GROUP ): ] ) ]
+
+        for pattern in self.__patterns:
+            if _compile( pattern ).match( value ) is not None:
+                return pattern
+
+        return None
+
+    def __call__( self, record ) -> bool:
+        """Checks if the record passes the filter
+
+        :param record:      M3URecord or inherited class
+        :return:            True when the record passes
+        """
+        return ( self.match( self.__field( record ) ) is None ) is self.__exclude
+
+    def filter( self, records: Iterable ) -> Iterator:
+        """Yields the records that pass the filter
+
+        :param records:     iterable of records, for example the M3UDeserializer.
+        :return:            iterator of records
+        """
+        return filter( self, records )
@@ -16,9 +16,11 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 import logging
 import io
-from typing import Optional
+from typing import Optional, Iterable
 from m3u_serializer.record import M3URecord
 from m3u_serializer.exceptions import MissingFilename, NotOpened, AlreadyOpened
+from m3u_serializer.instrument import M3UInstrumentation
+from m3u_serializer.compression import detect, open_compressed
 from contextlib import contextmanager
 
 log = logging.getLogger( 'M3U-Serializer' )
@@ -29,15 +31,53 @@ class M3USerializer( object ):
 
     This class writes the M3U file from the M3URecord class
 
+    The records are collected in an output buffer and written in large blocks of 'buffer_size' characters.
+    By default the buffer is 64 KiB when the serializer opens the file, and disabled for an external stream,
+    so that the data is directly available in the stream. flush() writes the buffer, close() flushes as well.
+
+    With 'compression' ('gzip', 'bz2', 'xz' or 'zstd') or a filename with the extension of a compression
+    the file is compressed while writing, with the optional 'compression_level'.
+
+    With an M3UInstrumentation the phases 'serialize' and 'write' and the counters 'records_written' and
+    'chars_written' are measured, and reported to its sinks by close().
+
+    The 'header' attributes are written in the #EXTM3U directive and the 'playlist' title as #PLAYLIST
+    directive, for example the Header and Playlist of the M3UDeserializer. A #EXTGRP directive is written
+    when the ExtGroup of the records changes, the Options of a record are written before its link.
+
     """
-    def __init__( self, filename: Optional[str] = None, stream: io.TextIOBase = None ):
+    DEFAULT_BUFFER_SIZE = 65536
+
+    def __init__( self, filename: Optional[str] = None, stream: io.TextIOBase = None, buffer_size: Optional[int] = None,
+                  instrumentation: Optional[M3UInstrumentation] = None, compression: Optional[str] = None,
+                  compression_level: Optional[int] = None, header: Optional[dict] = None, playlist: Optional[str] = None ):
         """Contructor sets optional the filename for writing.
 
         :param filename:    optional output filename
+        :param stream:      optional output stream, text or binary
+        :param buffer_size: optional size of the output buffer, 0 disables the buffer.
+        :param instrumentation: optional M3UInstrumentation to measure the phases.
+        :param compression: optional 'gzip', 'bz2', 'xz' or 'zstd', default detected from the filename extension.
+        :param compression_level: optional compression level, default of the compression.
+        :param header:      optional attributes of the #EXTM3U directive, like url-tvg and x-tvg-url.
+        :param playlist:    optional title of the #PLAYLIST directive.
         """
         self.__stream = stream
         self.__filename = filename
         self.__owner = True if stream is not None else False
+        self.__binary = isinstance( stream, ( io.BufferedIOBase, io.RawIOBase ) )
+        if buffer_size is None:
+            buffer_size = 0 if stream is not None else self.DEFAULT_BUFFER_SIZE
+
+        self.__buffer_size = buffer_size
+        self.__buffer = []
+        self.__buffered = 0
+        self.__instrumentation = instrumentation
+        self.__compression = compression
+        self.__compression_level = compression_level
+        self.__header = header if header is not None else {}
+        self.__playlist = playlist
+        self.__group = None
         return
 
     def create( self, filename: Optional[str] = None ) -> None:
@@ -57,10 +97,22 @@ class M3USerializer( object ):
         if not isinstance( self.__filename, str ):
             raise MissingFilename()
 
-        log.info( f'Opening FILE {self.__filename}' )
-        self.__stream = open( self.__filename, 'w' )
+        compression = self.__compression or detect( self.__filename )
+        if compression is None:
+            log.info( f'Opening FILE {self.__filename}' )
+            self.__stream = open( self.__filename, 'w' )
+
+        else:
+            log.info( f'Opening {compression} compressed FILE {self.__filename}' )
+            self.__stream = open_compressed( self.__filename, 'wt', compression, self.__compression_level, 'utf-8' )
+
+        self.__binary = False
         # Write header of M3U file
-        self.__stream.write( '#EXTM3U\n' )
+        self.__stream.write( '#EXTM3U' + ''.join( f' {key}="{value}"' for key, value in self.__header.items() ) + '\n' )
+        if self.__playlist is not None:
+            self.__stream.write( f'#PLAYLIST:{self.__playlist}\n' )
+
+        self.__group = None
         return
 
     def close( self ) -> None:
@@ -69,34 +121,162 @@ class M3USerializer( object ):
         :return:        None
         """
         if self.__stream is not None and self.__owner:
+            self.flush()
+            self.__report()
             return
 
         if self.__stream is None:
             raise NotOpened()
 
+        self.flush()
         self.__stream.close()
         self.__stream = None
         log.info( f'Closing FILE {self.__filename}' )
         self.__filename = None
+        self.__report()
+        return
+
+    def __report( self ) -> None:
+        if self.__instrumentation is not None:
+            self.__instrumentation.report( log.name )
+
         return
 
+    def flush( self ) -> None:
+        """Writes the output buffer to the stream.
+
+        :return:        None
+        """
+        if len( self.__buffer ) > 0:
+            self.__write( ''.join( self.__buffer ) )
+            self.__buffer.clear()
+            self.__buffered = 0
+
+        return
+
+    def __write( self, data: str ) -> None:
+        """Writes the data to the stream
+
+        :param data:        the M3U data
+        :return:            None
+        """
+        if self.__stream is None:
+            raise NotOpened()
+
+        if self.__instrumentation is not None:
+            self.__instrumentation.start( 'write' )
+            self.__instrumentation.count( 'chars_written', len( data ) )
+
+        try:
+            if self.__binary:
+                self.__stream.write( data.encode( 'utf-8' ) )
+
+            else:
+                self.__stream.write( data )
+
+        finally:
+            if self.__instrumentation is not None:
+                self.__instrumentation.stop()
+
+        return
+
+    def __format( self, record: M3URecord ) -> str:
+        """Formats the record as M3U data
+
+        The original text of an unmodified record is written verbatim, see M3URecord.Source.
+        A #EXTGRP directive precedes the record when its group differs from the previous record,
+        unless the original text of the record has the directive, see M3URecord.InlineGroup.
+
+        :param record:      M3URecord or inherited class
+        :return:            str with the #EXTINF directive and link
+        """
+        source = getattr( record, 'Source', None )
+        group = getattr( record, 'ExtGroup', None )
+        prefix = ''
+        if group != self.__group:
+            self.__group = group
+            if group is not None and ( source is None or not getattr( record, 'InlineGroup', False ) ):
+                prefix = f'#EXTGRP:{group}\n'
+
+        if source is not None:
+            return prefix + source + '\n'
+
+        options = getattr( record, 'Options', () )
+        if len( options ) > 0:
+            return ( f'{prefix}#EXTINF:{record.Duration} {record.getAttributes()},{record.Name}\n' +
+                     ''.join( option + '\n' for option in options ) + f'{record.Link}\n' )
+
+        return f'{prefix}#EXTINF:{record.Duration} {record.getAttributes()},{record.Name}\n{record.Link}\n'
+
     def write( self, record: M3URecord ) -> None:
         """Writes the record to the M3U file
 
         :param record:      M3URecord or inherited class
         :return:            None
         """
-        attrs_str = record.getAttributes()
-        line  = f'#EXTINF:{record.Duration} {attrs_str},{record.Name}\n{record.Link}\n'
-        if isinstance( self.__stream, io.BytesIO ):
-            self.__stream.write( line.encode( 'utf-8' ) )
+        instrumentation = self.__instrumentation
+        if instrumentation is not None:
+            instrumentation.start( 'serialize' )
+            instrumentation.count( 'records_written' )
 
-        else:
-            self.__stream.write( line )
+        try:
+            line = self.__format( record )
+            if log.isEnabledFor( logging.DEBUG ):
+                log.debug( f'Writing::{line}' )
+
+            if self.__buffer_size <= 0:
+                self.__write( line )
+                return
+
+            self.__buffer.append( line )
+            self.__buffered += len( line )
+            if self.__buffered >= self.__buffer_size:
+                self.flush()
+
+        finally:
+            if instrumentation is not None:
+                instrumentation.stop()
 
-        log.debug( f'Writing::{line}' )
         return
 
+    def write_many( self, records: Iterable[M3URecord] ) -> int:
+        """Writes the records to the M3U file, the records are joined into blocks of the buffer size.
+
+        :param records:     iterable of M3URecord or inherited class
+        :return:            number of records written
+        """
+        block_size = self.__buffer_size if self.__buffer_size > 0 else self.DEFAULT_BUFFER_SIZE
+        debug = log.isEnabledFor( logging.DEBUG )
+        lines = self.__buffer
+        formatter = self.__format
+        instrumentation = self.__instrumentation
+        count = 0
+        for record in records:
+            if instrumentation is not None:
+                instrumentation.start( 'serialize' )
+
+            try:
+                line = formatter( record )
+                if debug:
+                    log.debug( f'Writing::{line}' )
+
+                lines.append( line )
+                self.__buffered += len( line )
+                count += 1
+                if self.__buffered >= block_size:
+                    self.flush()
+
+            finally:
+                if instrumentation is not None:
+                    instrumentation.stop()
+
+        if self.__buffer_size <= 0:
+            self.flush()
+
+        if instrumentation is not None:
+            instrumentation.count( 'records_written', count )
+
+        return count
 
     def __enter__( self ):
         self.create()
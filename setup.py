@@ -37,6 +37,10 @@ setuptools.setup( name             = 'm3u_serializer',
                   package_dir      = { "m3u_serializer": "m3u_serializer" },
                   install_requires = [
                      'requests'
-                  ]
+                  ],
+                  extras_require   = {
+                     'async': [ 'aiohttp' ],
+                     'zstd': [ 'zstandard' ]
+                  }
 )
 
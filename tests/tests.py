@@ -1,6 +1,16 @@
 import unittest
 import os
-from m3u_serializer import M3UDeserializer, M3USerializer, M3URecordEx
+import io
+import asyncio
+import tempfile
+from m3u_serializer import ( M3UDeserializer, M3USerializer, M3URecordEx, M3UFetchCache, M3UCompactRecordEx,
+                             M3UColumnarPlaylist, M3uItemType, M3UAsyncPool, M3USession,
+                             M3UPlaylistDiff, M3UPlaylistSnapshot, M3UPlaylistStore,
+                             M3UIndexedPlaylist, M3UPatternFilter, M3UInstrumentation,
+                             M3UPlaylistMerge, M3UBloomFilter, M3UPlaylistSort, M3UHlsPlaylist, M3UHlsLivePlaylist )
+from m3u_serializer.aio import aiohttp
+from m3u_serializer.exceptions import OutdatedSnapshot, InvalidParameter
+from m3u_serializer.record import classify, media_extensions, M3UNormalizer, COUNTRY_CODES, COUNTRY_TRANSLATES
 from server import FlaskStub
 import warnings
 
@@ -58,6 +68,310 @@ class TestSuite( unittest.TestCase ):
 
         return
 
+    def test_load_filename_memory_map( self ):
+        """This test memory-maps a file and de-serialize the the M3U records
+
+        """
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        expected = [ ( channel.Duration, channel.Name, channel.Group, channel.Link ) for channel in deserializer ]
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ), new_record = M3URecordEx, memory_map = True ) as deserializer:
+            result = [ ( channel.Duration, channel.Name, channel.Group, channel.Link ) for channel in deserializer ]
+
+        self.assertEqual( 2, len( result ) )
+        self.assertEqual( expected, result )
+        return
+
+    def test_load_filename_parallel( self ):
+        """This test parses the shards of a file in worker processes
+
+        """
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        expected = [ ( channel.Name, channel.Link, channel.attribute( 'channel' ) ) for channel in deserializer ]
+        for memory_map in ( False, True ):
+            with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ), new_record = M3URecordEx,
+                                  memory_map = memory_map, workers = 2, shard_size = 10 ) as deserializer:
+                result = [ ( channel.Name, channel.Link, channel.attribute( 'channel' ) ) for channel in deserializer ]
+
+            self.assertEqual( expected, result )
+
+        self.assertEqual( [ 1, 2 ], [ item[ 2 ] for item in expected ] )
+
+        # The #EXTGRP group on the first line is carried to all the shards
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join( directory, 'test-parallel.m3u' )
+            with open( filename, 'w' ) as stream:
+                stream.write( '#EXTGRP:News\n' )
+                for number in range( 2000 ):
+                    stream.write( f'#EXTINF:-1 tvg-id="news{number}.nl",News {number}\nhttp://iptv.example.org/news/{number}\n' )
+
+            for memory_map in ( False, True ):
+                with M3UDeserializer( filename, memory_map = memory_map, workers = 2, shard_size = 4096 ) as deserializer:
+                    self.assertEqual( [ 'News' ] * 2000, [ channel.Group for channel in deserializer ], memory_map )
+
+            with M3UDeserializer( filename, new_record = M3URecordEx, workers = 2, shard_size = 4096 ) as deserializer:
+                self.assertEqual( list( range( 1, 2001 ) ), [ channel.Channel for channel in deserializer ] )
+
+        return
+
+    def test_load_filename_compact_record( self ):
+        """This test de-serialize the the M3U records into the compact record class
+
+        """
+        def fields( channel ):
+            return ( channel.Duration, channel.Name, channel.Group, channel.Link, channel.getAttributes(),
+                     channel.Type, channel.Genre, channel.Country, channel.Season, channel.Episode )
+
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        expected = [ fields( channel ) for channel in deserializer ]
+        deserializer = M3UDeserializer( new_record = M3UCompactRecordEx )
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        result = [ fields( channel ) for channel in deserializer ]
+        self.assertEqual( expected, result )
+        channel = M3UCompactRecordEx()
+        channel.set( -1, 'tvg-id="npo1.nl" group-title="NL | Series"', 'NL: Zomergasten S01 E02', 'http://iptv.example.org/serie.mkv' )
+        self.assertFalse( hasattr( channel, '__dict__' ) )
+        self.assertEqual( ( 'S01', 'E02', 'NL' ), ( channel.Season, channel.Episode, channel.Country ) )
+        self.assertEqual( 'npo1.nl', channel.TvgId )
+        channel.TvgLogo = 'http://logo.example.org/npo1.png'
+        self.assertEqual( 'tvg-id="npo1.nl" group-title="NL: Zomergasten" tvg-logo="http://logo.example.org/npo1.png"',
+                          channel.getAttributes() )
+        self.assertRaises( InvalidParameter, M3UCompactRecordEx, lazy_attributes = True )
+        return
+
+    def test_columnar_playlist( self ):
+        """This test loads the M3U records in a columnar playlist, filters, groups and writes them
+
+        """
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ), new_record = M3URecordEx ) as deserializer:
+            playlist = M3UColumnarPlaylist( deserializer )
+
+        self.assertEqual( 2, len( playlist ) )
+        self.assertEqual( [ 'Nederland SD' ], playlist.categories( 'group' ) )
+        selection = playlist.where( group = 'Nederland SD', type = M3uItemType.IPTV_CHANNEL, duration = [ '1.45' ] )
+        self.assertEqual( [ 1 ], list( selection ) )
+        self.assertEqual( [ 0 ], list( playlist.where( name = lambda name: name.endswith( '1' ) ) ) )
+        self.assertEqual( [], list( playlist.where( duration = -1 ) ) )
+        self.assertEqual( [], list( playlist.where( duration = '7' ) ) )
+        self.assertEqual( { 'Nederland SD': 2 }, playlist.counts( 'group' ) )
+        self.assertEqual( [ 0, 1 ], list( playlist.groupBy( 'group' )[ 'Nederland SD' ] ) )
+        channel = playlist.record( 1 )
+        self.assertEqual( ( 'NPO 2', 'Nederland SD', 'http://iptv.example.org/some/route/channel2' ),
+                          ( channel.Name, channel.Group, channel.Link ) )
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join( directory, 'test-columnar.m3u' )
+            with M3USerializer( filename ) as stream:
+                self.assertEqual( 1, playlist.write( stream, selection ) )
+
+            with M3UDeserializer( filename ) as deserializer:
+                self.assertEqual( [ 'NPO 2' ], [ channel.Name for channel in deserializer ] )
+
+        deserializer = M3UDeserializer()
+        deserializer.set( '#EXTM3U\n#EXTGRP:News\n#EXTINF:-1 tvg-id="cnn",CNN\n#EXTVLCOPT:http-user-agent=VLC\n'
+                          'http://iptv.example.org/cnn\n' )
+        channel = M3UColumnarPlaylist( deserializer ).record( 0 )
+        self.assertEqual( ( 'News', 'News', ( '#EXTVLCOPT:http-user-agent=VLC', ), 'tvg-id="cnn"' ),
+                          ( channel.Group, channel.ExtGroup, channel.Options, channel.getAttributes() ) )
+        return
+
+    def test_playlist_diff( self ):
+        """This test compares two loads of the M3U records through a saved snapshot
+
+        """
+        differ = M3UPlaylistDiff( key = ( 'name', ) )
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as deserializer:
+            changes = differ.diff( deserializer )
+
+        self.assertEqual( [ 'NPO 1', 'NPO 2' ], [ channel.Name for channel in changes.Added ] )
+        deserializer = M3UDeserializer()
+        deserializer.set( '#EXTM3U\n'
+                          '#EXTINF:-1 group-title="Nederland HD",NPO 1\n'
+                          'http://iptv.example.org/some/route/channel\n'
+                          '#EXTINF:-1 group-title="Nederland SD",NPO 3\n'
+                          'http://iptv.example.org/some/route/channel3\n' )
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join( directory, 'test-snapshot.bin' )
+            changes.Snapshot.save( filename )
+            changes = differ.diff( deserializer, M3UPlaylistSnapshot.load( filename ) )
+
+        self.assertEqual( [ 'NPO 3' ], [ channel.Name for channel in changes.Added ] )
+        self.assertEqual( [ 'NPO 1' ], [ channel.Name for channel in changes.Modified ] )
+        self.assertEqual( [ 'NPO 2' ], changes.Removed )
+        self.assertEqual( 0, changes.Unchanged )
+
+        # A record inserted at the top does not modify the records after it
+        data = ( '#EXTM3U\n'
+                 '#EXTINF:-1 tvg-id="npo1.nl" group-title="Nederland SD",NPO 1\n'
+                 'http://iptv.example.org/some/route/channel\n'
+                 '#EXTINF:-1 tvg-id="npo2.nl" group-title="Nederland SD",NPO 2\n'
+                 'http://iptv.example.org/some/route/channel2\n' )
+        differ = M3UPlaylistDiff( key = 'tvg-id' )
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.set( data )
+        snapshot = differ.diff( deserializer ).Snapshot
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.set( data.replace( '#EXTM3U\n', '#EXTM3U\n#EXTINF:-1 tvg-id="npo3.nl" group-title="Nederland SD",NPO 3\n'
+                                                  'http://iptv.example.org/some/route/channel3\n' ) )
+        changes = differ.diff( deserializer, snapshot )
+        self.assertEqual( [ 'NPO 3' ], [ channel.Name for channel in changes.Added ] )
+        self.assertEqual( [], changes.Modified )
+        self.assertEqual( 2, changes.Unchanged )
+        return
+
+    def test_playlist_store( self ):
+        """This test writes a binary snapshot of the M3U records and reloads it
+
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join( directory, 'input.m3u' )
+            with open( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as stream:
+                data = stream.read()
+
+            with open( source, 'w' ) as stream:
+                stream.write( data + '#EXTINF:-1 group-title="Movies",NL | Movie\nhttp://iptv.example.org/movie.mkv\n' )
+
+            filename = os.path.join( directory, 'input.snapshot' )
+            with M3UPlaylistStore.load( filename, source ) as store:
+                self.assertEqual( 3, len( store ) )
+                channel = store[ -1 ]
+                self.assertEqual( ( 'Movie', 'Movies: Movies', M3uItemType.MOVIE, 'NL', 'Movies' ),
+                                  ( channel.Name, channel.Group, channel.Type, channel.Country, channel.Genre ) )
+                self.assertEqual( [ 'NPO 1', 'NPO 2', 'Movie' ], [ channel.Name for channel in store ] )
+
+            with open( source, 'w' ) as stream:
+                stream.write( data )
+
+            self.assertRaises( OutdatedSnapshot, M3UPlaylistStore, filename, source )
+            with M3UPlaylistStore.load( filename, source ) as store:
+                self.assertEqual( 2, len( store ) )
+
+            # The #EXTGRP group and the options are kept in the snapshot
+            with open( source, 'w' ) as stream:
+                stream.write( '#EXTM3U\n#EXTGRP:News\n#EXTINF:-1 tvg-id="cnn",CNN\n#EXTVLCOPT:http-user-agent=VLC\n'
+                              'http://iptv.example.org/cnn\n' )
+
+            with M3UPlaylistStore.load( filename, source ) as store:
+                channel = store[ 0 ]
+                self.assertEqual( ( 'News', 'News', ( '#EXTVLCOPT:http-user-agent=VLC', ) ),
+                                  ( channel.Group, channel.ExtGroup, channel.Options ) )
+
+            # An empty or truncated snapshot is rebuilt
+            with open( filename, 'r+b' ) as stream:
+                stream.truncate( 40 )
+
+            self.assertRaises( OutdatedSnapshot, M3UPlaylistStore, filename, source )
+            with M3UPlaylistStore.load( filename, source ) as store:
+                self.assertEqual( 1, len( store ) )
+
+            open( filename, 'wb' ).close()
+            with M3UPlaylistStore.load( filename, source ) as store:
+                self.assertEqual( 'CNN', store[ 0 ].Name )
+
+        return
+
+    def test_classify( self ):
+        """This test checks the series, movie and channel classification
+
+        """
+        media_files = media_extensions()
+        self.assertEqual( ( M3uItemType.SERIE_EPISODE, 'S01', 'E12', 'Series', 'NL | The Office' ),
+                          classify( 'NL | The Office S01 - E12', 'Series', 'http://x/1.mkv', media_files ) )
+        self.assertEqual( ( M3uItemType.SERIE_EPISODE, 's2', 'x3', 'Series', 'S01E01 Pilot' ),
+                          classify( 'S01E01 Pilot s2x3', 'Series', 'http://x/1', media_files ) )
+        self.assertEqual( ( M3uItemType.MOVIE, '', '', 'Films', 'Movies: Films' ),
+                          classify( 'S01E01', 'Films', 'http://x/1.mp4', media_files ) )
+        self.assertEqual( ( M3uItemType.IPTV_CHANNEL, '', '', 'Sport', 'Sport' ),
+                          classify( 'Sky Sports S123E4', 'Sport', 'http://x/1', media_files ) )
+        channel = M3URecordEx()
+        channel.set( '-1', 'group-title="Sport"', 'Sky - Sports: UK', 'http://x/1' )
+        self.assertEqual( ( 'Sky - Sports', 'UK' ), ( channel.Name, channel.Country ) )
+        return
+
+    def test_normalizer( self ):
+        """This test checks the memoized country code detection and group interning
+
+        """
+        normalizer = M3UNormalizer( maxsize = 2 )
+        self.assertEqual( ( 'NPO 1', 'NL' ), normalizer.countryCode( 'NL | NPO 1', '|' ) )
+        self.assertEqual( ( 'NPO 2', 'NL' ), normalizer.countryCode( 'NL | NPO 2', '|' ) )
+        self.assertEqual( ( 'XX-NL | RTL 4', None ), normalizer.countryCode( 'XX-NL | RTL 4', '|' ) )
+        normalizer.addCountryTranslate( 'XX-NL', 'NL' )
+        self.assertEqual( ( 'RTL 4', 'NL' ), normalizer.countryCode( 'XX-NL | RTL 4', '|' ) )
+        self.assertEqual( ( 'QQ: Bar', None ), normalizer.countryCode( 'QQ: Bar', ':' ) )
+        normalizer.addCountryCode( 'QQ' )
+        self.assertEqual( ( 'Bar', 'QQ' ), normalizer.countryCode( 'QQ: Bar', ':' ) )
+        # The module tables and the default normalizer are not changed
+        self.assertNotIn( 'QQ', COUNTRY_CODES )
+        self.assertNotIn( 'XX-NL', COUNTRY_TRANSLATES )
+        self.assertEqual( ( 'QQ: Bar', None ), M3UNormalizer().countryCode( 'QQ: Bar', ':' ) )
+        statistics = normalizer.statistics()[ 'country' ]
+        self.assertEqual( 2, statistics[ 'size' ] )
+        self.assertGreater( statistics[ 'hits' ], 0 )
+        group = ''.join( [ 'Nederland', ' SD' ] )
+        self.assertIs( normalizer.group( 'Nederland SD' ), normalizer.group( group ) )
+        return
+
+    def test_indexed_playlist( self ):
+        """This test loads the M3U records in an indexed playlist and looks them up
+
+        """
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.set( '#EXTM3U\n'
+                          '#EXTINF:-1 tvg-id="npo1.nl" group-title="Nederland SD",NL | NPO 1\n'
+                          'http://iptv.example.org/some/route/channel\n'
+                          '#EXTINF:-1 tvg-id="npo2.nl" group-title="Nederland SD",NL | NPO 2\n'
+                          'http://iptv.example.org/some/route/channel2\n'
+                          '#EXTINF:-1 group-title="Films",NL | Zomergasten\n'
+                          'http://iptv.example.org/some/route/movie.mkv\n' )
+        playlist = M3UIndexedPlaylist( deserializer )
+        self.assertEqual( 3, len( playlist ) )
+        self.assertEqual( 'NPO 2', playlist.get( 'npo2.nl' ).Name )
+        self.assertIsNone( playlist.get( 'npo3.nl' ) )
+        self.assertEqual( [ 'NPO 1', 'NPO 2' ], [ channel.Name for channel in playlist.find( group = 'Nederland SD' ) ] )
+        self.assertEqual( [ 2 ], list( playlist.positions( country = 'NL', type = M3uItemType.MOVIE ) ) )
+        self.assertEqual( [], list( playlist.find( country = 'BE', type = M3uItemType.MOVIE ) ) )
+        self.assertEqual( [ 'Zomergasten' ], [ channel.Name for channel in playlist.search( 'GASTEN' ) ] )
+        self.assertEqual( [ 'NPO 1' ], [ channel.Name for channel in playlist.search( 'npo', limit = 1 ) ] )
+        return
+
+    def test_lazy_attributes_pass_through( self ):
+        """This test copies M3U records with lazy attributes, the attribute text is written back untouched
+
+        """
+        data = ( "#EXTM3U\n"
+                 "#EXTINF:-1 tvg-id='npo1.nl'  group-title=\"Nederland SD\",NPO 1\n"
+                 "http://iptv.example.org/some/route/channel\n"
+                 "#EXTINF:-1 tvg-id='npo2.nl'  group-title=\"Nederland SD\",NPO 2\n"
+                 "http://iptv.example.org/some/route/channel2\n" )
+        deserializer = M3UDeserializer( lazy_attributes = True )
+        deserializer.set( data )
+        output = io.StringIO()
+        serializer = M3USerializer( stream = output )
+        for channel in deserializer:
+            if channel.Link.endswith( 'channel2' ):
+                channel.TvgId = 'npo2.example.org'
+
+            serializer.write( channel )
+
+        self.assertEqual( ( "#EXTINF:-1 tvg-id='npo1.nl'  group-title=\"Nederland SD\",NPO 1\n"
+                            "http://iptv.example.org/some/route/channel\n"
+                            "#EXTINF:-1 tvg-id=\"npo2.example.org\" group-title=\"Nederland SD\",NPO 2\n"
+                            "http://iptv.example.org/some/route/channel2\n" ), output.getvalue() )
+
+        # The channel number of M3URecordEx is not written and keeps the attribute text untouched
+        deserializer = M3UDeserializer( new_record = M3URecordEx, lazy_attributes = True )
+        deserializer.set( data )
+        output = io.StringIO()
+        serializer = M3USerializer( stream = output )
+        for channel in deserializer:
+            serializer.write( channel )
+
+        self.assertEqual( [ 1, 2 ], [ channel.attribute( 'channel' ) for channel in deserializer ] )
+        self.assertEqual( data[ len( '#EXTM3U\n' ): ], output.getvalue() )
+        return
+
     def test_load_url( self ):
         """This test opens a URL and de-serialize the the M3U records
 
@@ -75,15 +389,118 @@ class TestSuite( unittest.TestCase ):
 
         return
 
+    def test_load_filename_streaming( self ):
+        """This test streams a file in small chunks and de-serialize the the M3U records
+
+        """
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        expected = [ ( channel.Duration, channel.Name, channel.Group, channel.Link ) for channel in deserializer ]
+        deserializer = M3UDeserializer( new_record = M3URecordEx, streaming = True, chunk_size = 16 )
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        result = [ ( channel.Duration, channel.Name, channel.Group, channel.Link ) for channel in deserializer ]
+        self.assertEqual( 2, len( result ) )
+        self.assertEqual( expected, result )
+        return
+
+    def test_load_url_streaming( self ):
+        """This test streams a URL and de-serialize the the M3U records
+
+        """
+        url = 'http://localhost:5000'
+        with M3UDeserializer( url, new_record = M3URecordEx, streaming = True, chunk_size = 16 ) as deserializer:
+            names = [ channel.Name for channel in deserializer ]
+
+        self.assertEqual( [ "NPO 1", "NPO 2" ], names )
+        return
+
+    def test_load_url_store_filename( self ):
+        """This test downloads a URL in chunks and stores the raw data while parsing
+
+        """
+        url = 'http://localhost:5000'
+        with tempfile.TemporaryDirectory() as directory:
+            store_filename = os.path.join( directory, 'test-store.m3u' )
+            with M3UDeserializer( url, store_filename = store_filename, streaming = True, chunk_size = 16 ) as deserializer:
+                names = [ channel.Name for channel in deserializer ]
+
+            self.assertEqual( [ "NPO 1", "NPO 2" ], names )
+            with open( store_filename, 'rb' ) as stored, open( os.path.join( DATA_PATH, 'input-data.m3u' ), 'rb' ) as original:
+                self.assertEqual( original.read(), stored.read() )
+
+        return
+
+    def test_load_url_cached( self ):
+        """This test downloads a URL twice through the cache, the second time the server answers 304
+
+        """
+        url = 'http://localhost:5000'
+        with tempfile.TemporaryDirectory() as directory:
+            cache = M3UFetchCache( directory )
+            for streaming in ( False, True ):
+                with M3UDeserializer( url, new_record = M3URecordEx, cache = cache, streaming = streaming ) as deserializer:
+                    names = [ channel.Name for channel in deserializer ]
+
+                self.assertEqual( [ "NPO 1", "NPO 2" ], names )
+
+            statistics = cache.statistics()
+            self.assertEqual( 1, statistics[ 'misses' ] )
+            self.assertEqual( 1, statistics[ 'hits' ] )
+            self.assertEqual( os.path.getsize( os.path.join( DATA_PATH, 'input-data.m3u' ) ), statistics[ 'bytes_saved' ] )
+
+        return
+
+    def test_load_url_session( self ):
+        """This test downloads a URL twice through the same session and checks the timings
+
+        """
+        url = 'http://localhost:5000'
+        timings = []
+        session = M3USession( on_timing = timings.append )
+        for _ in range( 2 ):
+            with M3UDeserializer( url, new_record = M3URecordEx, session = session ) as deserializer:
+                self.assertEqual( [ "NPO 1", "NPO 2" ], [ channel.Name for channel in deserializer ] )
+
+        self.assertEqual( 2, len( session.Timings ) )
+        self.assertEqual( session.Timings, timings )
+        for timing in timings:
+            self.assertEqual( 200, timing.Status )
+            self.assertEqual( os.path.getsize( os.path.join( DATA_PATH, 'input-data.m3u' ) ), timing.Size )
+            self.assertGreaterEqual( timing.Duration, timing.Elapsed )
+
+        session.close()
+        return
+
+    @unittest.skipIf( aiohttp is None, 'aiohttp is not installed' )
+    def test_load_url_async( self ):
+        """This test downloads a URL several times concurrently with the asynchronous deserializer
+
+        """
+        url = 'http://localhost:5000'
+
+        async def load( pool ):
+            async with pool.open( url, new_record = M3URecordEx, chunk_size = 16 ) as deserializer:
+                return [ channel.Name async for channel in deserializer ]
+
+        async def load_all():
+            async with M3UAsyncPool( limit = 2, limit_per_host = 2 ) as pool:
+                return await asyncio.gather( *[ load( pool ) for _ in range( 4 ) ] )
+
+        for names in asyncio.run( load_all() ):
+            self.assertEqual( [ "NPO 1", "NPO 2" ], names )
+
+        return
+
     def test_save_filename( self ):
         """This test create a file and serialize a M3U record.
 
         """
-        with M3USerializer( os.path.join( ROOT_PATH, 'data', 'test-copy.m3u' ) ) as stream:
-            channel = M3URecordEx()
-            channel.set( -1, 'group-title="Nederland SD"', 'NPO 1', 'http://iptv.example.org/some/route/channel' )
-            print( f'Writing: {channel}' )
-            stream.write( channel )
+        with tempfile.TemporaryDirectory() as directory:
+            with M3USerializer( os.path.join( directory, 'test-copy.m3u' ) ) as stream:
+                channel = M3URecordEx()
+                channel.set( -1, 'group-title="Nederland SD"', 'NPO 1', 'http://iptv.example.org/some/route/channel' )
+                print( f'Writing: {channel}' )
+                stream.write( channel )
 
         return
 
@@ -91,11 +508,12 @@ class TestSuite( unittest.TestCase ):
         """This test create a file and serialize a M3U record.
 
         """
-        with M3USerializer( os.path.join( ROOT_PATH, 'data', 'test-wo-attr.m3u' ) ) as stream:
-            channel = M3URecordEx()
-            channel.set( -1, 'NPO 1', 'http://iptv.example.org/some/route/channel' )
-            print( f'Writing: {channel}' )
-            stream.write( channel )
+        with tempfile.TemporaryDirectory() as directory:
+            with M3USerializer( os.path.join( directory, 'test-wo-attr.m3u' ) ) as stream:
+                channel = M3URecordEx()
+                channel.set( -1, 'NPO 1', 'http://iptv.example.org/some/route/channel' )
+                print( f'Writing: {channel}' )
+                stream.write( channel )
 
         return
 
@@ -103,17 +521,18 @@ class TestSuite( unittest.TestCase ):
         """This test create a file and serialize a M3U record.
 
         """
-        with M3USerializer( os.path.join( ROOT_PATH, 'data', 'test-with-attr.m3u' ) ) as stream:
-            channel = M3URecordEx()
-            attrs = {
-                'tgv-id': 'www.npo1.nl',
-                'tgv-name': 'NPO 1 HD',
-                'tgv-logo': 'www.npo1.nl',
-                'group-title': 'Nederland SD'
-            }
-            channel.set( -1, 'NPO 1', 'http://iptv.example.org/some/route/channel', **attrs )
-            print( f'Writing: {channel}' )
-            stream.write( channel )
+        with tempfile.TemporaryDirectory() as directory:
+            with M3USerializer( os.path.join( directory, 'test-with-attr.m3u' ) ) as stream:
+                channel = M3URecordEx()
+                attrs = {
+                    'tgv-id': 'www.npo1.nl',
+                    'tgv-name': 'NPO 1 HD',
+                    'tgv-logo': 'www.npo1.nl',
+                    'group-title': 'Nederland SD'
+                }
+                channel.set( -1, 'NPO 1', 'http://iptv.example.org/some/route/channel', **attrs )
+                print( f'Writing: {channel}' )
+                stream.write( channel )
 
         return
 
@@ -121,20 +540,337 @@ class TestSuite( unittest.TestCase ):
         """This test create a file and serialize a M3U record.
 
         """
-        with M3USerializer( os.path.join( ROOT_PATH, 'data', 'test-with-attr-ex.m3u' ) ) as stream:
-            channel = M3URecordEx()
-            attrs = {
-                'tgv-id': 'www.npo1.nl',
-                'tgv-name': 'NPO 1 HD',
-                'tgv-logo': 'www.npo1.nl',
-                'group-title': 'Nederland SD',
-                'tgv-subtitles': 'https://www.npo1.nl/subtitle',
-                'program-name': 'Zomer gasten',
-            }
-            channel.set( -1, 'NPO 1', 'http://iptv.example.org/some/route/channel', **attrs )
-            print( f'Writing: {channel}' )
-            stream.write( channel )
+        with tempfile.TemporaryDirectory() as directory:
+            with M3USerializer( os.path.join( directory, 'test-with-attr-ex.m3u' ) ) as stream:
+                channel = M3URecordEx()
+                attrs = {
+                    'tgv-id': 'www.npo1.nl',
+                    'tgv-name': 'NPO 1 HD',
+                    'tgv-logo': 'www.npo1.nl',
+                    'group-title': 'Nederland SD',
+                    'tgv-subtitles': 'https://www.npo1.nl/subtitle',
+                    'program-name': 'Zomer gasten',
+                }
+                channel.set( -1, 'NPO 1', 'http://iptv.example.org/some/route/channel', **attrs )
+                print( f'Writing: {channel}' )
+                stream.write( channel )
+
+        return
+
+    def test_save_filename_compressed( self ):
+        """This test writes compressed M3U files and reads them back
+
+        """
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as deserializer:
+            records = list( deserializer )
+
+        with tempfile.TemporaryDirectory() as directory:
+            for extension in ( '.gz', '.bz2', '.xz' ):
+                filename = os.path.join( directory, f'output.m3u{extension}' )
+                with M3USerializer( filename, compression_level = 1 ) as serializer:
+                    serializer.write_many( records )
+
+                # Detected by the magic bytes without the extension
+                os.rename( filename, filename[ :-len( extension ) ] )
+                filename = filename[ :-len( extension ) ]
+                for options in ( {}, { 'streaming': True, 'chunk_size': 16 }, { 'memory_map': True } ):
+                    with M3UDeserializer( filename, **options ) as deserializer:
+                        self.assertEqual( [ 'NPO 1', 'NPO 2' ], [ channel.Name for channel in deserializer ], extension )
+
+        return
+
+    def test_keep_source_pass_through( self ):
+        """This test copies M3U records with their original text, only the modified record is formatted
+
+        """
+        data = ( "#EXTM3U\n"
+                 "#EXTINF:-1 tvg-id='npo1.nl'  group-title=\"Nederland SD\",NPO 1\r\n"
+                 "http://iptv.example.org/some/route/channel\r\n"
+                 "#EXTINF:-1 tvg-id='npo2.nl'  group-title=\"Nederland SD\",NPO 2\n\n"
+                 "http://iptv.example.org/some/route/channel2\n" )
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join( directory, 'test-source.m3u' )
+            with open( filename, 'w', newline = '' ) as stream:
+                stream.write( data )
+
+            for options in ( {}, { 'memory_map': True }, { 'streaming': True, 'chunk_size': 16 }, { 'workers': 2, 'shard_size': 10 } ):
+                deserializer = M3UDeserializer( filename, keep_source = True, new_record = M3URecordEx, **options )
+                output = io.BytesIO()
+                with deserializer, M3USerializer( stream = output ) as serializer:
+                    serializer.write_many( deserializer )
+
+                expected = data[ 8: ] if 'memory_map' in options else data[ 8: ].replace( '\r', '' )
+                self.assertEqual( expected.encode( 'utf-8' ), output.getvalue(), options )
+
+            deserializer = M3UDeserializer( keep_source = True )
+            deserializer.set( data )
+            channel = next( iter( deserializer ) )
+            channel.Name = 'NPO 1 HD'
+            self.assertIsNone( channel.Source )
+        return
+
+    def test_copy_directives( self ):
+        """This test copies the #EXTM3U header, #PLAYLIST, #EXTGRP and option directives
+
+        """
+        data = ( '#EXTM3U url-tvg="http://epg.example.org/guide.xml"\n'
+                 "#PLAYLIST:Nederland\n"
+                 "#EXTGRP:Publiek\n"
+                 "#EXTINF:-1 tvg-id='npo1.nl',NPO 1\n"
+                 "http://iptv.example.org/some/route/channel\n"
+                 "#EXTVLCOPT:http-user-agent=VLC\n"
+                 "#EXTINF:-1 tvg-id='npo2.nl',NPO 2\n"
+                 "#KODIPROP:inputstream=inputstream.adaptive\n"
+                 "http://iptv.example.org/some/route/channel2\n"
+                 "#EXTGRP:Regionaal\n"
+                 "#EXTINF:-1 tvg-id='rtvnh.nl' group-title=\"Noord-Holland\",NH\n"
+                 "http://iptv.example.org/some/route/channel3\n" )
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join( directory, 'test-directives.m3u' )
+            with open( filename, 'w' ) as stream:
+                stream.write( data )
+
+            for options in ( {}, { 'memory_map': True }, { 'streaming': True, 'chunk_size': 16 }, { 'workers': 2, 'shard_size': 10 } ):
+                with M3UDeserializer( filename, new_record = M3URecordEx, **options ) as deserializer:
+                    channels = list( deserializer )
+                    self.assertEqual( { 'url-tvg': 'http://epg.example.org/guide.xml' }, deserializer.Header, options )
+                    self.assertEqual( 'Nederland', deserializer.Playlist, options )
+
+                self.assertEqual( [ 'Publiek', 'Publiek', 'Noord-Holland' ], [ channel.Group for channel in channels ], options )
+                self.assertEqual( [ 'Publiek', 'Publiek', 'Regionaal' ], [ channel.ExtGroup for channel in channels ], options )
+                self.assertEqual( ( '#EXTVLCOPT:http-user-agent=VLC', '#KODIPROP:inputstream=inputstream.adaptive' ),
+                                  channels[ 1 ].Options, options )
+                self.assertEqual( [ 1, 2, 3 ], [ channel.attribute( 'channel' ) for channel in channels ], options )
+
+                for keep_source in ( False, True ):
+                    with M3UDeserializer( filename, keep_source = keep_source, **options ) as deserializer:
+                        channels = list( deserializer )
+                        output = os.path.join( directory, 'test-directives-output.m3u' )
+                        with M3USerializer( output, header = deserializer.Header, playlist = deserializer.Playlist ) as serializer:
+                            serializer.write_many( channels )
+
+                    with M3UDeserializer( output ) as deserializer:
+                        copies = list( deserializer )
+                        self.assertEqual( 'Nederland', deserializer.Playlist )
+
+                    self.assertEqual( [ ( channel.ExtGroup, channel.Options, channel.Link ) for channel in channels ],
+                                      [ ( channel.ExtGroup, channel.Options, channel.Link ) for channel in copies ], options )
+
+        # A record without a group writes no #EXTGRP, a link with '#EXTGRP' in it is no #EXTGRP directive
+        deserializer = M3UDeserializer( keep_source = True )
+        deserializer.set( '#EXTM3U\n#EXTGRP:News\n#EXTINF:-1 tvg-id="cnn",CNN\nhttp://iptv.example.org/#EXTGRP\n' )
+        records = list( deserializer )
+        deserializer.set( '#EXTM3U\n#EXTINF:-1 tvg-id="bbc",BBC\nhttp://iptv.example.org/bbc\n' )
+        records += list( deserializer )
+        output = io.StringIO()
+        with M3USerializer( stream = output ) as serializer:
+            serializer.write_many( records )
+
+        self.assertEqual( '#EXTGRP:News\n#EXTINF:-1 tvg-id="cnn",CNN\nhttp://iptv.example.org/#EXTGRP\n'
+                          '#EXTINF:-1 tvg-id="bbc",BBC\nhttp://iptv.example.org/bbc\n', output.getvalue() )
+        return
+
+    def test_write_many( self ):
+        """This test writes the M3U records in blocks to a binary stream
+
+        """
+        deserializer = M3UDeserializer()
+        deserializer.open( os.path.join( DATA_PATH, 'input-data.m3u' ) )
+        output = io.BytesIO()
+        serializer = M3USerializer( stream = output, buffer_size = 4096 )
+        self.assertEqual( 2, serializer.write_many( deserializer ) )
+        self.assertEqual( b'', output.getvalue() )
+        serializer.close()
+        with open( os.path.join( DATA_PATH, 'input-data.m3u' ), 'rb' ) as stream:
+            self.assertEqual( stream.read().replace( b'#EXTM3U\n', b'' ), output.getvalue() )
+
+        return
+
+    def test_copy_pattern_filter( self ):
+        """Copy M3U records based on group-title patterns
+
+        """
+        whitelist = M3UPatternFilter( [ 'belgie', r'nederland\s+sd', 'NL' ] )
+        self.assertEqual( r'nederland\s+sd', whitelist.match( 'Nederland SD' ) )
+        self.assertIsNone( whitelist.match( 'Nederland HD' ) )
+        blacklist = M3UPatternFilter( [ r'(\w+) \1', 'nederland' ], exclude = True )
+        self.assertEqual( 'nederland', blacklist.match( 'Nederland SD' ) )
+        output = io.BytesIO()
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as in_stream:
+            with M3USerializer( stream = output ) as out_stream:
+                self.assertEqual( 2, out_stream.write_many( whitelist.filter( in_stream ) ) )
+
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as in_stream:
+            self.assertEqual( [], list( blacklist.filter( in_stream ) ) )
+
+        return
+
+    def test_copy_instrumented( self ):
+        """Copy M3U records with the phases measured
+
+        """
+        reports = []
+        instrumentation = M3UInstrumentation( [ reports.append ] )
+        output = io.StringIO()
+        with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ), streaming = True,
+                              instrumentation = instrumentation ) as in_stream:
+            with M3USerializer( stream = output, instrumentation = instrumentation ) as out_stream:
+                out_stream.write_many( in_stream )
+
+        self.assertEqual( [ 'M3U-Deserializer', 'M3U-Serializer' ], [ report[ 'source' ] for report in reports ] )
+        self.assertEqual( { 'fetch', 'tokenize', 'build', 'serialize', 'write' }, set( instrumentation.Timers ) )
+        counters = instrumentation.Counters
+        self.assertEqual( ( 2, 2, 2 ), ( counters[ 'items' ], counters[ 'records' ], counters[ 'records_written' ] ) )
+        self.assertEqual( len( output.getvalue() ), counters[ 'chars_written' ] )
+        self.assertIn( 'm3u_records_written_total 2\n', instrumentation.prometheus() )
+
+        # The timer of a record that fails to format is stopped, no phase is left running
+        self.assertRaises( AttributeError, M3USerializer( stream = output, instrumentation = instrumentation ).write_many, [ None ] )
+        self.assertRaises( IndexError, instrumentation.stop )
+        return
+
+    def test_merge( self ):
+        """Merge several M3U sources without duplicates into one file
+
+        """
+        deserializer = M3UDeserializer()
+        deserializer.set( '#EXTM3U\n'
+                          '#EXTINF:-1 tvg-id="npo2.nl" group-title="Nederland HD",NPO 2 HD\n'
+                          'http://iptv.example.org/some/route/channel2\n'
+                          '#EXTINF:-1 tvg-id="npo3.nl" group-title="Nederland HD",NPO 3 HD\n'
+                          'http://iptv.example.org/some/route/channel3\n' )
+        sources = [ os.path.join( DATA_PATH, 'input-data.m3u' ), deserializer ]
+        merge = M3UPlaylistMerge( sources, key = 'link' )
+        output = io.StringIO()
+        with M3USerializer( stream = output ) as serializer:
+            self.assertEqual( 3, merge.write( serializer ) )
+
+        self.assertEqual( ( [ 2, 1 ], 1 ), ( merge.Counts, merge.Duplicates ) )
+        self.assertIn( ',NPO 2\n', output.getvalue() )
+        self.assertNotIn( 'NPO 2 HD', output.getvalue() )
+        merge = M3UPlaylistMerge( list( reversed( sources ) ), key = 'link', bloom_capacity = 1000 )
+        self.assertEqual( [ 'NPO 2 HD', 'NPO 3 HD', 'NPO 1' ], [ channel.Name for channel in merge ] )
+        merge = M3UPlaylistMerge( sources, key = 'link', policy = 'arrival' )
+        self.assertEqual( 3, len( list( merge ) ) )
+
+        # The counts are of the last iteration only
+        self.assertEqual( 3, len( list( merge ) ) )
+        self.assertEqual( ( 3, 1 ), ( sum( merge.Counts ), merge.Duplicates ) )
+        self.assertEqual( 1798, M3UBloomFilter( 1000 ).SizeBytes )
+        return
+
+    def test_sort( self ):
+        """Sort M3U records by group and name with runs spilled to temporary files
+
+        """
+        data = '#EXTM3U\n'
+        for index, ( group, name ) in enumerate( [ ( 'Sport', 'Eurosport' ), ( 'News', 'CNN' ), ( 'Films', 'NL | Movie' ),
+                                                   ( 'News', 'BBC News' ), ( 'Sport', 'ESPN' ) ] ):
+            link = f'http://iptv.example.org/{index}.mkv' if group == 'Films' else f'http://iptv.example.org/{index}'
+            data += f'#EXTINF:-1 tvg-id="{index}" group-title="{group}",{name}\n{link}\n'
+
+        # The group of the movie is 'Movies: Films'
+        expected = [ 'Movie', 'BBC News', 'CNN', 'ESPN', 'Eurosport' ]
+        for budget in ( 1000, 10000000 ):
+            sorter = M3UPlaylistSort( key = ( 'group', 'name' ), memory_budget = budget )
+            deserializer = M3UDeserializer( new_record = M3URecordEx )
+            deserializer.set( data )
+            records = list( sorter.sort( deserializer ) )
+            self.assertEqual( expected, [ channel.Name for channel in records ] )
+            self.assertEqual( ( M3uItemType.MOVIE, 'NL' ), ( records[ 0 ].Type, records[ 0 ].Country ) )
+            self.assertEqual( budget == 1000, sorter.Runs > 0 )
+
+        sorter = M3UPlaylistSort( key = 'tvg-id', reverse = True, memory_budget = 1000 )
+        deserializer = M3UDeserializer( keep_source = True )
+        deserializer.set( data )
+        output = io.StringIO()
+        with M3USerializer( stream = output ) as serializer:
+            self.assertEqual( 5, sorter.write( deserializer, serializer ) )
+
+        self.assertTrue( output.getvalue().startswith( '#EXTINF:-1 tvg-id="4" group-title="Sport",ESPN\n' ) )
+
+        # The sort is stable in reverse order as well
+        for budget in ( 100, 10000000 ):
+            deserializer = M3UDeserializer()
+            deserializer.set( '#EXTM3U\n' + ''.join( f'#EXTINF:-1 tvg-id="{index % 2}",Same\nhttp://iptv.example.org/l{index}\n'
+                                                      for index in range( 1, 5 ) ) )
+            records = M3UPlaylistSort( key = ( 'tvg-id', 'name' ), reverse = True, memory_budget = budget ).sort( deserializer )
+            self.assertEqual( [ 'l1', 'l3', 'l2', 'l4' ], [ channel.Link.rsplit( '/', 1 )[ 1 ] for channel in records ], budget )
+
+        # The #EXTGRP group and the options are kept in the spilled runs
+        deserializer = M3UDeserializer( new_record = M3URecordEx )
+        deserializer.set( '#EXTM3U\n#EXTGRP:News\n#EXTINF:-1 tvg-id="2",CNN\n#EXTVLCOPT:http-user-agent=VLC\n'
+                          'http://iptv.example.org/cnn\n#EXTINF:-1 tvg-id="1",BBC News\nhttp://iptv.example.org/bbc\n' )
+        records = list( M3UPlaylistSort( key = 'name', memory_budget = 100 ).sort( deserializer ) )
+        self.assertEqual( [ ( 'BBC News', 'News', () ), ( 'CNN', 'News', ( '#EXTVLCOPT:http-user-agent=VLC', ) ) ],
+                          [ ( channel.Name, channel.Group, channel.Options ) for channel in records ] )
+
+        # The size estimate does not parse lazy attributes
+        deserializer = M3UDeserializer( lazy_attributes = True )
+        deserializer.set( data )
+        records = list( M3UPlaylistSort( key = 'name' ).sort( deserializer ) )
+        self.assertEqual( [ None ] * 5, [ channel._M3URecord__attributes for channel in records ] )
+        self.assertEqual( [ len( channel.getAttributes() ) for channel in records ], [ channel.attributesSize() for channel in records ] )
+        return
+
+    def test_hls_playlist( self ):
+        """Parse HLS master and media playlists, and poll a live media playlist incremental
+
+        """
+        master = M3UHlsPlaylist( "#EXTM3U\n"
+                                 "#EXT-X-MEDIA:TYPE=AUDIO,GROUP-ID=\"aud\",NAME=\"Nederlands\",URI=\"audio/nl.m3u8\"\n"
+                                 "#EXT-X-STREAM-INF:BANDWIDTH=1280000,RESOLUTION=640x360,CODECS=\"avc1.4d401e,mp4a.40.2\"\n"
+                                 "low/index.m3u8\n"
+                                 "#EXT-X-STREAM-INF:BANDWIDTH=2560000,RESOLUTION=1280x720\n"
+                                 "mid/index.m3u8\n" )
+        self.assertTrue( master.IsMaster )
+        self.assertEqual( [ 1280000, 2560000 ], [ variant.Bandwidth for variant in master.Variants ] )
+        self.assertEqual( 'avc1.4d401e,mp4a.40.2', master.Variants[ 0 ].Codecs )
+        self.assertEqual( 'audio/nl.m3u8', master.Media[ 0 ][ 'URI' ] )
+
+        def media( first, count, end = False ):
+            lines = [ '#EXTM3U', '#EXT-X-TARGETDURATION:6', f'#EXT-X-MEDIA-SEQUENCE:{first}' ]
+            for sequence in range( first, first + count ):
+                if sequence % 4 == 0:
+                    lines.append( f'#EXT-X-KEY:METHOD=AES-128,URI="https://keys.example.org/{sequence}"' )
+
+                lines.append( f'#EXTINF:6.0,segment {sequence}' )
+                lines.append( '#EXT-X-BYTERANGE:1000' + ( f'@{sequence * 1000}' if sequence == first else '' ) )
+                lines.append( f'segment{sequence}.ts' )
+
+            if end:
+                lines.append( '#EXT-X-ENDLIST' )
+
+            return '\n'.join( lines ) + '\n'
+
+        playlist = M3UHlsPlaylist( media( 0, 6 ) )
+        self.assertFalse( playlist.IsMaster )
+        self.assertEqual( 6, playlist.TargetDuration )
+        self.assertEqual( [ 0, 1, 2, 3, 4, 5 ], [ segment.Sequence for segment in playlist.Segments ] )
+        self.assertEqual( ( 1000, 5000 ), playlist.Segments[ 5 ].ByteRange )
+        self.assertEqual( 'https://keys.example.org/4', playlist.Segments[ 5 ].Key.Uri )
+        self.assertIs( playlist.Segments[ 0 ].Key, playlist.Segments[ 3 ].Key )
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join( directory, 'test-live.m3u8' )
+            live = M3UHlsLivePlaylist( filename )
+            for first, count, expected in ( ( 0, 5, [ 0, 1, 2, 3, 4 ] ), ( 2, 5, [ 5, 6 ] ), ( 2, 5, [] ), ( 5, 5, [ 7, 8, 9 ] ) ):
+                with open( filename, 'w' ) as stream:
+                    stream.write( media( first, count ) )
+
+                segments = live.refresh()
+                self.assertEqual( expected, [ segment.Sequence for segment in segments ] )
+                self.assertEqual( [ f'segment{sequence}.ts' for sequence in expected ], [ segment.Uri for segment in segments ] )
+
+            self.assertEqual( ( 1000, 9000 ), segments[ -1 ].ByteRange )
+            self.assertEqual( 'https://keys.example.org/8', segments[ -1 ].Key.Uri )
+            with open( filename, 'w' ) as stream:
+                stream.write( media( 8, 4, end = True ) )
+
+            self.assertEqual( [ 10, 11 ], [ segment.Sequence for segment in live.segments() ] )
 
+        # After a reset of the media sequence all the segments are new
+        self.assertEqual( [ 0, 1, 2 ], [ segment.Sequence for segment in live.update( media( 0, 3 ) ) ] )
         return
 
     def test_copy( self ):
@@ -142,10 +878,11 @@ class TestSuite( unittest.TestCase ):
 
         """
         groups = [ 'Nederland SD' ]
-        with M3USerializer( os.path.join( DATA_PATH, 'test-copy-output.m3u' ) ) as out_stream:
-            with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as in_stream:
-                for channel in in_stream:
-                    # do some filtering
-                    if channel.Group in groups:
-                        print( f'Copy {channel}' )
-                        out_stream.write( channel )
+        with tempfile.TemporaryDirectory() as directory:
+            with M3USerializer( os.path.join( directory, 'test-copy-output.m3u' ) ) as out_stream:
+                with M3UDeserializer( os.path.join( DATA_PATH, 'input-data.m3u' ) ) as in_stream:
+                    for channel in in_stream:
+                        # do some filtering
+                        if channel.Group in groups:
+                            print( f'Copy {channel}' )
+                            out_stream.write( channel )